@@ -43,3 +43,14 @@ def connect_to_remote(user, password, host='localhost', port=8332):
 
     return BitcoinConnection(user, password, host, port)
 
+def connect_with_replicas(primary, replicas, **options):
+    """
+    Route read-only calls for *primary* across *replicas*, a list of
+    dictionaries of :func:`connect_to_remote` arguments.
+
+    Returns a :class:`~bitcoin.routing.RoutingConnection` object; *options*
+    are passed to its constructor.
+    """
+    from bitcoind.routing import RoutingConnection
+
+    return RoutingConnection(primary, [connect_to_remote(**r) for r in replicas], **options)
@@ -0,0 +1,91 @@
+"""
+A pool of addresses generated ahead of time, so handing a user a new
+address is a database write instead of a wait on bitcoind's key pool.
+
+Pooled addresses are :class:`~bitcoind.models.Address` rows without a user,
+kept in the bitcoind account :const:`POOL_ACCOUNT` of their shard. A claimed
+address is moved to its owner's account right away by :func:`claim`. If
+that fails, :func:`relabel`, run with :func:`refill` from the
+``refill_address_pool`` command, moves it later. Coins received in the
+meantime follow the address to its new account.
+"""
+from __future__ import with_statement
+
+from django.db import IntegrityError, transaction
+
+from bitcoind import util, owners
+from bitcoind.models import Address
+from bitcoind.proxy import JSONRPCException
+
+# bitcoind account holding the unclaimed addresses. Usernames cannot contain
+# "~", so it can't clash with a user's account.
+POOL_ACCOUNT = "~pool"
+
+# Candidates tried before giving up when other requests claim them first.
+CLAIM_ATTEMPTS = 5
+
+def claim(user, label, shard, is_primary=False, conn=None):
+    """
+    Give an unclaimed address of *shard* to *user* under *label*.
+
+    Returns the address, or :const:`None` if the pool is empty. The claim is
+    a single conditional ``UPDATE``, so an address is never handed out twice.
+    If *conn*, the connection to *shard*, is given, the address is moved to
+    the user's account at once; if bitcoind can't be reached, it is left to
+    :func:`relabel`. If another request gave *user* an address under *label*
+    first, that address is returned.
+    """
+    candidates = Address.objects.filter(user__isnull=True, moved_to__isnull=True, shard=shard)
+    for (pk, address) in candidates.values_list("pk", "address")[:CLAIM_ATTEMPTS]:
+        sid = transaction.savepoint()
+        try:
+            claimed = Address.objects.filter(pk=pk, user__isnull=True).update(
+                user=user, label=label, is_primary=is_primary, pending_setaccount=True)
+        except IntegrityError:
+            transaction.savepoint_rollback(sid)
+            return Address.objects.get(user=user, label=label).address
+        transaction.savepoint_commit(sid)
+        if claimed:
+            owners.invalidate(address)
+            if conn is not None:
+                try:
+                    _setaccount(conn, address, user, label)
+                except (JSONRPCException, EnvironmentError):
+                    pass
+            return address
+    return None
+
+def _setaccount(conn, address, user, label):
+    conn.setaccount(address, util.getaccount(user, label))
+    # Unless the owner relabelled it meanwhile.
+    Address.objects.filter(address=address, label=label).update(pending_setaccount=False)
+
+def relabel(conn, shard):
+    """
+    Move the claimed addresses of *shard* from :const:`POOL_ACCOUNT` to their
+    owners' accounts. Returns the number of addresses moved.
+    """
+    moved = 0
+    pending = Address.objects.filter(pending_setaccount=True, shard=shard).select_related("user")
+    for address in pending:
+        _setaccount(conn, address.address, address.user, address.label)
+        moved += 1
+    return moved
+
+def refill(conn, shard, low, high, batch_size=100):
+    """
+    If fewer than *low* unclaimed addresses of *shard* are left, generate
+    enough to have *high* again. Returns the number of addresses added.
+    """
+    available = Address.objects.filter(user__isnull=True, moved_to__isnull=True, shard=shard).count()
+    if available >= low:
+        return 0
+    added = 0
+    while available + added < high:
+        with conn.batch() as batch:
+            results = [batch.getnewaddress(POOL_ACCOUNT)
+                       for i in xrange(min(batch_size, high - available - added))]
+        for result in results:
+            Address.objects.create(user=None, label="", address=result.get(), shard=shard)
+            added += 1
+    return added
@@ -0,0 +1,92 @@
+"""
+Base58Check encoding and decoding of bitcoin addresses, so they can be
+validated without asking bitcoind.
+"""
+import hashlib
+
+ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_VALUES = dict((c, i) for (i, c) in enumerate(ALPHABET))
+
+# Version byte, 160-bit hash and four checksum bytes.
+ADDRESS_LENGTH = 25
+
+# Version bytes of pay-to-pubkey-hash addresses.
+MAINNET = 0
+TESTNET = 111
+
+def b58encode(data):
+    """
+    Encode the byte string *data* in Base58. Each leading zero byte becomes
+    a ``1``.
+    """
+    n = long(data.encode('hex') or '0', 16)
+    digits = []
+    while n:
+        n, r = divmod(n, 58)
+        digits.append(ALPHABET[r])
+    zeros = len(data) - len(data.lstrip('\0'))
+    return '1' * zeros + ''.join(reversed(digits))
+
+def b58encode_check(payload):
+    """
+    Encode *payload* in Base58 with the four checksum bytes appended.
+    """
+    checksum = hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    return b58encode(payload + checksum)
+
+def b58decode(s):
+    """
+    Decode the Base58 string *s* into a byte string. Each leading ``1``
+    stands for a zero byte.
+
+    Raises :class:`ValueError` if *s* contains a character that is not in
+    the Base58 alphabet.
+    """
+    n = 0
+    try:
+        for c in s:
+            n = n * 58 + _VALUES[c]
+    except KeyError:
+        raise ValueError("Invalid Base58 character %r" % c)
+    if n:
+        digits = '%x' % n
+        data = ('0' * (len(digits) % 2) + digits).decode('hex')
+    else:
+        data = ''
+    zeros = len(s) - len(s.lstrip('1'))
+    return '\0' * zeros + data
+
+def b58decode_check(s):
+    """
+    Decode the Base58Check string *s* and verify its checksum, the first
+    four bytes of the double SHA-256 of the rest.
+
+    Returns the payload, version byte included. Raises :class:`ValueError` if
+    *s* is not valid Base58Check.
+    """
+    data = b58decode(s)
+    if len(data) < 4:
+        raise ValueError("Too short for Base58Check")
+    payload, checksum = data[:-4], data[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError("Bad Base58Check checksum")
+    return payload
+
+def address_version(address):
+    """
+    Returns the version byte of the bitcoin address *address*.
+
+    Raises :class:`ValueError` if *address* is not a well-formed address of
+    any version.
+    """
+    if not isinstance(address, basestring) or len(address) > 35:
+        raise ValueError("Not an address")
+    if isinstance(address, unicode):
+        try:
+            address = address.encode('ascii')
+        except UnicodeError:
+            raise ValueError("Invalid Base58 character")
+    payload = b58decode_check(address)
+    if len(payload) + 4 != ADDRESS_LENGTH:
+        raise ValueError("Wrong address length")
+    return ord(payload[0])
@@ -0,0 +1,9 @@
+"""
+Benchmarks for the bitcoind client library.
+
+Each module is a standalone script, run from the ``apps`` directory with
+``python -m bitcoind.benchmarks.<name> --help``. The client imports nothing
+from Django, so ``DJANGO_SETTINGS_MODULE`` need not be set. The exception is
+:mod:`~bitcoind.benchmarks.endpoint`, which the ``bitcoind_benchmark``
+management command runs against the JSON-RPC views.
+"""
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark of the JSON backends available to :mod:`bitcoind.codec` on a
+typical ``listtransactions`` JSON-RPC response.
+
+Usage::
+
+    python -m bitcoind.benchmarks.codec [-n TRANSACTIONS] [-r REPEAT]
+"""
+import sys
+import time
+from optparse import OptionParser
+
+from bitcoind import codec
+
+def payload(n):
+    """
+    Returns a ``listtransactions`` response with *n* transactions.
+    """
+    transactions = []
+    for i in xrange(n):
+        transactions.append({u"account": u"user%d+savings" % i, u"address": u"1BitcoinEaterAddressDontSendf59kuE",
+                             u"category": (u"send", u"receive")[i % 2], u"amount": 0.05 * i,
+                             u"fee": 0.0005, u"confirmations": i % 120, u"txid": u"%064x" % i,
+                             u"time": 1300000000 + i, u"message": u"payment %d" % i})
+    return {u"result": transactions, u"error": None, u"id": u"jsonrpc"}
+
+def timeit(func, arg, repeat):
+    """
+    Returns the best time of *repeat* calls of *func* with *arg*.
+    """
+    best = None
+    for i in xrange(repeat):
+        start = time.time()
+        func(arg)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-n", "--transactions", type="int", default=1000,
+                      help="transactions per payload [default: %default]")
+    parser.add_option("-r", "--repeat", type="int", default=20,
+                      help="repetitions per measurement [default: %default]")
+    options, args = parser.parse_args(argv)
+    obj = payload(options.transactions)
+    text = codec.dumps(obj)
+
+    print "loads: %s, dumps: %s" % (codec.loads_backend, codec.dumps_backend)
+    print "%-12s %12s %12s" % ("backend", "dumps (ms)", "loads (ms)")
+    for name in sorted(codec.BACKENDS):
+        loads, dumps = codec.BACKENDS[name]
+        encode = dumps and "%12.2f" % (1000 * timeit(dumps, obj, options.repeat)) or "%12s" % "-"
+        decode = loads and "%12.2f" % (1000 * timeit(loads, text, options.repeat)) or "%12s" % "-"
+        print "%-12s %s %s" % (name, encode, decode)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,65 @@
+"""
+Compare memory use and throughput of the slotted record types in
+:mod:`bitcoind.data` against the dictionary-backed :class:`~bitcoind.util.DStruct`.
+
+Usage::
+
+    python -m bitcoind.benchmarks.data [-n ROWS]
+
+Builds *ROWS* synthetic ``listtransactions`` rows, converts them to objects
+and exports them back to dictionaries, as the JSON views do.
+"""
+import sys
+import time
+from optparse import OptionParser
+
+from bitcoind.data import TransactionInfo
+from bitcoind.util import DStruct
+
+class DStructTransactionInfo(DStruct):
+    pass
+
+def rows(n):
+    """
+    Returns *n* synthetic ``listtransactions`` rows.
+    """
+    return [{u"account": u"user%d+" % (i % 1000), u"address": u"1BitcoinEaterAddressDontSendf59kuE",
+             u"category": u"receive", u"amount": 0.01 * i, u"confirmations": i % 120,
+             u"txid": u"%064x" % i, u"time": 1300000000 + i} for i in xrange(n)]
+
+def footprint(obj):
+    """
+    Returns the bytes used by *obj* and its attribute dictionary, if any.
+    """
+    size = sys.getsizeof(obj)
+    for name in ("__dict__", "_extra"):
+        try:
+            size += sys.getsizeof(object.__getattribute__(obj, name))
+        except AttributeError:
+            pass
+    return size
+
+def run(cls, data, export):
+    start = time.time()
+    objects = [cls(**row) for row in data]
+    built = time.time()
+    exported = [export(obj) for obj in objects]
+    done = time.time()
+    size = sum(footprint(obj) for obj in objects)
+    return built - start, done - built, size
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-n", "--rows", type="int", default=100000,
+                      help="number of synthetic rows [default: %default]")
+    options, args = parser.parse_args(argv)
+    data = rows(options.rows)
+
+    print "%-10s %12s %12s %14s" % ("", "build (s)", "export (s)", "bytes/row")
+    for (name, cls, export) in (("DStruct", DStructTransactionInfo, lambda o: o.__dict__),
+                                ("Record", TransactionInfo, lambda o: o._asdict())):
+        build, exported, size = run(cls, data, export)
+        print "%-10s %12.3f %12.3f %14.1f" % (name, build, exported, float(size) / options.rows)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
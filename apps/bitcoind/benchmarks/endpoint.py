@@ -0,0 +1,207 @@
+"""
+End-to-end benchmark of the JSON-RPC methods in :mod:`bitcoind.views`,
+called through the Django test client against a
+:class:`~bitcoind.fakebitcoind.FakeBitcoind`.
+
+Run it with the ``bitcoind_benchmark`` management command, which sets up a
+test database; this module holds the scenarios and the bookkeeping.
+
+For every method it reports requests per second, median and 99th
+percentile latency, and the database queries and bitcoind RPCs (HTTP
+round trips, so a batch counts once) made per request. The last two do
+not depend on the machine, so any increase between two runs is reported
+as a regression by :func:`compare`.
+"""
+import base64
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.client import Client
+
+from jsonrpc import jsonrpc_site
+
+from bitcoind.codec import dumps, loads
+from bitcoind.connection import BitcoinConnection
+from bitcoind.fakebitcoind import FakeBitcoind, Wallet
+from bitcoind.metrics import metrics
+from bitcoind.models import Address
+from bitcoind.sharding import ShardSet
+
+# Name format of the benchmark users, and of their default accounts in the
+# fake wallet.
+USERNAME = "bench%d"
+
+def scenarios(fixture):
+    """
+    Returns a dictionary mapping each method name to a function of the
+    request number that returns the params for that request.
+    """
+    mine, savings, other = fixture["mine"], fixture["savings"], fixture["other"]
+    return {
+        "getblockcount": lambda i: [],
+        "getblocknumber": lambda i: [],
+        "getconnectioncount": lambda i: [],
+        "getdifficulty": lambda i: [],
+        "getinfo": lambda i: [],
+        "getnewaddress": lambda i: ["savings"],
+        "getaccountaddress": lambda i: [""],
+        "setaccount": lambda i: [savings, "savings%d" % i],
+        "getaccount": lambda i: [mine],
+        "getaddressesbyaccount": lambda i: [""],
+        "sendtoaddress": lambda i: [other, 0.0001],
+        "getreceivedbyaddress": lambda i: [mine],
+        "getreceivedbyaccount": lambda i: [""],
+        "listreceivedbyaddress": lambda i: [1, True],
+        "listreceivedbyaccount": lambda i: [1, True],
+        "listaccounts": lambda i: [],
+        "listtransactions": lambda i: ["*", 10],
+        "validateaddress": lambda i: [other],
+        "validateaddresses": lambda i: [[mine, other, "1NotAnAddress"]],
+        "getbalance": lambda i: [""],
+        "move": lambda i: ["", "savings", 0.0001],
+        "sendfrom": lambda i: ["", other, 0.0001],
+        "getrpcmetrics": lambda i: [],
+    }
+
+def start_bitcoind(users, latency=0):
+    """
+    Start a fake bitcoind seeded with an account per benchmark user and
+    point :mod:`bitcoind.views` at it. Returns the server.
+    """
+    from bitcoind import views
+
+    wallet = Wallet(seed_accounts=users, seed_format=USERNAME + "+", seed_balance=100)
+    server = FakeBitcoind(("127.0.0.1", 0), wallet, latency=latency)
+    server.start()
+    host, port = server.server_address
+    views.shards.build = lambda config: ShardSet([BitcoinConnection("user", "password", host, port)])
+    views.shards.reload()
+    return server
+
+def create_fixture(wallet, users):
+    """
+    Create the benchmark users, each with a default and a ``savings``
+    address, and return the addresses used by the scenarios. The first
+    user makes all the requests.
+    """
+    for n in xrange(users):
+        user = User(username=USERNAME % n, is_staff=(n == 0))
+        user.set_password("bench")
+        user.save()
+        account = "%s+" % user.username
+        Address.objects.create(user=user, label="", address=wallet.getaccountaddress(account), is_primary=True)
+        Address.objects.create(user=user, label="savings", address=wallet.getnewaddress(account + "savings"))
+    first = User.objects.get(username=USERNAME % 0)
+    return {
+        "mine": Address.objects.get(user=first, label="").address,
+        "savings": Address.objects.get(user=first, label="savings").address,
+        "other": Address.objects.get(user__username=USERNAME % (users > 1 and 1 or 0), label="").address,
+    }
+
+def _rpc_count():
+    return sum(s["calls"] for s in metrics.snapshot().itervalues())
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def measure(method, params, requests, warmup=1):
+    """
+    Call *method* *requests* times, as the first benchmark user, and return
+    its statistics as a dictionary.
+    """
+    client = Client()
+    client.login(username=USERNAME % 0, password="bench")
+    auth = "Basic " + base64.b64encode("%s:bench" % (USERNAME % 0))
+    url = reverse("jsonrpc_mountpoint")
+    debug, settings.DEBUG = settings.DEBUG, True
+    try:
+        times, queries, rpcs, errors = [], 0, 0, 0
+        for i in xrange(warmup + requests):
+            body = dumps({"method": method, "params": params(i), "id": i})
+            del connection.queries[:]
+            rpc_before = _rpc_count()
+            start = time.time()
+            response = client.post(url, body, content_type="application/json", HTTP_AUTHORIZATION=auth)
+            elapsed = time.time() - start
+            if i < warmup:
+                continue
+            times.append(elapsed)
+            queries += len(connection.queries)
+            rpcs += _rpc_count() - rpc_before
+            if response.status_code != 200 or loads(response.content).get("error"):
+                errors += 1
+    finally:
+        settings.DEBUG = debug
+    times.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": requests / sum(times),
+        "p50_ms": 1000 * _percentile(times, 0.5),
+        "p99_ms": 1000 * _percentile(times, 0.99),
+        "queries_per_call": float(queries) / requests,
+        "rpcs_per_call": float(rpcs) / requests,
+    }
+
+def run(users=100, requests=200, latency=0, methods=None):
+    """
+    Benchmark every method registered by :mod:`bitcoind.views`, or only
+    *methods*, and return the results. Must run in a test database.
+    """
+    server = start_bitcoind(users, latency)
+    try:
+        plan = scenarios(create_fixture(server.wallet, users))
+        registered = sorted(name for name in jsonrpc_site.urls if name != "system.describe")
+        results = {}
+        for method in registered:
+            if method in plan and (not methods or method in methods):
+                results[method] = measure(method, plan[method], requests)
+        return {
+            "created": time.time(),
+            "users": users,
+            "latency_ms": latency * 1000,
+            "methods": results,
+            # Registered methods nobody wrote a scenario for.
+            "unexercised": [m for m in registered if m not in plan],
+        }
+    finally:
+        from bitcoind import views
+        for conn in views.shards:
+            conn.pool.clear()
+        server.stop()
+
+def compare(old, new, threshold=0.2):
+    """
+    Returns a list of regressions of the run *new* against the run *old*:
+    more queries, RPCs or errors per call, or a median latency more than
+    *threshold* (a fraction) higher.
+    """
+    regressions = []
+    for (method, after) in sorted(new["methods"].iteritems()):
+        before = old["methods"].get(method)
+        if before is None:
+            continue
+        for key in ("rpcs_per_call", "queries_per_call"):
+            if after[key] > before[key] + 0.01:
+                regressions.append("%s: %s went from %.2f to %.2f" % (method, key, before[key], after[key]))
+        if after["errors"] > before["errors"]:
+            regressions.append("%s: errors went from %d to %d" % (method, before["errors"], after["errors"]))
+        if after["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append("%s: p50 went from %.2fms to %.2fms" % (method, before["p50_ms"], after["p50_ms"]))
+    return regressions
+
+def report(results):
+    """
+    Returns the results of :func:`run` as a table.
+    """
+    lines = ["%-24s %8s %9s %9s %8s %8s %6s" % ("method", "req/s", "p50 ms", "p99 ms", "queries", "rpcs", "errors")]
+    for (method, r) in sorted(results["methods"].iteritems()):
+        lines.append("%-24s %8.1f %9.2f %9.2f %8.2f %8.2f %6d" % (
+            method, r["requests_per_second"], r["p50_ms"], r["p99_ms"],
+            r["queries_per_call"], r["rpcs_per_call"], r["errors"]))
+    if results["unexercised"]:
+        lines.append("No scenario for: %s" % ", ".join(results["unexercised"]))
+    return "\n".join(lines)
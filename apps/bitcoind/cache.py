@@ -0,0 +1,364 @@
+"""
+Caches for bitcoind results that stay valid until the next block, and a
+least-recently-used cache for database lookups.
+"""
+import threading
+import time
+
+from django.core.cache import cache as shared_cache
+
+class HeightProbe(object):
+    """
+    A rate-limited view of the server's current block height.
+    
+    The height is fetched with ``getblockcount`` at most once every *interval*
+    seconds, so it is cheap enough to consult on every request.
+    """
+    def __init__(self, conn, interval=1.0):
+        self.conn = conn
+        self.interval = interval
+        self._height = None
+        self._checked = 0
+
+    def height(self):
+        """
+        Returns the most recently seen block height.
+        """
+        now = time.time()
+        if self._height is None or now - self._checked >= self.interval:
+            self._height = self.conn.getblockcount()
+            self._checked = now
+        return self._height
+
+class BlockCache(object):
+    """
+    Caches values per key for as long as the block height reported by *probe*
+    stays the same. All entries are dropped when a new block is seen.
+    
+    If *ttl* is given, entries also expire after that many seconds, for values
+    that can change between blocks.
+    """
+    def __init__(self, probe, ttl=None):
+        self.probe = probe
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._height = None
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """
+        Returns the cached value for *key*, calling *fetch* to compute it if it
+        is not cached for the current block.
+        """
+        height = self.probe.height()
+        now = time.time()
+        self._lock.acquire()
+        try:
+            if height != self._height:
+                self._height = height
+                self._values = {}
+            elif key in self._values:
+                (value, expires) = self._values[key]
+                if expires is None or now < expires:
+                    self.hits += 1
+                    return value
+            self.misses += 1
+        finally:
+            self._lock.release()
+        
+        value = fetch()
+        if self.ttl is None:
+            expires = None
+        else:
+            expires = now + self.ttl
+        self._lock.acquire()
+        try:
+            if height == self._height:
+                self._values[key] = (value, expires)
+        finally:
+            self._lock.release()
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Drop the entry for *key*, or all entries if no key is given.
+        """
+        self._lock.acquire()
+        try:
+            if key is None:
+                self._values = {}
+            else:
+                self._values.pop(key, None)
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        """
+        Returns a dictionary with the cache's hit and miss counts and size.
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self._values), "height": self._height}
+
+class AccountCache(BlockCache):
+    """
+    A :class:`BlockCache` for per-account reads such as balances. Keys are
+    tuples whose first item is the ``"username+label"`` account name, so a
+    write can drop exactly the entries of the accounts it touched.
+    """
+    def invalidate_accounts(self, *accounts):
+        """
+        Drop every entry belonging to one of *accounts*.
+        """
+        self._lock.acquire()
+        try:
+            for key in self._values.keys():
+                if key[0] in accounts:
+                    del self._values[key]
+        finally:
+            self._lock.release()
+
+class ChainStateCache(object):
+    """
+    Answers the read-only chain-state methods of a
+    :class:`~bitcoin.connection.BitcoinConnection` from a :class:`BlockCache`.
+    Any other attribute is looked up on the connection itself.
+    
+    Entries are dropped as soon as *probe* sees a new block, and expire after
+    *ttl* seconds since peer counts and balances change between blocks.
+    """
+    methods = ("getblockcount", "getblocknumber", "getdifficulty",
+               "getconnectioncount", "getinfo")
+
+    def __init__(self, conn, probe=None, ttl=5):
+        if probe is None:
+            probe = HeightProbe(conn)
+        self.conn = conn
+        self.cache = BlockCache(probe, ttl)
+
+    def __getattr__(self, name):
+        attr = getattr(self.conn, name)
+        if name in self.methods:
+            return lambda: self.cache.get(name, attr)
+        return attr
+
+class LRUCache(object):
+    """
+    Caches at most *size* values, dropping the least recently used one to
+    make room for another. Missing values are cached too, as :const:`None`.
+    
+    If *generation_key* is given, invalidations reach the other processes
+    through Django's cache, which they check at most every *interval*
+    seconds. Invalidating a key appends it to a log of the last *log_size*
+    changed keys, and the other processes drop just those entries.
+    Invalidating everything increments a counter under *generation_key*,
+    and the other processes drop all their entries when they see it change,
+    as they do when they fell too far behind the log. This needs a cache
+    backend the processes share, such as memcached.
+    
+    If *ttl* is given, entries also expire after that many seconds, which
+    bounds how stale they get without a shared backend.
+    """
+    # Seconds the shared counters and log entries are kept.
+    shared_timeout = 86400
+
+    def __init__(self, size=10000, generation_key=None, interval=1.0, ttl=None, log_size=1000):
+        self.size = size
+        self.generation_key = generation_key
+        self.interval = interval
+        self.ttl = ttl
+        self.log_size = log_size
+        self.hits = 0
+        self.misses = 0
+        # Doubly linked list of [prev, next, key, value, expires], most
+        # recently used first, and its links by key.
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None, None]
+        self._links = {}
+        # Incremented by every invalidation, so a fetch that raced one
+        # doesn't cache what it read.
+        self._version = 0
+        # The shared generation, and the position in the shared log of
+        # changed keys, this process is up to date with.
+        self._generation = None
+        self._position = None
+        self._checked = 0
+        self._lock = threading.Lock()
+
+    def _clear(self):
+        self._root[:] = [self._root, self._root, None, None, None]
+        self._links = {}
+        self._version += 1
+
+    def _unlink(self, link):
+        prev, next = link[0], link[1]
+        prev[1] = next
+        next[0] = prev
+
+    def _push(self, link):
+        first = self._root[1]
+        link[0], link[1] = self._root, first
+        first[0] = self._root[1] = link
+
+    def _drop(self, key):
+        link = self._links.pop(key, None)
+        if link is not None:
+            self._unlink(link)
+        self._version += 1
+
+    def _log_key(self, position):
+        return "%s.log.%d" % (self.generation_key, position)
+
+    def _changes(self, generation, position):
+        """
+        Returns the keys changed by other processes since this one last
+        checked, or :const:`None` if it has to drop everything.
+        """
+        # An expired counter reads as a change too.
+        if generation != self._generation:
+            return None
+        if position == self._position:
+            return []
+        if position is None or self._position is None or not 0 < position - self._position <= self.log_size:
+            return None
+        names = [self._log_key(p) for p in xrange(self._position + 1, position + 1)]
+        changed = shared_cache.get_many(names)
+        if len(changed) < len(names):
+            # Expired, or not written yet.
+            return None
+        return changed.values()
+
+    def _check_generation(self):
+        now = time.time()
+        if self.generation_key is None or now - self._checked < self.interval:
+            return
+        counters = shared_cache.get_many([self.generation_key, self.generation_key + ".log"])
+        generation = counters.get(self.generation_key)
+        position = counters.get(self.generation_key + ".log", 0)
+        changed = self._changes(generation, position)
+        self._lock.acquire()
+        try:
+            self._checked = now
+            self._generation = generation
+            self._position = position
+            if changed is None:
+                self._clear()
+            else:
+                for key in changed:
+                    self._drop(key)
+        finally:
+            self._lock.release()
+
+    def _incr(self, name):
+        """
+        Increments the shared counter *name* and returns its new value, or
+        :const:`None` if that failed.
+        """
+        for attempt in range(2):
+            try:
+                return shared_cache.incr(name)
+            except ValueError:
+                if shared_cache.add(name, 1, self.shared_timeout):
+                    return 1
+        return None
+
+    def get_many(self, keys, fetch):
+        """
+        Returns a dictionary with the value of each of *keys*. Keys that are
+        not cached are passed as a list to *fetch*, which returns a
+        dictionary of their values; those it leaves out are :const:`None`.
+        """
+        self._check_generation()
+        now = time.time()
+        result = {}
+        missing = []
+        self._lock.acquire()
+        try:
+            for key in set(keys):
+                link = self._links.get(key)
+                if link is not None and link[4] is not None and now >= link[4]:
+                    self._unlink(link)
+                    del self._links[key]
+                    link = None
+                if link is None:
+                    missing.append(key)
+                    continue
+                self._unlink(link)
+                self._push(link)
+                result[key] = link[3]
+            self.hits += len(result)
+            self.misses += len(missing)
+            version = self._version
+        finally:
+            self._lock.release()
+        if not missing:
+            return result
+
+        fetched = fetch(missing)
+        self._lock.acquire()
+        try:
+            for key in missing:
+                value = result[key] = fetched.get(key)
+                if version != self._version or key in self._links:
+                    continue
+                link = [None, None, key, value, self.ttl is not None and now + self.ttl or None]
+                self._push(link)
+                self._links[key] = link
+                if len(self._links) > self.size:
+                    oldest = self._root[0]
+                    self._unlink(oldest)
+                    del self._links[oldest[2]]
+        finally:
+            self._lock.release()
+        return result
+
+    def get(self, key, fetch):
+        """
+        Returns the value of *key*, like :meth:`get_many`.
+        """
+        return self.get_many([key], fetch)[key]
+
+    def invalidate(self, key=None):
+        """
+        Drop the entry for *key*, or all entries if no key is given, here and
+        in the other processes sharing the *generation_key*.
+        """
+        self._lock.acquire()
+        try:
+            if key is None:
+                self._clear()
+            else:
+                self._drop(key)
+        finally:
+            self._lock.release()
+        if self.generation_key is None:
+            return
+        if key is None:
+            generation = self._incr(self.generation_key)
+            # No need to drop everything again for our own change, unless
+            # another process made one in between.
+            self._lock.acquire()
+            try:
+                if generation is not None and generation == (self._generation or 0) + 1:
+                    self._generation = generation
+            finally:
+                self._lock.release()
+            return
+        position = self._incr(self.generation_key + ".log")
+        if position is None:
+            return
+        shared_cache.set(self._log_key(position), key, self.shared_timeout)
+        self._lock.acquire()
+        try:
+            if self._position is not None and position == self._position + 1:
+                self._position = position
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        """
+        Returns a dictionary with the cache's hit and miss counts and size.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._links),
+                "capacity": self.size}
@@ -0,0 +1,90 @@
+"""
+JSON codec shared by the bitcoind client and the JSON-RPC site.
+
+It does not import Django, so the client can be used without settings;
+:mod:`jsonrpc._json` re-exports it.
+
+``loads`` and ``dumps`` use the fastest backend that is installed and
+behaves like the standard library:
+
+  loads   ujson (with precise floats), simplejson with C speedups, json
+  dumps   simplejson with C speedups, json
+
+``dumps`` takes an encoder class, such as ``DjangoJSONEncoder``, whose
+``default`` method handles the types the backend cannot encode itself.
+Decimals are always handed to that method rather than encoded as numbers,
+whichever backend is used.
+"""
+try:
+    import json
+except (ImportError, NameError):
+    try:
+        from django.utils import simplejson as json
+    except (ImportError, NameError):
+        import simplejson as json
+try:
+    json.dumps
+    json.loads
+except AttributeError:
+    try: # monkey patching for python-json package
+        json.dumps = lambda obj, *args, **kwargs: json.write(obj)
+        json.loads = lambda str, *args, **kwargs: json.read(str)
+    except AttributeError:
+        raise ImportError('Could not load an apropriate JSON library '
+                          'currently supported are simplejson, '
+                          'python2.6 json and python-json')
+
+# Installed backends, by name, as (loads, dumps) pairs; either may be None
+# if the backend is only suitable for one direction.
+BACKENDS = {'json': (json.loads, json.dumps)}
+LOADS_PREFERENCE = ['ujson', 'simplejson', 'json']
+DUMPS_PREFERENCE = ['simplejson', 'json']
+
+try:
+    import simplejson
+    import simplejson._speedups
+except ImportError:
+    pass
+else:
+    def _simplejson_dumps(obj, **kw):
+        return simplejson.dumps(obj, use_decimal=False, **kw)
+    BACKENDS['simplejson'] = (simplejson.loads, _simplejson_dumps)
+
+try:
+    import ujson
+    ujson.loads('1.1', precise_float=True)
+except (ImportError, TypeError):
+    pass
+else:
+    def _ujson_loads(s):
+        return ujson.loads(s, precise_float=True)
+    BACKENDS['ujson'] = (_ujson_loads, None)
+
+def _pick(preference, index):
+    for name in preference:
+        if name in BACKENDS and BACKENDS[name][index] is not None:
+            return name
+loads_backend = _pick(LOADS_PREFERENCE, 0)
+dumps_backend = _pick(DUMPS_PREFERENCE, 1)
+
+loads = BACKENDS[loads_backend][0]
+_dumps = BACKENDS[dumps_backend][1]
+
+if 'simplejson' in BACKENDS:
+    JSONDecoder = simplejson.JSONDecoder
+else:
+    JSONDecoder = json.JSONDecoder
+
+_defaults = {}
+def _default_for(cls):
+    "Returns the ``default`` method of a cached instance of encoder class ``cls``."
+    try:
+        return _defaults[cls]
+    except KeyError:
+        default = _defaults[cls] = cls().default
+        return default
+
+def dumps(obj, cls=None, **kw):
+    if cls is not None:
+        kw['default'] = _default_for(cls)
+    return _dumps(obj, **kw)
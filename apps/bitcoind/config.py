@@ -51,6 +51,114 @@ def read_default_config():
         return read_config_file(os.path.join(home, '.bitcoin/bitcoin.conf'))
     except (IOError,ValueError):
         return read_config_file(os.path.join(home, 'Bitcoin/bitcoin.conf'))
-        
 
+def default_config_files():
+    """
+    Returns the locations of the current user's bitcoin configuration file,
+    in the order :func:`read_default_config` tries them.
+    """
+    import os
+    home = os.getenv("HOME")
+    if not home:
+        raise IOError("Home directory not defined, don't know where to look for config file")
+    return [os.path.join(home, '.bitcoin/bitcoin.conf'), os.path.join(home, 'Bitcoin/bitcoin.conf')]
+
+class ConfigFile(object):
+    """
+    A bitcoin configuration file that is parsed once and read again only
+    after its modification time changes.
+
+    Arguments to constructor:
+
+    - *filenames* -- Candidate locations; the first one that can be read is
+      used. Defaults to :func:`default_config_files`.
+    - *check_interval* -- Seconds between checks of the modification time.
+    """
+    def __init__(self, filenames=None, check_interval=1.0):
+        self.filenames = filenames
+        self.check_interval = check_interval
+        self.filename = None
+        self._cfg = None
+        # Modification times of the candidates when last read, None for
+        # missing ones.
+        self._mtimes = None
+        self._checked = 0
+
+    def _candidates(self):
+        if self.filenames is None:
+            return default_config_files()
+        return self.filenames
+
+    def _stat(self):
+        import os
+        mtimes = []
+        for filename in self._candidates():
+            try:
+                mtimes.append(os.stat(filename).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def read(self):
+        """
+        Returns the configuration as a dictionary. Raises :const:`IOError` or
+        :const:`ValueError` like :func:`read_config_file` if no file can be read.
+        """
+        if self._cfg is None:
+            # Even if no file can be read, changed() notices when one is fixed.
+            self._mtimes = self._stat()
+            error = IOError("No configuration file given")
+            for filename in self._candidates():
+                try:
+                    self._cfg = read_config_file(filename)
+                    self.filename = filename
+                    break
+                except (IOError, ValueError), e:
+                    error = e
+            else:
+                raise error
+        return self._cfg
+
+    def changed(self):
+        """
+        Returns :const:`True` if any of the candidate files was created,
+        modified or removed since the last :meth:`read`, in which case the
+        next :meth:`read` parses them again. The modification times are
+        looked at most once per *check_interval*.
+        """
+        import time
+        if self._mtimes is None:
+            return False
+        now = time.time()
+        if now - self._checked < self.check_interval:
+            return False
+        self._checked = now
+        if self._stat() != self._mtimes:
+            self.invalidate()
+            return True
+        return False
+
+    def invalidate(self):
+        """
+        Parse the file again on the next :meth:`read`.
+        """
+        self._cfg = None
+
+def credentials_from_settings(config):
+    """
+    Returns the :func:`~bitcoind.connect_to_remote` arguments for the local
+    bitcoind: the ``BITCOIND_USER``, ``BITCOIND_PASSWORD``, ``BITCOIND_HOST``
+    and ``BITCOIND_PORT`` Django settings if a user is set, otherwise the
+    ``rpcuser``, ``rpcpassword`` and ``rpcport`` of the :class:`ConfigFile`
+    *config*.
+    """
+    from django.conf import settings
+
+    if getattr(settings, "BITCOIND_USER", None):
+        return dict(user=settings.BITCOIND_USER, password=getattr(settings, "BITCOIND_PASSWORD", ""),
+                    host=getattr(settings, "BITCOIND_HOST", "localhost"),
+                    port=int(getattr(settings, "BITCOIND_PORT", 8332)))
+    cfg = config.read()
+    return dict(user=cfg['rpcuser'], password=cfg['rpcpassword'], host='localhost',
+                port=int(cfg.get('rpcport', '8332')))
 
@@ -21,9 +21,109 @@
 Connect to Bitcoin server via JSON-RPC.
 """
 from bitcoind.proxy import JSONRPCException, ServiceProxy
+from bitcoind.singleflight import SingleFlight
+from bitcoind.pool import HTTPConnectionPool
 from bitcoind.exceptions import _wrap_exception
 from bitcoind.data import ServerInfo,AccountInfo,AddressInfo,TransactionInfo,AddressValidation,WorkItem
 
+# Conversions applied to the raw results of batched calls, mirroring
+# what the corresponding BitcoinConnection methods return.
+_batch_converters = {
+    'getinfo': lambda r: ServerInfo(**r),
+    'listreceivedbyaddress': lambda r: [AddressInfo(**x) for x in r],
+    'listreceivedbyaccount': lambda r: [AccountInfo(**x) for x in r],
+    'listtransactions': lambda r: [TransactionInfo(**x) for x in r],
+    'validateaddress': lambda r: AddressValidation(**r),
+}
+
+class BatchResult(object):
+    """
+    Placeholder for the result of a call queued on a :class:`Batch`.
+    
+    The value is available through :meth:`get` once the batch has been executed.
+    """
+    def __init__(self, method):
+        self.method = method
+        self.done = False
+        self._value = None
+        self._error = None
+
+    def _set(self, value, error):
+        self.done = True
+        if error is None:
+            convert = _batch_converters.get(self.method)
+            if convert is not None:
+                value = convert(value)
+        self._value = value
+        self._error = error
+
+    def get(self):
+        """
+        Returns the result of the call, or raises the
+        :class:`~bitcoin.exceptions.BitcoinException` the server returned for it.
+        """
+        if not self.done:
+            raise RuntimeError("Batch has not been executed yet")
+        if self._error is not None:
+            raise _wrap_exception(self._error)
+        return self._value
+
+class Batch(object):
+    """
+    Collects bitcoin API calls and sends them to the server as a single
+    JSON-RPC batch request, in one HTTP round trip.
+    
+    Every call made on a batch returns a :class:`BatchResult`. The batch is sent
+    when the ``with`` block exits, or when :meth:`execute` is called::
+    
+        with conn.batch() as b:
+            balance = b.getbalance(account)
+            received = b.getreceivedbyaccount(account, 1)
+        print balance.get(), received.get()
+    
+    Arguments are passed to bitcoind as given; unlike the
+    :class:`BitcoinConnection` methods, optional arguments are not filled in.
+    Requires a bitcoind that accepts JSON-RPC 2.0 batch requests.
+    """
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._calls = []
+        self._results = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        def call(*args):
+            result = BatchResult(name)
+            self._calls.append((name, list(args)))
+            self._results.append(result)
+            return result
+        return call
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if type is None:
+            self.execute()
+        return False
+
+    def execute(self):
+        """
+        Send all queued calls and return their :class:`BatchResult` objects, in
+        the order the calls were made. Errors for individual calls are raised
+        by :meth:`BatchResult.get`.
+        """
+        calls, results = self._calls, self._results
+        self._calls, self._results = [], []
+        try:
+            replies = self._proxy._batch(calls)
+        except JSONRPCException,e:
+            raise _wrap_exception(e.error)
+        for (result, (value, error)) in zip(results, replies):
+            result._set(value, error)
+        return results
+
 class BitcoinConnection(object):
     """
     A BitcoinConnection object defines a connection to a bitcoin server.
@@ -37,19 +137,36 @@ class BitcoinConnection(object):
     - *password* -- Authentication password.
     - *host* -- Bitcoin JSON-RPC host.
     - *port* -- Bitcoin JSON-RPC port.
+    - *pool_size* -- Number of idle keep-alive HTTP connections to keep open.
+    - *idle_timeout* -- Seconds after which an idle HTTP connection is closed.
+    - *coalesce* -- Let identical concurrent read-only calls share one request.
+    - *timeouts* -- Seconds each method may take, by name, instead of
+      :const:`bitcoind.proxy.TIMEOUTS`. Calls also stop at the deadline of the
+      JSON-RPC request being served, see :mod:`bitcoind.deadline`.
     """
-    def __init__(self, user, password, host='localhost', port=8332):
+    def __init__(self, user, password, host='localhost', port=8332,
+                 pool_size=4, idle_timeout=30, coalesce=True, timeouts=None):
         """
         Create a new bitcoin server connection.
         """
         url = 'http://%s:%s@%s:%s/' % (
             user, password, host, port
             )
+        self.pool = HTTPConnectionPool(url, maxsize=pool_size, idle_timeout=idle_timeout)
         try:
-            self.proxy = ServiceProxy(url)
+            self.proxy = ServiceProxy(url, pool=self.pool,
+                                      singleflight=coalesce and SingleFlight() or None,
+                                      timeouts=timeouts)
         except JSONRPCException,e:
             raise _wrap_exception(e.error)
 
+    def batch(self):
+        """
+        Returns a new :class:`Batch` that sends the calls made on it to the
+        server in a single request.
+        """
+        return Batch(self.proxy)
+
     def stop(self):
         """
         Stop bitcoin server.
@@ -281,7 +398,19 @@ class BitcoinConnection(object):
 
         """
         try:
-            return [AddressInfo(*x) for x in self.proxy.listreceivedbyaddress(minconf, includeempty)]
+            return [AddressInfo(**x) for x in self.proxy.listreceivedbyaddress(minconf, includeempty)]
+        except JSONRPCException,e:
+            raise _wrap_exception(e.error)
+        
+    def iterlistreceivedbyaddress(self, minconf=1, includeempty=False):
+        """
+        Like :meth:`listreceivedbyaddress`, but returns an iterator that decodes
+        the addresses one at a time as the response arrives, so memory use does
+        not grow with the size of the wallet.
+        """
+        try:
+            for x in self.proxy.listreceivedbyaddress._stream(minconf, includeempty):
+                yield AddressInfo(**x)
         except JSONRPCException,e:
             raise _wrap_exception(e.error)
         
@@ -302,7 +431,21 @@ class BitcoinConnection(object):
         except JSONRPCException,e:
             raise _wrap_exception(e.error)
 
-    def listtransactions(self, account, count=10):
+    def listaccounts(self, minconf=1):
+        """
+        Returns a dictionary mapping every account name in the wallet to its balance.
+        
+        Arguments:
+        
+        - *minconf* -- Minimum number of confirmations before payments are included.
+
+        """
+        try:
+            return self.proxy.listaccounts(minconf)
+        except JSONRPCException,e:
+            raise _wrap_exception(e.error)
+
+    def listtransactions(self, account, count=10, from_=0):
         """
         Returns a list of the last transactions for an account.
         
@@ -312,11 +455,25 @@ class BitcoinConnection(object):
         
         - *minconf* -- Minimum number of confirmations before payments are included.
         - *count* -- Number of transactions to return.
+        - *from_* -- Number of most recent transactions to skip.
 
         """
+        params = from_ and (account, count, from_) or (account, count)
         try:
             return [TransactionInfo(**x) for x in 
-                 self.proxy.listtransactions(account, count)]
+                 self.proxy.listtransactions(*params)]
+        except JSONRPCException,e:
+            raise _wrap_exception(e.error)
+
+    def iterlisttransactions(self, account, count=10):
+        """
+        Like :meth:`listtransactions`, but returns an iterator that decodes the
+        transactions one at a time as the response arrives, so memory use does
+        not grow with *count*.
+        """
+        try:
+            for x in self.proxy.listtransactions._stream(account, count):
+                yield TransactionInfo(**x)
         except JSONRPCException,e:
             raise _wrap_exception(e.error)
 
@@ -349,19 +506,20 @@ class BitcoinConnection(object):
         except JSONRPCException,e:
             raise _wrap_exception(e.error)
         
-    def getbalance(self, account=None):
+    def getbalance(self, account=None, minconf=1):
         """
         Get the current balance, either for an account or the total server balance.
         
         Arguments:
         - *account* -- If this parameter is specified, returns the balance in the account.
+        - *minconf* -- Minimum number of confirmations of the payments counted in an account's balance.
 
         """
         try:
             if account is None:
                 return self.proxy.getbalance()
             else:
-                return self.proxy.getbalance(account)
+                return self.proxy.getbalance(account, minconf)
         except JSONRPCException,e:
             raise _wrap_exception(e.error)
         
@@ -20,9 +20,9 @@
 """
 Bitcoin RPC service, data objects.
 """
-from bitcoind.util import DStruct
+from bitcoind.util import Record
 
-class ServerInfo(DStruct):
+class ServerInfo(Record):
     """
     Information object returned by :func:`~bitcoin.connection.BitcoinConnection.getinfo`.
     
@@ -53,8 +53,11 @@ class ServerInfo(DStruct):
     - *generate* -- True if generation enabled, False if not.
     
     """
+    __slots__ = _fields = ('errors', 'blocks', 'paytxfee', 'keypoololdest', 'genproclimit',
+                           'connections', 'difficulty', 'testnet', 'version', 'proxy',
+                           'hashespersec', 'balance', 'generate')
 
-class AccountInfo(DStruct):
+class AccountInfo(Record):
     """
     Information object returned by :func:`~bitcoin.connection.BitcoinConnection.listreceivedbyaccount`.
     
@@ -65,8 +68,9 @@ class AccountInfo(DStruct):
     - *confirmations* -- Number of confirmations of the most recent transaction included.
     
     """
+    __slots__ = _fields = ('account', 'amount', 'confirmations')
 
-class AddressInfo(DStruct):
+class AddressInfo(Record):
     """
     Information object returned by :func:`~bitcoin.connection.BitcoinConnection.listreceivedbyaddress`.
     
@@ -79,11 +83,16 @@ class AddressInfo(DStruct):
     - *confirmations* -- Number of confirmations of the most recent transaction included.
     
     """
+    __slots__ = _fields = ('address', 'account', 'amount', 'confirmations')
 
-class TransactionInfo(DStruct):
+class TransactionInfo(Record):
     """
     Information object returned by :func:`~bitcoin.connection.BitcoinConnection.listtransactions`.
     
+    - *account* -- account the transaction belongs to.
+    
+    - *address* -- bitcoin address of the transaction (only for send/receive).
+    
     - *category* -- will be generate, send, receive, or move.
     
     - *amount* -- amount of transaction.
@@ -99,9 +108,15 @@ class TransactionInfo(DStruct):
     - *message* -- message associated with transaction (only for send).
     
     - *to* -- message-to associated with transaction (only for send).
+    
+    - *time* -- time of the transaction, in seconds since the epoch.
+    
+    - *comment* -- comment associated with transaction (only for move).
     """
+    __slots__ = _fields = ('account', 'address', 'category', 'amount', 'fee', 'confirmations',
+                           'txid', 'time', 'otheraccount', 'message', 'to', 'comment')
 
-class AddressValidation(DStruct):
+class AddressValidation(Record):
     """
     Information object returned by :func:`~bitcoin.connection.BitcoinConnection.validateaddress`.
     
@@ -112,8 +127,9 @@ class AddressValidation(DStruct):
     - *address* -- Bitcoin address.
 
     """
+    __slots__ = _fields = ('isvalid', 'ismine', 'address')
 
-class WorkItem(DStruct):
+class WorkItem(Record):
     """
     Information object returned by :func:`~bitcoin.connection.BitcoinConnection.getwork`.
     
@@ -126,6 +142,7 @@ class WorkItem(DStruct):
     - *target* -- Little endian hash target.
 
     """
+    __slots__ = _fields = ('midstate', 'data', 'hash1', 'target')
     
 
 
@@ -0,0 +1,65 @@
+"""
+Time budget of the JSON-RPC request being served by the current thread.
+
+:meth:`~jsonrpc.site.JSONRPCSite.dispatch` starts the deadline of every
+request, and code making calls to other services asks :func:`timeout` how
+long it may wait, so a slow backend can not hold a request past its budget.
+
+Like :mod:`bitcoind.codec` this does not import Django, so the bitcoind
+client can be used without settings. The JSON-RPC site answers
+:exc:`DeadlineExceeded` with a
+:exc:`~jsonrpc.exceptions.DeadlineExceededError`.
+"""
+import threading
+import time
+
+class DeadlineExceeded(Exception):
+    """
+    The request being served has no time left.
+    """
+
+class CallTimedOut(DeadlineExceeded):
+    """
+    A call took longer than its own timeout, which was shorter than the
+    time the request had left: the service, not the request, is too slow.
+    """
+
+_local = threading.local()
+
+def start(seconds):
+    """
+    Give the current thread *seconds* from now, or no deadline if
+    :const:`None`.
+    """
+    if seconds is None:
+        _local.expires = None
+    else:
+        _local.expires = time.time() + seconds
+
+def clear():
+    _local.expires = None
+
+def remaining():
+    """
+    Returns the seconds left before the deadline, or :const:`None` without
+    a deadline.
+    """
+    expires = getattr(_local, 'expires', None)
+    if expires is None:
+        return None
+    return expires - time.time()
+
+def timeout(default=None):
+    """
+    Returns how long a call may take: *default* (:const:`None` for no
+    limit), capped by the time left. Raises :exc:`DeadlineExceeded` if none
+    is left.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded
+    if default is None:
+        return left
+    return min(default, left)
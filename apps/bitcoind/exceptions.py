@@ -43,6 +43,7 @@ class BitcoinException(Exception):
     METHOD_MUST_BE_STRING = -32600
     PARAMS_MUST_BE_ARRAY = -32600
     METHOD_NOT_FOUND = -32601
+    INTERNAL_ERROR = -32603
     
     def __init__(self, error):
         Exception.__init__(self, error['message'])
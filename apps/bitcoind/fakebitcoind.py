@@ -0,0 +1,522 @@
+"""
+A stand-in bitcoind for load testing: a threaded HTTP JSON-RPC server that
+keeps a wallet of accounts, addresses and transactions in memory.
+
+Usage::
+
+    python -m bitcoind.fakebitcoind [options]
+
+and point ``BITCOIND_USER``, ``BITCOIND_PASSWORD`` and ``BITCOIND_PORT`` at
+it. Credentials are not checked.
+
+The wallet can be seeded with any number of synthetic accounts named after
+``--seed-format``. Seeded accounts cost nothing until they are written to:
+their balance, address and single receiving transaction are derived from
+their number, so a wallet of millions of accounts starts in a moment.
+
+Coins are confirmed as soon as they move, and the chain grows by one block
+every ``--block-interval`` seconds. Errors use the codes of
+:class:`~bitcoind.exceptions.BitcoinException`.
+"""
+import inspect
+import random
+import struct
+import sys
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from optparse import OptionParser
+
+try:
+    from json import dumps, loads
+except ImportError:
+    from simplejson import dumps, loads
+
+from bitcoind import base58
+from bitcoind.exceptions import BitcoinException
+
+COIN = 100000000
+
+# Hash of the addresses of seeded accounts: a marker, the account number
+# and padding.
+_SEED_MARKER = 'SEED'
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        Exception.__init__(self, message)
+        self.code = code
+        self.message = message
+
+def _accepts(function, count):
+    """
+    Whether the method *function* can be called with *count* arguments.
+    """
+    args, varargs, varkw, defaults = inspect.getargspec(function)
+    required = len(args) - 1 - len(defaults or ())
+    return count >= required and (varargs is not None or count <= len(args) - 1)
+
+def _amount(value):
+    """
+    Returns *value*, an amount in BTC, in satoshis.
+    """
+    try:
+        satoshis = int(round(float(value) * COIN))
+    except (TypeError, ValueError):
+        raise RPCError(BitcoinException.INVALID_AMOUNT, "Invalid amount")
+    if satoshis <= 0:
+        raise RPCError(BitcoinException.INVALID_AMOUNT, "Invalid amount")
+    return satoshis
+
+class Wallet(object):
+    """
+    The in-memory wallet. Every RPC method is a method of the same name,
+    called with the wallet locked, except for those in :attr:`UNLOCKED`,
+    which take the lock themselves for as long as they need it.
+
+    Arguments to constructor:
+
+    - *seed_accounts* -- Number of synthetic accounts.
+    - *seed_format* -- Name of synthetic account *n* as a ``%d`` format.
+    - *seed_balance* -- Amount, in BTC, received by each synthetic account.
+    - *block_interval* -- Seconds between blocks.
+    """
+    # Methods that read every account, and only hold the lock to copy the
+    # accounts that have been written to.
+    UNLOCKED = ("listaccounts",)
+
+    def __init__(self, seed_accounts=0, seed_format="user%d+", seed_balance=1.0,
+                 block_interval=600):
+        self.seed_accounts = seed_accounts
+        self.seed_prefix, self.seed_suffix = seed_format.split("%d", 1)
+        self.seed_balance = _amount(seed_balance)
+        self.block_interval = block_interval
+        self.started = time.time()
+        # Accounts that have been written to, and the addresses and
+        # transactions created since start-up.
+        self.balances = {}
+        # Sum of every balance, kept by _credit() and _debit().
+        self.total = seed_accounts * self.seed_balance
+        self.received = {}
+        self.addresses = {}
+        self.account_addresses = {}
+        self.transactions = {}
+        self.log = []
+        self.address_count = 0
+        self.lock = threading.Lock()
+
+    # Seeded accounts
+
+    def _seed_number(self, account):
+        """
+        Returns the number of the seeded account *account*, or :const:`None`.
+        """
+        if not (account.startswith(self.seed_prefix) and account.endswith(self.seed_suffix)):
+            return None
+        digits = account[len(self.seed_prefix):len(account) - len(self.seed_suffix)]
+        if not digits.isdigit() or str(int(digits)) != digits:
+            return None
+        n = int(digits)
+        if n < self.seed_accounts:
+            return n
+        return None
+
+    def _seed_account(self, n):
+        return "%s%d%s" % (self.seed_prefix, n, self.seed_suffix)
+
+    def _seed_address(self, n):
+        return base58.b58encode_check('\0' + _SEED_MARKER + struct.pack('>Q', n) + '\0' * 8)
+
+    def _seed_transaction(self, n):
+        return {"account": self._seed_account(n), "address": self._seed_address(n),
+                "category": "receive", "amount": float(self.seed_balance) / COIN,
+                "confirmations": 100, "txid": "%064x" % n, "time": int(self.started) - 86400}
+
+    # Lookups
+
+    def _balance(self, account):
+        if account in self.balances:
+            return self.balances[account]
+        if self._seed_number(account) is not None:
+            return self.seed_balance
+        return 0
+
+    def _received(self, account):
+        if account in self.received:
+            return self.received[account]
+        if self._seed_number(account) is not None:
+            return self.seed_balance
+        return 0
+
+    def _address_account(self, address):
+        """
+        Returns the account of one of the wallet's addresses, or :const:`None`.
+        """
+        if address in self.addresses:
+            return self.addresses[address]
+        try:
+            payload = base58.b58decode_check(address)
+        except ValueError:
+            return None
+        if payload[1:5] == _SEED_MARKER and len(payload) == 21:
+            n = struct.unpack('>Q', payload[5:13])[0]
+            if n < self.seed_accounts:
+                return self._seed_account(n)
+        return None
+
+    def _addresses_of(self, account):
+        addresses = list(self.account_addresses.get(account, []))
+        n = self._seed_number(account)
+        if n is not None:
+            addresses.insert(0, self._seed_address(n))
+        return addresses
+
+    def _transactions_of(self, account):
+        transactions = list(self.transactions.get(account, []))
+        n = self._seed_number(account)
+        if n is not None:
+            transactions.insert(0, self._seed_transaction(n))
+        return transactions
+
+    def _accounts(self):
+        """
+        Yields the name of every account in the wallet.
+        """
+        for n in xrange(self.seed_accounts):
+            yield self._seed_account(n)
+        for account in self.balances:
+            if self._seed_number(account) is None:
+                yield account
+
+    def _record(self, account, **tx):
+        tx.update({"account": account, "confirmations": 1, "time": int(time.time())})
+        tx["amount"] = float(tx["amount"]) / COIN
+        self.transactions.setdefault(account, []).append(tx)
+        self.log.append(tx)
+
+    def _credit(self, account, amount):
+        self.balances[account] = self._balance(account) + amount
+        self.total += amount
+
+    def _debit(self, account, amount):
+        balance = self._balance(account)
+        if balance < amount:
+            raise RPCError(BitcoinException.INSUFFICIENT_FUNDS, "Account has insufficient funds")
+        self.balances[account] = balance - amount
+        self.total -= amount
+
+    # Chain state
+
+    def getblockcount(self):
+        return 100000 + int((time.time() - self.started) / self.block_interval)
+
+    def getblocknumber(self):
+        return self.getblockcount()
+
+    def getdifficulty(self):
+        return 1.0
+
+    def getconnectioncount(self):
+        return 8
+
+    def getinfo(self):
+        return {"version": 32100, "balance": float(self.total) / COIN,
+                "blocks": self.getblockcount(), "connections": 8, "proxy": "", "generate": False,
+                "genproclimit": -1, "difficulty": 1.0, "hashespersec": 0, "testnet": False,
+                "keypoololdest": int(self.started), "paytxfee": 0.0, "errors": ""}
+
+    # Addresses
+
+    def getnewaddress(self, account=""):
+        self.address_count += 1
+        address = base58.b58encode_check('\0' + 'FAKE' + struct.pack('>Q', self.address_count) + '\0' * 8)
+        self.addresses[address] = account
+        self.account_addresses.setdefault(account, []).append(address)
+        self.balances.setdefault(account, self._balance(account))
+        return address
+
+    def getaccountaddress(self, account):
+        addresses = self._addresses_of(account)
+        if addresses:
+            return addresses[-1]
+        return self.getnewaddress(account)
+
+    def setaccount(self, address, account):
+        previous = self._address_account(address)
+        if previous is None:
+            raise RPCError(BitcoinException.INVALID_TRANSACTION_ID, "Invalid bitcoin address")
+        if address in self.addresses:
+            self.account_addresses[previous].remove(address)
+        self.addresses[address] = account
+        self.account_addresses.setdefault(account, []).append(address)
+        self.balances.setdefault(account, self._balance(account))
+        return None
+
+    def getaccount(self, address):
+        account = self._address_account(address)
+        if account is None:
+            return ""
+        return account
+
+    def getaddressesbyaccount(self, account):
+        return self._addresses_of(account)
+
+    def validateaddress(self, address):
+        try:
+            base58.address_version(address)
+        except ValueError:
+            return {"isvalid": False}
+        result = {"isvalid": True, "address": address}
+        account = self._address_account(address)
+        result["ismine"] = account is not None
+        if account is not None:
+            result["account"] = account
+        return result
+
+    # Balances
+
+    def getbalance(self, account=None, minconf=1):
+        if account is None or account == "*":
+            return float(self.total) / COIN
+        return float(self._balance(account)) / COIN
+
+    def getreceivedbyaccount(self, account, minconf=1):
+        return float(self._received(account)) / COIN
+
+    def getreceivedbyaddress(self, address, minconf=1):
+        account = self._address_account(address)
+        if account is None:
+            return 0.0
+        return float(self._received_by_address(account, address)) / COIN
+
+    def _received_by_address(self, account, address):
+        received = 0
+        for tx in self._transactions_of(account):
+            if tx["category"] == "receive" and tx.get("address") == address:
+                received += int(round(tx["amount"] * COIN))
+        return received
+
+    def listaccounts(self, minconf=1):
+        self.lock.acquire()
+        try:
+            balances = dict(self.balances)
+        finally:
+            self.lock.release()
+        # Seeded accounts are known to be seeded; skip parsing their names.
+        seeded = float(self.seed_balance) / COIN
+        result = {}
+        for n in xrange(self.seed_accounts):
+            account = self._seed_account(n)
+            if account in balances:
+                result[account] = float(balances[account]) / COIN
+            else:
+                result[account] = seeded
+        for (account, balance) in balances.iteritems():
+            result.setdefault(account, float(balance) / COIN)
+        return result
+
+    def listreceivedbyaccount(self, minconf=1, includeempty=False):
+        result = []
+        for account in self._accounts():
+            amount = self._received(account)
+            if amount or includeempty:
+                result.append({"account": account, "amount": float(amount) / COIN, "confirmations": 1})
+        return result
+
+    def listreceivedbyaddress(self, minconf=1, includeempty=False):
+        result = []
+        for account in self._accounts():
+            untouched = account not in self.transactions
+            for address in self._addresses_of(account):
+                if untouched:
+                    # Only a seeded account's own address has received anything.
+                    amount = self._received(account)
+                else:
+                    amount = self._received_by_address(account, address)
+                if amount or includeempty:
+                    result.append({"address": address, "account": account,
+                                   "amount": float(amount) / COIN, "confirmations": 1})
+        return result
+
+    def listtransactions(self, account="*", count=10, from_=0):
+        if count < 0 or from_ < 0:
+            raise RPCError(BitcoinException.INVALID_PARAMETER, "Negative count or from")
+        if account == "*":
+            transactions = self.log
+        else:
+            transactions = self._transactions_of(account)
+        end = len(transactions) - from_
+        if end <= 0:
+            return []
+        return transactions[max(0, end - count):end]
+
+    # Payments
+
+    def move(self, fromaccount, toaccount, amount, minconf=1, comment=None):
+        amount = _amount(amount)
+        self._debit(fromaccount, amount)
+        self._credit(toaccount, amount)
+        extra = comment and {"comment": comment} or {}
+        self._record(fromaccount, category="move", amount=-amount, otheraccount=toaccount, **extra)
+        self._record(toaccount, category="move", amount=amount, otheraccount=fromaccount, **extra)
+        return True
+
+    def sendfrom(self, fromaccount, tobitcoinaddress, amount, minconf=1, comment=None, comment_to=None):
+        amount = _amount(amount)
+        try:
+            base58.address_version(tobitcoinaddress)
+        except ValueError:
+            raise RPCError(BitcoinException.INVALID_TRANSACTION_ID, "Invalid bitcoin address")
+        self._debit(fromaccount, amount)
+        txid = "%064x" % random.getrandbits(256)
+        self._record(fromaccount, category="send", amount=-amount, fee=0.0,
+                     address=tobitcoinaddress, txid=txid)
+        toaccount = self._address_account(tobitcoinaddress)
+        if toaccount is not None:
+            self._credit(toaccount, amount)
+            self.received[toaccount] = self._received(toaccount) + amount
+            self._record(toaccount, category="receive", amount=amount,
+                         address=tobitcoinaddress, txid=txid)
+        return txid
+
+    def sendtoaddress(self, bitcoinaddress, amount, comment=None, comment_to=None):
+        return self.sendfrom("", bitcoinaddress, amount, 1, comment, comment_to)
+
+class FakeBitcoindHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+
+    def do_POST(self):
+        try:
+            request = loads(self.rfile.read(int(self.headers["Content-Length"])))
+        except ValueError:
+            request = None
+            reply = {"result": None, "id": None,
+                     "error": {"code": BitcoinException.PARSE_ERROR, "message": "Parse error"}}
+        if request is not None:
+            self.server.delay()
+            if isinstance(request, list):
+                reply = [self.server.call(r) for r in request]
+            else:
+                reply = self.server.call(request)
+        body = dumps(reply)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, *args)
+
+class FakeBitcoind(ThreadingMixIn, HTTPServer):
+    """
+    The JSON-RPC server around a :class:`Wallet`.
+
+    Arguments to constructor:
+
+    - *address* -- ``(host, port)`` to listen on; port 0 picks a free port.
+    - *wallet* -- The :class:`Wallet` to serve.
+    - *latency* -- Seconds each HTTP request is delayed by.
+    - *jitter* -- Up to this many seconds are added to *latency* at random.
+    - *error_rate* -- Fraction of calls that fail with *error_code*.
+    - *error_code* -- Code of the injected errors.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, wallet, latency=0, jitter=0, error_rate=0,
+                 error_code=BitcoinException.NOT_CONNECTED, verbose=False):
+        HTTPServer.__init__(self, address, FakeBitcoindHandler)
+        self.wallet = wallet
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.verbose = verbose
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.random() * self.jitter)
+
+    def call(self, request):
+        result, error = None, None
+        try:
+            method = request.get("method")
+            params = request.get("params") or []
+            if not isinstance(method, basestring) or method.startswith("_") or not hasattr(Wallet, method):
+                raise RPCError(BitcoinException.METHOD_NOT_FOUND, "Method not found")
+            if not isinstance(params, list):
+                raise RPCError(BitcoinException.PARAMS_MUST_BE_ARRAY, "Params must be an array")
+            if not _accepts(getattr(Wallet, method), len(params)):
+                raise RPCError(BitcoinException.INVALID_PARAMETER, "Wrong number of parameters")
+            if self.error_rate and random.random() < self.error_rate:
+                raise RPCError(self.error_code, "Injected error")
+            locked = method not in Wallet.UNLOCKED
+            if locked:
+                self.wallet.lock.acquire()
+            try:
+                result = getattr(self.wallet, method)(*params)
+            finally:
+                if locked:
+                    self.wallet.lock.release()
+        except RPCError, e:
+            error = {"code": e.code, "message": e.message}
+        except Exception, e:
+            # A bug of the wallet, or parameters of the wrong type.
+            error = {"code": BitcoinException.INTERNAL_ERROR, "message": "%s: %s" % (type(e).__name__, e)}
+        return {"result": result, "error": error, "id": request.get("id")}
+
+    def start(self):
+        """
+        Serve in a daemon thread and return the service URL.
+        """
+        thread = threading.Thread(target=self.serve_forever)
+        thread.setDaemon(True)
+        thread.start()
+        return "http://user:password@%s:%d/" % self.server_address
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("--host", default="127.0.0.1",
+                      help="address to listen on [default: %default]")
+    parser.add_option("-p", "--port", type="int", default=8332,
+                      help="port to listen on [default: %default]")
+    parser.add_option("-n", "--seed-accounts", type="int", default=0,
+                      help="number of synthetic accounts [default: %default]")
+    parser.add_option("--seed-format", default="user%d+",
+                      help="name of synthetic account number %%d [default: %default]")
+    parser.add_option("--seed-balance", type="float", default=1.0,
+                      help="BTC received by each synthetic account [default: %default]")
+    parser.add_option("-l", "--latency", type="float", default=0,
+                      help="milliseconds added to every request [default: %default]")
+    parser.add_option("-j", "--jitter", type="float", default=0,
+                      help="up to this many random milliseconds added to the latency [default: %default]")
+    parser.add_option("--error-rate", type="float", default=0,
+                      help="fraction of calls that fail [default: %default]")
+    parser.add_option("--error-code", type="int", default=BitcoinException.NOT_CONNECTED,
+                      help="error code of failed calls [default: %default]")
+    parser.add_option("--block-interval", type="float", default=600,
+                      help="seconds between blocks [default: %default]")
+    parser.add_option("-v", "--verbose", action="store_true", default=False,
+                      help="log every request")
+    options, args = parser.parse_args(argv)
+
+    wallet = Wallet(options.seed_accounts, options.seed_format, options.seed_balance,
+                    options.block_interval)
+    server = FakeBitcoind((options.host, options.port), wallet,
+                          options.latency / 1000.0, options.jitter / 1000.0,
+                          options.error_rate, options.error_code, options.verbose)
+    print "Serving %d accounts on %s:%d" % ((options.seed_accounts,) + server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,254 @@
+"""
+Copies the transactions of each shard's wallet into
+:class:`~bitcoind.models.Transaction`, so ``listtransactions`` is answered
+from the database.
+
+:func:`sync` reads the wallet-wide ``listtransactions`` newest first, a
+page at a time, and stops once it is past the :class:`SyncCursor` left by
+the previous run and past every stored entry whose block could still be
+orphaned. Entries already stored are updated, the others created, in a
+single database transaction. Each entry's block height is worked out from
+its confirmations and the height of the best block, so confirmations can
+later be computed without asking bitcoind again.
+
+The same transaction keeps :attr:`Address.balance
+<bitcoind.models.Address.balance>` up to date for what the JSON-RPC views
+do not book themselves: payments received, once confirmed, and the fees of
+sends. :func:`reconcile` checks the stored balances against bitcoind.
+"""
+import datetime
+import hashlib
+import time
+from itertools import takewhile
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from bitcoind import util
+from bitcoind.models import Address, Transaction, SyncCursor
+
+# Confirmations after which a stored entry is no longer refreshed.
+SETTLED_CONFIRMATIONS = 6
+
+# Attempts at reading a consistent set of entries while blocks arrive.
+SYNC_ATTEMPTS = 3
+
+# Shards whose stored balances reconcile() has set from bitcoind.
+_reconciled = set()
+
+def _txids(entries):
+    """
+    Returns the txid of each of *entries*, oldest first. Moves have none, so
+    one is made up from the fields that identify them and, for identical
+    moves made in the same second, how many came before.
+    """
+    txids = []
+    seen = {}
+    for tx in entries:
+        if hasattr(tx, "txid"):
+            txids.append(tx.txid)
+            continue
+        key = "%s\0%s\0%d\0%.8f\0%s" % (tx.account, getattr(tx, "otheraccount", ""), tx.time,
+                                        tx.amount, getattr(tx, "comment", ""))
+        n = seen[key] = seen.get(key, -1) + 1
+        if n:
+            key += "\0%d" % n
+        txids.append("move:" + hashlib.sha1(key.encode("utf-8")).hexdigest())
+    return txids
+
+def _time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp)
+
+def timestamp(value):
+    """
+    Returns the datetime *value* of a stored entry in seconds since the
+    epoch, as bitcoind reports it.
+    """
+    return int(time.mktime(value.timetuple()))
+
+def _owners(entries, shard):
+    """
+    Returns a dictionary mapping the address or bitcoind account of each
+    entry to the id of its :class:`~bitcoind.models.Address`. Payments to
+    an address that was moved to another shard belong to the address it was
+    moved to.
+    """
+    owners = {}
+    addresses = set(tx.address for tx in entries if tx.category in ("receive", "generate"))
+    if addresses:
+        rows = Address.objects.filter(address__in=addresses).filter(
+            Q(user__isnull=False) | Q(moved_to__isnull=False))
+        for (address, pk, moved_to) in rows.values_list("address", "id", "moved_to"):
+            owners[address] = moved_to or pk
+    accounts = set(tx.account for tx in entries if tx.category in ("send", "move"))
+    usernames = set(util.getusername_and_label(a)[0] for a in accounts)
+    if usernames:
+        rows = Address.objects.filter(user__username__in=usernames, shard=shard)
+        # Prefer the primary address among several with the same label.
+        for (pk, username, label) in rows.order_by("-is_primary", "id").values_list("id", "user__username", "label"):
+            owners.setdefault(util.getaccount(username, label), pk)
+    return owners
+
+def _owner(owners, tx):
+    if tx.category in ("receive", "generate"):
+        return owners.get(tx.address)
+    return owners.get(tx.account)
+
+def _block_height(tx, height):
+    """
+    Returns the height of the block that included *tx*, read when the best
+    block was at *height*.
+    """
+    confirmations = getattr(tx, "confirmations", 0)
+    if confirmations < 1:
+        return None
+    return height - confirmations + 1
+
+def store(entries, shard, height):
+    """
+    Create or update a :class:`~bitcoind.models.Transaction` for each of the
+    ``listtransactions`` *entries* of *shard*'s wallet, oldest first, read
+    when the best block was at *height*. The entries must include every
+    entry of the second of the oldest one, so identical moves are told
+    apart. Entries of addresses and accounts without an owner, like the
+    address pool, are skipped.
+
+    Returns a ``(created, updated)`` pair.
+    """
+    def book(owner, amount):
+        Address(pk=owner).increase(amount)
+
+    owners = _owners(entries, shard)
+    txids = _txids(entries)
+    existing = {}
+    for (pk, txid, category, address, account, block_height) in Transaction.objects.filter(
+            txid__in=set(txids)).values_list("id", "txid", "category", "address", "account", "block_height"):
+        existing[(txid, category, address, account)] = (pk, block_height)
+    created = updated = 0
+    for (tx, txid) in zip(entries, txids):
+        owner = _owner(owners, tx)
+        if owner is None:
+            continue
+        key = (txid, tx.category, getattr(tx, "address", ""), owner)
+        block_height = _block_height(tx, height)
+        incoming = tx.category in ("receive", "generate")
+        if key in existing:
+            pk, stored = existing[key]
+            if stored != block_height:
+                Transaction.objects.filter(pk=pk).update(block_height=block_height)
+                # Confirmed, or back to unconfirmed after a reorganisation.
+                if incoming and stored is None:
+                    book(owner, tx.amount)
+                elif incoming and block_height is None:
+                    book(owner, -tx.amount)
+                updated += 1
+            continue
+        if incoming and block_height is not None:
+            book(owner, tx.amount)
+        elif tx.category == "send" and hasattr(tx, "fee"):
+            # The views only book the amount sent.
+            book(owner, tx.fee)
+        row = Transaction.objects.create(
+            account_id=owner,
+            address=key[2],
+            category=tx.category,
+            amount=util.decimal_amount(tx.amount),
+            fee=hasattr(tx, "fee") and util.decimal_amount(tx.fee) or None,
+            txid=key[0],
+            block_height=block_height,
+            time=_time(tx.time),
+            otheraccount=getattr(tx, "otheraccount", ""),
+            comment=getattr(tx, "comment", ""))
+        existing[key] = (row.pk, row.block_height)
+        created += 1
+    return created, updated
+store = transaction.commit_on_success(store)
+
+def sync(conn, shard, page_size=100):
+    """
+    Copy the entries of *shard*'s wallet that are new or may have changed
+    since the last run. Returns a ``(created, updated)`` pair.
+    """
+    cursor, _ = SyncCursor.objects.get_or_create(shard=shard)
+    height = conn.getblockcount()
+    # Entries older than the cursor and than the oldest stored entry that
+    # is unconfirmed or could still be orphaned can't have changed. Entries
+    # as old as that are read again, the whole second, for store().
+    bound = cursor.time
+    unsettled = Transaction.objects.filter(account__shard=shard).exclude(category="move").filter(
+        Q(block_height__isnull=True) | Q(block_height=0) |
+        Q(block_height__gt=height - SETTLED_CONFIRMATIONS + 1))
+    for oldest in unsettled.order_by("time").values_list("time", flat=True)[:1]:
+        if bound is not None:
+            bound = min(bound, oldest)
+    def unseen(tx):
+        return bound is None or _time(tx.time) >= bound
+
+    for attempt in xrange(SYNC_ATTEMPTS):
+        entries = []
+        start = 0
+        while True:
+            page = conn.listtransactions("*", page_size, start)
+            page.reverse()
+            new = list(takewhile(unseen, page))
+            entries.extend(new)
+            if len(new) < len(page) or len(page) < page_size:
+                break
+            start += page_size
+        # Confirmations are only consistent with the height if no block
+        # arrived while reading them.
+        before, height = height, conn.getblockcount()
+        if height == before:
+            break
+    # Oldest first, like bitcoind returns them.
+    entries.reverse()
+    result = store(entries, shard, height)
+    if entries:
+        newest = entries[-1]
+        SyncCursor.objects.filter(pk=cursor.pk).update(txid=getattr(newest, "txid", ""), time=_time(newest.time))
+    return result
+
+def reconcile(conn, shard, fix=False):
+    """
+    Compare the stored balances of *shard*'s accounts with ``listaccounts``.
+
+    Returns a list of ``(account, stored, actual)`` tuples, one for each
+    account whose balances differ. With *fix*, the stored balance of each is
+    set to bitcoind's, by adjusting its primary (or oldest) address. The
+    accounts of addresses flagged ``unreconciled`` are fixed either way, and
+    the flags cleared.
+    """
+    flagged = Address.objects.filter(shard=shard, unreconciled=True)
+    pending = list(flagged.values_list("pk", "user__username", "label"))
+    unreconciled = set((username, label) for (pk, username, label) in pending)
+    actual = util.index_accounts(conn.listaccounts())
+    stored = Address.objects.filter(shard=shard, user__isnull=False).values("user__username", "label")
+    differences = []
+    for row in stored.annotate(total=Sum("balance")).order_by("user__username", "label"):
+        username, label = row["user__username"], row["label"]
+        total = util.decimal_amount(row["total"] or 0)
+        balance = util.decimal_amount(actual.get(username, {}).get(label, 0))
+        if balance == total:
+            continue
+        differences.append((util.getaccount(username, label), total, balance))
+        if fix or (username, label) in unreconciled:
+            addresses = Address.objects.filter(user__username=username, label=label, shard=shard)
+            addresses.order_by("-is_primary", "id")[0].increase(balance - total)
+    # Only the flags read before listaccounts: a timeout since may not
+    # show in its result yet.
+    Address.objects.filter(pk__in=[pk for (pk, username, label) in pending]).update(unreconciled=False)
+    if fix:
+        SyncCursor.objects.get_or_create(shard=shard)
+        SyncCursor.objects.filter(shard=shard).update(balances_reconciled=True)
+    return differences
+
+def balances_reconciled(shards):
+    """
+    Returns whether :func:`reconcile` has fixed the stored balances of each
+    of the first *shards* shards. Migration 0006 added them at zero, so the
+    views ask bitcoind for balances until then.
+    """
+    if not all(shard in _reconciled for shard in xrange(shards)):
+        rows = SyncCursor.objects.filter(shard__lt=shards, balances_reconciled=True)
+        _reconciled.update(rows.values_list("shard", flat=True))
+    return all(shard in _reconciled for shard in xrange(shards))
@@ -0,0 +1,73 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from bitcoind.codec import dumps, loads
+
+class Command(BaseCommand):
+    help = ('Benchmark the bitcoind JSON-RPC methods against a fake bitcoind in a '
+            'test database, or compare two saved runs.')
+    args = '[--compare OLD.json NEW.json]'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--users', type='int', dest='users', default=100,
+            help='Number of users and wallet accounts to create.'),
+        make_option('--requests', type='int', dest='requests', default=200,
+            help='Requests per method.'),
+        make_option('--latency', type='float', dest='latency', default=0,
+            help='Milliseconds the fake bitcoind delays each request by.'),
+        make_option('--method', action='append', dest='methods', default=[],
+            help='Only benchmark this method; may be repeated.'),
+        make_option('--output', dest='output',
+            help='Save the results as JSON to this file.'),
+        make_option('--baseline', dest='baseline',
+            help='Compare the results with a run saved in this file.'),
+        make_option('--compare', action='store_true', dest='compare', default=False,
+            help='Compare the two runs saved in the given files instead of benchmarking.'),
+        make_option('--threshold', type='float', dest='threshold', default=0.2,
+            help='Fraction by which the median latency may grow before it is a regression.'),
+    )
+
+    def handle(self, *args, **options):
+        from bitcoind.benchmarks import endpoint
+
+        if options['compare']:
+            if len(args) != 2:
+                raise CommandError('--compare takes two result files.')
+            old, new = [self.load(name) for name in args]
+        else:
+            old = options['baseline'] and self.load(options['baseline'])
+            new = self.benchmark(endpoint, options)
+            print endpoint.report(new)
+            if options['output']:
+                f = open(options['output'], 'w')
+                try:
+                    f.write(dumps(new))
+                finally:
+                    f.close()
+        if old:
+            regressions = endpoint.compare(old, new, options['threshold'])
+            for regression in regressions:
+                print 'REGRESSION %s' % regression
+            if regressions:
+                raise CommandError('%d regressions' % len(regressions))
+
+    def load(self, filename):
+        f = open(filename)
+        try:
+            return loads(f.read())
+        finally:
+            f.close()
+
+    def benchmark(self, endpoint, options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            return endpoint.run(options['users'], options['requests'], options['latency'] / 1000.0,
+                                options['methods'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
@@ -0,0 +1,69 @@
+from decimal import Decimal
+from itertools import groupby
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+
+from bitcoind import sharding, util
+from bitcoind.exceptions import BitcoinException
+from bitcoind.models import Address
+
+class Command(NoArgsCommand):
+    help = ('Move users to the shard their username hashes to, giving them new '
+            'addresses there, and sweep balances left in their accounts on other '
+            'shards to their home shard.')
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--dry-run', action='store_true', dest='dry_run', default=False,
+            help='Report what would be moved without touching the wallets or the database.'),
+        make_option('--minconf', type='int', dest='minconf', default=1,
+            help='Only sweep coins with at least this many confirmations.'),
+        make_option('--fee', dest='fee', default='0.01',
+            help='Transaction fee to leave in each swept account. Too little and bitcoind '
+                 'refuses sends that need a fee.'),
+    )
+
+    def handle_noargs(self, **options):
+        shards = sharding.connect_from_settings()
+        dry_run = options['dry_run']
+        fee = Decimal(options['fee'])
+
+        # Shard each address row ends up on, for the sweep below when the
+        # rows are not actually updated.
+        planned = {}
+        rows = Address.objects.filter(user__isnull=False).select_related('user').order_by('user')
+        for (user, addresses) in groupby(rows, lambda a: a.user):
+            target = sharding.shard_for(user.username, len(shards))
+            for address in addresses:
+                if address.shard == target:
+                    continue
+                account = util.getaccount(user, address.label)
+                print 'Moving %s from shard %d to %d' % (account, address.shard, target)
+                planned[address.pk] = target
+                if not dry_run:
+                    sharding.move_address(address, shards[target], target)
+
+        for (shard, wallet) in enumerate(shards):
+            for (account, balance) in wallet.listaccounts(options['minconf']).iteritems():
+                amount = Decimal(str(balance)) - fee
+                if account == '' or amount <= 0:
+                    continue
+                username, label = util.getusername_and_label(account)
+                try:
+                    address = Address.objects.get(user__username=username, label=label)
+                except Address.DoesNotExist:
+                    continue
+                if planned.get(address.pk, address.shard) == shard:
+                    continue
+                print 'Sweeping %s %s from shard %d' % (amount, account, shard)
+                if dry_run:
+                    continue
+                try:
+                    wallet.sendfrom(account, address.address, float(amount), options['minconf'])
+                except BitcoinException, e:
+                    print 'Could not sweep %s: %s' % (account, e)
+                    continue
+                # The address already holds the stored balance of the
+                # account, and is credited again once the sweep arrives.
+                # What is left behind pays the fee.
+                address.decrease(Decimal(str(balance)))
@@ -0,0 +1,24 @@
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+
+from bitcoind import ledger, sharding
+
+class Command(NoArgsCommand):
+    help = ("Compare the stored balance of every account with bitcoind's and report "
+            "the accounts that differ.")
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--fix', action='store_true', dest='fix', default=False,
+            help="Set the stored balances that differ to bitcoind's. The views read the "
+                 "stored balances once this has run for every shard."),
+    )
+
+    def handle_noargs(self, **options):
+        shards = sharding.connect_from_settings()
+        for (shard, conn) in enumerate(shards):
+            # Book confirmed payments first, so they don't show up as
+            # differences that the next sync would then count twice.
+            ledger.sync(conn, shard)
+            for (account, stored, actual) in ledger.reconcile(conn, shard, options['fix']):
+                print 'Shard %d: %s has %s stored, %s in bitcoind' % (shard, account, stored, actual)
@@ -0,0 +1,27 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import NoArgsCommand
+
+from bitcoind import addresspool, sharding
+
+class Command(NoArgsCommand):
+    help = ("Move claimed pool addresses to their owners' accounts and top up the "
+            "pool of unclaimed addresses on every shard.")
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--low', type='int', dest='low',
+            default=getattr(settings, 'BITCOIND_ADDRESS_POOL_LOW', 50),
+            help='Refill a shard when fewer unclaimed addresses are left.'),
+        make_option('--high', type='int', dest='high',
+            default=getattr(settings, 'BITCOIND_ADDRESS_POOL_HIGH', 200),
+            help='Number of unclaimed addresses to refill a shard to.'),
+    )
+
+    def handle_noargs(self, **options):
+        shards = sharding.connect_from_settings()
+        for (shard, conn) in enumerate(shards):
+            moved = addresspool.relabel(conn, shard)
+            added = addresspool.refill(conn, shard, options['low'], options['high'])
+            if moved or added:
+                print 'Shard %d: %d addresses relabelled, %d added to the pool' % (shard, moved, added)
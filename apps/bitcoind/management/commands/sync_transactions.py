@@ -0,0 +1,43 @@
+import time
+import traceback
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+
+from bitcoind import ledger, sharding
+from bitcoind.models import Address
+from bitcoind.registry import ConnectionRegistry
+
+class Command(NoArgsCommand):
+    help = ("Copy new wallet transactions of every shard into the Transaction table, "
+            "which the listtransactions method reads.")
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--interval', type='float', dest='interval', default=0,
+            help='Keep running, syncing every this many seconds. By default sync once and exit.'),
+        make_option('--page-size', type='int', dest='page_size', default=100,
+            help='Number of transactions requested from bitcoind at a time.'),
+    )
+
+    def handle_noargs(self, **options):
+        shards = ConnectionRegistry(sharding.connect_from_settings)
+        interval = options['interval']
+        while True:
+            for (shard, conn) in enumerate(shards):
+                try:
+                    created, updated = ledger.sync(conn, shard, options['page_size'])
+                    # Moves and sends that timed out in the views.
+                    if Address.objects.filter(shard=shard, unreconciled=True).exists():
+                        for (account, stored, actual) in ledger.reconcile(conn, shard):
+                            print 'Shard %d: %s set to %s from %s' % (shard, account, actual, stored)
+                except Exception:
+                    if not interval:
+                        raise
+                    # Try again on the next pass, bitcoind may be restarting.
+                    traceback.print_exc()
+                    continue
+                if created or updated:
+                    print 'Shard %d: %d transactions added, %d updated' % (shard, created, updated)
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,146 @@
+"""
+Per-method statistics of the JSON-RPC calls made to bitcoind.
+"""
+import threading
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the latency histogram buckets. Calls slower
+# than the last bound are only counted in the total.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Error code recorded for calls that failed without a JSON-RPC error, such
+# as a refused connection.
+TRANSPORT_ERROR = "transport"
+
+# Error code recorded for calls that ran out of time.
+TIMEOUT_ERROR = "timeout"
+
+class MethodStats(object):
+    """
+    Counters for one RPC method.
+    """
+    __slots__ = ('calls', 'errors', 'buckets', 'seconds', 'request_bytes', 'response_bytes', 'coalesced')
+
+    def __init__(self, nbuckets):
+        self.calls = 0
+        self.errors = {}
+        self.buckets = [0] * (nbuckets + 1)
+        self.seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.coalesced = 0
+
+class Metrics(object):
+    """
+    Thread-safe collection of :class:`MethodStats` keyed by method name.
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.bounds = tuple(buckets)
+        self._methods = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, method):
+        stats = self._methods.get(method)
+        if stats is None:
+            stats = self._methods[method] = MethodStats(len(self.bounds))
+        return stats
+
+    def record(self, method, elapsed, request_bytes=0, response_bytes=0, error=None):
+        """
+        Count a call of *method* that took *elapsed* seconds. *error* is the
+        JSON-RPC error code of a failed call, or :const:`TRANSPORT_ERROR`.
+        """
+        bucket = bisect_left(self.bounds, elapsed)
+        self._lock.acquire()
+        try:
+            stats = self._stats(method)
+            stats.calls += 1
+            stats.buckets[bucket] += 1
+            stats.seconds += elapsed
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            if error is not None:
+                stats.errors[error] = stats.errors.get(error, 0) + 1
+        finally:
+            self._lock.release()
+
+    def record_coalesced(self, method):
+        """
+        Count a call of *method* that shared the result of an identical call
+        already in flight instead of being made.
+        """
+        self._lock.acquire()
+        try:
+            self._stats(method).coalesced += 1
+        finally:
+            self._lock.release()
+
+    def reset(self):
+        self._lock.acquire()
+        try:
+            self._methods = {}
+        finally:
+            self._lock.release()
+
+    def snapshot(self):
+        """
+        Returns a dictionary with the counters of each method. The histogram
+        is a list of ``[upper bound, calls]`` pairs with cumulative counts,
+        like the plain-text format of :meth:`render`.
+        """
+        self._lock.acquire()
+        try:
+            result = {}
+            for (method, stats) in self._methods.iteritems():
+                cumulative = 0
+                histogram = []
+                for (bound, count) in zip(self.bounds, stats.buckets):
+                    cumulative += count
+                    histogram.append([bound, cumulative])
+                result[method] = {
+                    "calls": stats.calls,
+                    "errors": dict((str(code), n) for (code, n) in stats.errors.iteritems()),
+                    "seconds": stats.seconds,
+                    "histogram": histogram,
+                    "request_bytes": stats.request_bytes,
+                    "response_bytes": stats.response_bytes,
+                    "coalesced": stats.coalesced,
+                }
+            return result
+        finally:
+            self._lock.release()
+
+    def render(self):
+        """
+        Returns the counters in the Prometheus text exposition format.
+        """
+        lines = []
+        snapshot = sorted(self.snapshot().iteritems())
+        def emit(name, kind, help, rows):
+            lines.append("# HELP %s %s" % (name, help))
+            lines.append("# TYPE %s %s" % (name, kind))
+            lines.extend(rows)
+
+        emit("bitcoind_rpc_calls_total", "counter", "RPC calls made to bitcoind.",
+             ['bitcoind_rpc_calls_total{method="%s"} %d' % (m, s["calls"]) for (m, s) in snapshot])
+        emit("bitcoind_rpc_coalesced_total", "counter", "Calls that shared an identical call in flight.",
+             ['bitcoind_rpc_coalesced_total{method="%s"} %d' % (m, s["coalesced"]) for (m, s) in snapshot])
+        emit("bitcoind_rpc_errors_total", "counter", "Failed RPC calls by error code.",
+             ['bitcoind_rpc_errors_total{method="%s",code="%s"} %d' % (m, code, n)
+              for (m, s) in snapshot for (code, n) in sorted(s["errors"].iteritems())])
+        rows = []
+        for (m, s) in snapshot:
+            for (bound, count) in s["histogram"]:
+                rows.append('bitcoind_rpc_duration_seconds_bucket{method="%s",le="%g"} %d' % (m, bound, count))
+            rows.append('bitcoind_rpc_duration_seconds_bucket{method="%s",le="+Inf"} %d' % (m, s["calls"]))
+            rows.append('bitcoind_rpc_duration_seconds_sum{method="%s"} %f' % (m, s["seconds"]))
+            rows.append('bitcoind_rpc_duration_seconds_count{method="%s"} %d' % (m, s["calls"]))
+        emit("bitcoind_rpc_duration_seconds", "histogram", "Latency of RPC calls.", rows)
+        emit("bitcoind_rpc_request_bytes_total", "counter", "Bytes of JSON-RPC requests sent.",
+             ['bitcoind_rpc_request_bytes_total{method="%s"} %d' % (m, s["request_bytes"]) for (m, s) in snapshot])
+        emit("bitcoind_rpc_response_bytes_total", "counter", "Bytes of JSON-RPC responses received.",
+             ['bitcoind_rpc_response_bytes_total{method="%s"} %d' % (m, s["response_bytes"]) for (m, s) in snapshot])
+        return "\n".join(lines) + "\n"
+
+# Statistics of every ServiceProxy that is not given its own.
+metrics = Metrics()
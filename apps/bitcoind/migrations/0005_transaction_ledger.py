@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'SyncCursor'
+        db.create_table('bitcoind_synccursor', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('shard', self.gf('django.db.models.fields.PositiveSmallIntegerField')(unique=True)),
+            ('txid', self.gf('django.db.models.fields.CharField')(max_length=50, blank=True)),
+            ('time', self.gf('django.db.models.fields.DateTimeField')(null=True, blank=True)),
+        ))
+        db.send_create_signal('bitcoind', ['SyncCursor'])
+
+        # Adding field 'Transaction.fee'
+        db.add_column('bitcoind_transaction', 'fee',
+                      self.gf('django.db.models.fields.DecimalField')(null=True, max_digits=16, decimal_places=8, blank=True),
+                      keep_default=False)
+
+        # Adding field 'Transaction.otheraccount'
+        db.add_column('bitcoind_transaction', 'otheraccount',
+                      self.gf('django.db.models.fields.CharField')(default='', max_length=100, blank=True),
+                      keep_default=False)
+
+        # Adding field 'Transaction.comment'
+        db.add_column('bitcoind_transaction', 'comment',
+                      self.gf('django.db.models.fields.CharField')(default='', max_length=255, blank=True),
+                      keep_default=False)
+
+
+        # Changing field 'Transaction.category'
+        db.alter_column('bitcoind_transaction', 'category', self.gf('django.db.models.fields.CharField')(max_length=8))
+
+        # Changing field 'Transaction.time'
+        db.alter_column('bitcoind_transaction', 'time', self.gf('django.db.models.fields.DateTimeField')())
+        # Adding index on 'Transaction', fields ['time']
+        db.create_index('bitcoind_transaction', ['time'])
+
+        # Adding index on 'Transaction', fields ['txid']
+        db.create_index('bitcoind_transaction', ['txid'])
+
+
+    def backwards(self, orm):
+        # Removing index on 'Transaction', fields ['txid']
+        db.delete_index('bitcoind_transaction', ['txid'])
+
+        # Removing index on 'Transaction', fields ['time']
+        db.delete_index('bitcoind_transaction', ['time'])
+
+        # Deleting model 'SyncCursor'
+        db.delete_table('bitcoind_synccursor')
+
+        # Deleting field 'Transaction.fee'
+        db.delete_column('bitcoind_transaction', 'fee')
+
+        # Deleting field 'Transaction.otheraccount'
+        db.delete_column('bitcoind_transaction', 'otheraccount')
+
+        # Deleting field 'Transaction.comment'
+        db.delete_column('bitcoind_transaction', 'comment')
+
+
+        # "generate" does not fit the old column. Synced rows are a copy of
+        # the wallet and can be copied again.
+        db.execute("DELETE FROM bitcoind_transaction WHERE category = 'generate'")
+
+        # Changing field 'Transaction.category'
+        db.alter_column('bitcoind_transaction', 'category', self.gf('django.db.models.fields.CharField')(max_length=7))
+
+        # Changing field 'Transaction.time'
+        db.alter_column('bitcoind_transaction', 'time', self.gf('django.db.models.fields.DateTimeField')(auto_now_add=True))
+
+    models = {
+        'auth.group': {
+            'Meta': {'object_name': 'Group'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '80'}),
+            'permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'})
+        },
+        'auth.permission': {
+            'Meta': {'ordering': "('content_type__app_label', 'content_type__model', 'codename')", 'unique_together': "(('content_type', 'codename'),)", 'object_name': 'Permission'},
+            'codename': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'})
+        },
+        'auth.user': {
+            'Meta': {'object_name': 'User'},
+            'date_joined': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '75', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'groups': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Group']", 'symmetrical': 'False', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'is_staff': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'is_superuser': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'last_login': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'password': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'user_permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'}),
+            'username': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '30'})
+        },
+        'bitcoind.address': {
+            'Meta': {'object_name': 'Address'},
+            'address': ('django.db.models.fields.CharField', [], {'max_length': '34', 'db_index': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_primary': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'label': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'pending_setaccount': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'shard': ('django.db.models.fields.PositiveSmallIntegerField', [], {'default': '0'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['auth.User']", 'null': 'True', 'blank': 'True'})
+        },
+        'bitcoind.synccursor': {
+            'Meta': {'object_name': 'SyncCursor'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'shard': ('django.db.models.fields.PositiveSmallIntegerField', [], {'unique': 'True'}),
+            'time': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'txid': ('django.db.models.fields.CharField', [], {'max_length': '50', 'blank': 'True'})
+        },
+        'bitcoind.transaction': {
+            'Meta': {'object_name': 'Transaction'},
+            'account': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['bitcoind.Address']"}),
+            'address': ('django.db.models.fields.CharField', [], {'max_length': '50', 'blank': 'True'}),
+            'amount': ('django.db.models.fields.DecimalField', [], {'max_digits': '16', 'decimal_places': '8'}),
+            'category': ('django.db.models.fields.CharField', [], {'max_length': '8'}),
+            'comment': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'confirmations': ('django.db.models.fields.IntegerField', [], {'default': '0', 'max_length': '3'}),
+            'fee': ('django.db.models.fields.DecimalField', [], {'null': 'True', 'max_digits': '16', 'decimal_places': '8', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'otheraccount': ('django.db.models.fields.CharField', [], {'max_length': '100', 'blank': 'True'}),
+            'time': ('django.db.models.fields.DateTimeField', [], {'db_index': 'True'}),
+            'txid': ('django.db.models.fields.CharField', [], {'max_length': '50', 'db_index': 'True'})
+        },
+        'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        }
+    }
+
+    complete_apps = ['bitcoind']
\ No newline at end of file
@@ -1,22 +1,49 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.utils.translation import get_language_from_request, ugettext_lazy as _
 
 from bitcoind import *
-from bitcoind.util import getaccount
+from bitcoind.util import getaccount, decimal_amount
 
 DEFAULT_ADDRESS_LABEL = ""
 
 CATEGORY_CHOICES = (
     ("send", "Send"),
-    ("receive", "Receive")
+    ("receive", "Receive"),
+    ("generate", "Generate"),
+    ("move", "Move"),
 )
 class Address(models.Model):
-    user = models.ForeignKey(User, verbose_name=_('User'))
+    # Migration 0008 also indexes (user, is_primary), a lookup of the
+    # JSON-RPC views.
+    # Unclaimed addresses of the address pool have no user.
+    user = models.ForeignKey(User, verbose_name=_('User'), null=True, blank=True)
     label = models.CharField(_('Label'), max_length=50)
-    address = models.CharField(_('Address'), max_length=34)
-    #balance = models.DecimalField(_('Balance'), max_digits=16, decimal_places=8, default=0)
+    address = models.CharField(_('Address'), max_length=34, unique=True)
+    # Share of the bitcoind account's balance, counting payments with at
+    # least one confirmation like getbalance does. See increase().
+    balance = models.DecimalField(_('Balance'), max_digits=16, decimal_places=8, default=0)
     is_primary = models.BooleanField(_('Primary'), default=False)
+    # Index of the bitcoind wallet holding this address's keys and account.
+    shard = models.PositiveSmallIntegerField(_('Shard'), default=0)
+    # Claimed from the address pool, but still in the pool's bitcoind account.
+    pending_setaccount = models.BooleanField(_('Pending setaccount'), default=False)
+    # Set, with the user cleared, when rebalance_shards gave the owner a new
+    # address on another shard, which takes over the balance. Payments still
+    # sent here are booked to it, and swept to it.
+    moved_to = models.ForeignKey('self', verbose_name=_('Moved to'), null=True, blank=True,
+                                 related_name='moved_from')
+    # Set when a move or send debiting this address timed out: bitcoind may
+    # or may not have carried it out, so ledger.reconcile() sets the balance
+    # to bitcoind's and clears it.
+    unreconciled = models.BooleanField(_('Unreconciled'), default=False)
+    
+    class Meta:
+        # A label names one bitcoind account, and the views look its
+        # address up with get(). Pool and moved rows have no user, and
+        # NULLs don't clash.
+        unique_together = (("user", "label"),)
     
     def __unicode__(self):
         return self.address
@@ -25,19 +52,74 @@ class Address(models.Model):
         if self.label == "":
             return getaccount(self.user, self.label)
     
-    '''
     def increase(self, amount):
-        self.balance += amount
+        """
+        Add *amount* to the stored balance. This is a single ``UPDATE`` of
+        the column, so concurrent changes are not lost; the instance's
+        ``balance`` is not refreshed.
+        """
+        Address.objects.filter(pk=self.pk).update(balance=F('balance') + decimal_amount(amount))
         
     def decrease(self, amount):
-        self.balance -= amount
-    '''
+        self.increase(-amount)
     
+class TransactionManager(models.Manager):
+    def confirmed(self, confirmations, height):
+        """
+        Transactions with at least *confirmations* confirmations when the
+        best block is at *height*: a range on the indexed ``block_height``.
+        """
+        if confirmations < 1:
+            return self.all()
+        if confirmations == 1:
+            return self.filter(block_height__lte=height)
+        return self.filter(block_height__lte=height - confirmations + 1, block_height__gt=0)
+
 class Transaction(models.Model):
+    """
+    An entry of a wallet's ``listtransactions``, copied by the
+    ``sync_transactions`` command. *account* is the address the entry was
+    received on, or an address of the account it was sent or moved from.
+    """
+    # Migration 0008 also indexes (account, time), the order of the
+    # listtransactions view.
     account = models.ForeignKey(Address, verbose_name=_('Account'))
-    address = models.CharField(_('Address'), max_length=50)
-    category = models.CharField(_(""), choices=CATEGORY_CHOICES, max_length=7)
+    address = models.CharField(_('Address'), max_length=50, blank=True)
+    category = models.CharField(_(""), choices=CATEGORY_CHOICES, max_length=8)
     amount = models.DecimalField(_('Amount'), max_digits=16, decimal_places=8)
-    txid = models.CharField(_('TXID'), max_length=50)
-    confirmations = models.IntegerField(_("Confirmations"), max_length=3, default=0)
-    time = models.DateTimeField(_('Created'), auto_now_add=True)
\ No newline at end of file
+    fee = models.DecimalField(_('Fee'), max_digits=16, decimal_places=8, null=True, blank=True)
+    # Moves have no transaction; they get a txid made up by bitcoind.ledger.
+    txid = models.CharField(_('TXID'), max_length=50, db_index=True)
+    # Height of the block that included the transaction, None while it is
+    # unconfirmed and for moves. Rows copied before heights were stored have
+    # 0 until the next sync: confirmed, but with an unknown height, which
+    # counts as a single confirmation.
+    block_height = models.PositiveIntegerField(_('Block height'), null=True, blank=True, db_index=True)
+    time = models.DateTimeField(_('Time'), db_index=True)
+    otheraccount = models.CharField(_('Other account'), max_length=100, blank=True)
+    comment = models.CharField(_('Comment'), max_length=255, blank=True)
+    
+    objects = TransactionManager()
+    
+    def confirmations(self, height):
+        """
+        Returns the number of confirmations when the best block is at
+        *height*, or 1 for a confirmed row whose height is not known yet.
+        """
+        if self.block_height is None:
+            return 0
+        if self.block_height == 0:
+            return 1
+        return height - self.block_height + 1
+
+class SyncCursor(models.Model):
+    """
+    The newest ``listtransactions`` entry of a shard's wallet copied into
+    :class:`Transaction`.
+    """
+    shard = models.PositiveSmallIntegerField(_('Shard'), unique=True)
+    txid = models.CharField(_('TXID'), max_length=50, blank=True)
+    time = models.DateTimeField(_('Time'), null=True, blank=True)
+    # Set once reconcile_balances --fix has filled in the balances that
+    # migration 0006 added at zero. The views ask bitcoind until then.
+    balances_reconciled = models.BooleanField(_('Balances reconciled'), default=False)
@@ -0,0 +1,57 @@
+"""
+Who owns an address, answered from a process-local cache of
+:class:`~bitcoind.models.Address` so the sends and lookups of the JSON-RPC
+views don't query the table for every address they are given.
+
+Addresses are mapped to a ``(user id, label)`` pair, with a user id of
+:const:`None` for unclaimed pool addresses, or to :const:`None` for
+addresses that are not ours. Saving or deleting an address drops its
+entries, under its old and new address, in this process, and, through a
+log of changed addresses in Django's cache, in the other processes. That needs
+a ``CACHE_BACKEND`` the processes share; otherwise the other processes
+see changes when their entries expire, after ``BITCOIND_OWNER_CACHE_TTL``
+seconds. Changes made with ``QuerySet.update()`` send no signal, so their
+callers call :func:`invalidate` themselves.
+"""
+from django.conf import settings
+from django.db.models.signals import post_init, post_save, post_delete
+
+from bitcoind.cache import LRUCache
+from bitcoind.models import Address
+
+cache = LRUCache(getattr(settings, "BITCOIND_OWNER_CACHE_SIZE", 10000),
+                 generation_key="bitcoind.owners.generation",
+                 ttl=getattr(settings, "BITCOIND_OWNER_CACHE_TTL", 30))
+
+def _fetch(addresses):
+    rows = Address.objects.filter(address__in=addresses).values_list("address", "user", "label")
+    return dict((address, (user_id, label)) for (address, user_id, label) in rows)
+
+def owners(addresses):
+    """
+    Returns a dictionary mapping each of *addresses* to its owner.
+    """
+    return cache.get_many(addresses, _fetch)
+
+def owner(address):
+    """
+    Returns the ``(user id, label)`` pair of *address*, or :const:`None`.
+    """
+    return cache.get(address, _fetch)
+
+def invalidate(address):
+    cache.invalidate(address)
+
+def _address_loaded(sender, instance, **kwargs):
+    instance._loaded_address = instance.address
+
+def _address_changed(sender, instance, **kwargs):
+    loaded = getattr(instance, "_loaded_address", None)
+    if loaded and loaded != instance.address:
+        invalidate(loaded)
+    invalidate(instance.address)
+    instance._loaded_address = instance.address
+
+post_init.connect(_address_loaded, sender=Address)
+post_save.connect(_address_changed, sender=Address)
+post_delete.connect(_address_changed, sender=Address)
@@ -0,0 +1,208 @@
+"""
+Persistent HTTP/1.1 connection pool for the bitcoind JSON-RPC proxy.
+"""
+import base64
+import httplib
+import select
+import socket
+import threading
+import time
+import urllib
+from urlparse import urlsplit
+
+class _HTTPConnection(httplib.HTTPConnection):
+    """
+    An :class:`httplib.HTTPConnection` with Nagle's algorithm disabled, so small
+    requests on a kept-alive socket are not held back waiting for an ACK.
+    """
+    def connect(self):
+        httplib.HTTPConnection.connect(self)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+class HTTPConnectionPool(object):
+    """
+    A thread-safe pool of keep-alive :class:`httplib.HTTPConnection` objects
+    to a single JSON-RPC service URL.
+
+    Connections are handed out last-in first-out so the warmest socket is
+    reused, and connections that have been idle for longer than *idle_timeout*
+    are closed instead of reused, as are connections the server has closed
+    while they were idle. If a reused connection turns out to have been closed
+    by the server anyway, the request is retried once on a fresh connection
+    when that is safe; see :meth:`open`.
+
+    Arguments to constructor:
+
+    - *url* -- Service URL, optionally with ``user:password@`` credentials.
+    - *maxsize* -- Maximum number of idle connections kept open. With a *maxsize*
+      of 0 every request opens and closes its own connection.
+    - *idle_timeout* -- Seconds after which an idle connection is discarded.
+    - *timeout* -- Socket timeout in seconds, or :const:`None` for no timeout.
+    """
+    def __init__(self, url, maxsize=4, idle_timeout=30, timeout=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or httplib.HTTP_PORT
+        self.path = parts.path or '/'
+        self.headers = {'Content-Type': 'application/json'}
+        if parts.username is not None:
+            credentials = '%s:%s' % (urllib.unquote(parts.username),
+                                     urllib.unquote(parts.password or ''))
+            self.headers['Authorization'] = 'Basic ' + base64.b64encode(credentials)
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        # Stack of (last_used, connection) pairs, oldest first.
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """
+        Open a new connection to the service host.
+        """
+        if self.timeout is None:
+            return _HTTPConnection(self.host, self.port)
+        return _HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self):
+        """
+        Returns a ``(connection, reused)`` pair, taking an idle connection from
+        the pool if one is available.
+        """
+        stale = []
+        conn = None
+        now = time.time()
+        self._lock.acquire()
+        try:
+            while self._idle and now - self._idle[0][0] >= self.idle_timeout:
+                stale.append(self._idle.pop(0)[1])
+            while self._idle and conn is None:
+                conn = self._idle.pop()[1]
+                if _dropped(conn):
+                    stale.append(conn)
+                    conn = None
+        finally:
+            self._lock.release()
+        for c in stale:
+            c.close()
+        if conn is not None:
+            return conn, True
+        return self._connect(), False
+
+    def release(self, conn):
+        """
+        Return a connection to the pool, closing it if the pool is full.
+        """
+        self._lock.acquire()
+        try:
+            if len(self._idle) < self.maxsize:
+                self._idle.append((time.time(), conn))
+                return
+        finally:
+            self._lock.release()
+        conn.close()
+
+    def clear(self):
+        """
+        Close all idle connections.
+        """
+        self._lock.acquire()
+        try:
+            idle, self._idle = self._idle, []
+        finally:
+            self._lock.release()
+        for (last_used, conn) in idle:
+            conn.close()
+
+    def post(self, body, timeout=None, idempotent=False):
+        """
+        POST *body* to the service URL and return the response body.
+        """
+        conn, response = self.open(body, timeout, idempotent)
+        try:
+            return response.read()
+        finally:
+            self.finish(conn, response)
+
+    def open(self, body, timeout=None, idempotent=False):
+        """
+        POST *body* to the service URL and return a ``(connection, response)``
+        pair, leaving the response body unread so it can be read incrementally.
+        Hand both back to :meth:`finish` when done with the response.
+
+        *timeout* overrides the socket timeout of the pool for this request.
+
+        A request on a reused connection that could not be sent is retried
+        once on a new connection; the server closing an idle keep-alive
+        socket is not an error. If the request was sent but no response came
+        back, the server may have carried it out, so it is only retried if
+        it is *idempotent*.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        conn, reused = self.acquire()
+        try:
+            _settimeout(conn, timeout)
+            conn.request('POST', self.path, body, self.headers)
+        except (socket.error, httplib.CannotSendRequest), e:
+            conn.close()
+            if not reused or isinstance(e, socket.timeout):
+                raise
+            return self._retry(body, timeout)
+        except:
+            conn.close()
+            raise
+        try:
+            return conn, conn.getresponse()
+        except (socket.error, httplib.BadStatusLine), e:
+            conn.close()
+            # A timeout may have fired after the server started working on
+            # the request.
+            if not reused or not idempotent or isinstance(e, socket.timeout):
+                raise
+        except:
+            conn.close()
+            raise
+        return self._retry(body, timeout)
+
+    def _retry(self, body, timeout):
+        conn = self._connect()
+        try:
+            _settimeout(conn, timeout)
+            conn.request('POST', self.path, body, self.headers)
+            return conn, conn.getresponse()
+        except:
+            conn.close()
+            raise
+
+    def finish(self, conn, response):
+        """
+        Return *conn* to the pool if *response* was read completely and the
+        server keeps the connection alive, otherwise close it.
+        """
+        if response.isclosed() and not response.will_close:
+            self.release(conn)
+        else:
+            conn.close()
+
+def _settimeout(conn, timeout):
+    """
+    Set the socket timeout of *conn*, whether or not it is connected yet.
+    """
+    if timeout is None:
+        timeout = socket.getdefaulttimeout()
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+
+def _dropped(conn):
+    """
+    Returns :const:`True` if the server has closed the idle connection
+    *conn*: its socket is readable although no request is outstanding.
+    """
+    if conn.sock is None:
+        return False
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (select.error, socket.error, ValueError):
+        return True
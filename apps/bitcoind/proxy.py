@@ -18,11 +18,41 @@
   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 """
 
-import urllib
-try:
-    from json import dumps, loads
-except ImportError:
-    from simplejson import dumps, loads
+import socket
+import time
+
+from bitcoind import deadline
+from bitcoind.codec import dumps, loads
+from bitcoind.deadline import CallTimedOut, DeadlineExceeded
+from bitcoind.pool import HTTPConnectionPool
+from bitcoind.singleflight import Timeout
+from bitcoind import metrics as _metrics
+
+# Seconds a call may take, unless the request being served has less left.
+DEFAULT_TIMEOUT = 10
+
+# Methods that may legitimately take longer on a large wallet. A write that
+# times out may still have been carried out by bitcoind.
+TIMEOUTS = {
+    'listaccounts': 30,
+    'listreceivedbyaccount': 30,
+    'listreceivedbyaddress': 30,
+    'listtransactions': 30,
+    'move': 30,
+    'sendfrom': 30,
+    'sendtoaddress': 30,
+    'batch': 30,
+}
+
+# Read-only methods whose identical concurrent calls share one request
+# when the proxy has a SingleFlight. They are also the only calls the pool
+# sends again when a response was lost.
+COALESCED_METHODS = frozenset([
+    'getinfo', 'getblockcount', 'getblocknumber', 'getdifficulty', 'getconnectioncount',
+    'getbalance', 'getreceivedbyaccount', 'getreceivedbyaddress', 'getaccount',
+    'getaddressesbyaccount', 'listaccounts', 'listreceivedbyaccount', 'listreceivedbyaddress',
+    'listtransactions', 'validateaddress', 'gettransaction',
+])
 
 class JSONRPCException(Exception):
     def __init__(self, rpcError):
@@ -30,22 +60,172 @@ class JSONRPCException(Exception):
         self.error = rpcError
         
 class ServiceProxy(object):
-    def __init__(self, serviceURL, serviceName=None):
+    def __init__(self, serviceURL, serviceName=None, pool=None, metrics=None, singleflight=None,
+                 timeouts=None):
         self.__serviceURL = serviceURL
         self.__serviceName = serviceName
+        if pool is None:
+            pool = HTTPConnectionPool(serviceURL)
+        self.__pool = pool
+        if metrics is None:
+            metrics = _metrics.metrics
+        self.__metrics = metrics
+        self.__singleflight = singleflight
+        if timeouts is None:
+            timeouts = TIMEOUTS
+        self.__timeouts = timeouts
 
     def __getattr__(self, name):
         if self.__serviceName != None:
             name = "%s.%s" % (self.__serviceName, name)
-        return ServiceProxy(self.__serviceURL, name)
+        return ServiceProxy(self.__serviceURL, name, self.__pool, self.__metrics, self.__singleflight,
+                            self.__timeouts)
+
+    def __timeout(self, method):
+        """
+        Returns the seconds a call of *method* may take. Raises
+        :exc:`~bitcoind.deadline.DeadlineExceeded` if the current request has no time left.
+        """
+        return deadline.timeout(self.__timeouts.get(method, DEFAULT_TIMEOUT))
+
+    def __timed_out(self, method, timeout):
+        """
+        Returns the exception for a call of *method* that got no answer
+        within *timeout* seconds: :exc:`~bitcoind.deadline.CallTimedOut` if
+        that was the method's own timeout, :exc:`DeadlineExceeded` if it
+        was cut short by the request's deadline.
+        """
+        message = "bitcoind did not answer %s within %.3gs" % (method, timeout)
+        if timeout < self.__timeouts.get(method, DEFAULT_TIMEOUT):
+            return DeadlineExceeded(message)
+        return CallTimedOut(message)
+
+    def __post(self, postdata, timeout):
+        """
+        POST *postdata* and return the response as a ``(text, decoded)`` pair.
+        """
+        start = time.time()
+        try:
+            respdata = self.__pool.post(postdata, timeout, self.__serviceName in COALESCED_METHODS)
+            resp = loads(respdata)
+        except socket.timeout:
+            self.__metrics.record(self.__serviceName, time.time() - start, len(postdata),
+                                  error=_metrics.TIMEOUT_ERROR)
+            raise self.__timed_out(self.__serviceName, timeout)
+        except:
+            self.__metrics.record(self.__serviceName, time.time() - start, len(postdata),
+                                  error=_metrics.TRANSPORT_ERROR)
+            raise
+        self.__metrics.record(self.__serviceName, time.time() - start, len(postdata), len(respdata),
+                              _error_code(resp['error']))
+        return respdata, resp
 
     def __call__(self, *args):
          postdata = dumps({"method": self.__serviceName, 'params': args, 'id':'jsonrpc'})
-         respdata = urllib.urlopen(self.__serviceURL, postdata).read()
-         resp = loads(respdata)
+         timeout = self.__timeout(self.__serviceName)
+         if self.__singleflight is not None and self.__serviceName in COALESCED_METHODS:
+             # The request text is the key, so only calls with equal params
+             # are shared. Callers that joined decode their own copy.
+             try:
+                 (respdata, resp), leader = self.__singleflight.do(
+                     postdata, lambda: self.__post(postdata, timeout),
+                     lambda: self.__metrics.record_coalesced(self.__serviceName), timeout)
+             except Timeout:
+                 raise self.__timed_out(self.__serviceName, timeout)
+             if not leader:
+                 resp = loads(respdata)
+         else:
+             respdata, resp = self.__post(postdata, timeout)
          if resp['error'] != None:
              raise JSONRPCException(resp['error'])
          else:
              return resp['result']
-         
+
+    def _stream(self, *args):
+        """
+        Call the method like the proxy itself does, but return an iterator
+        over the items of its array result, decoded incrementally while the
+        response is read instead of after it has been read in full.
+        """
+        from bitcoind.stream import iterresult
+        postdata = dumps({"method": self.__serviceName, 'params': args, 'id':'jsonrpc'})
+        timeout = self.__timeout(self.__serviceName)
+        start = time.time()
+        error = _metrics.TRANSPORT_ERROR
+        response = None
+        try:
+            try:
+                conn, response = self.__pool.open(postdata, timeout, self.__serviceName in COALESCED_METHODS)
+            except socket.timeout:
+                error = _metrics.TIMEOUT_ERROR
+                raise self.__timed_out(self.__serviceName, timeout)
+            try:
+                for item in iterresult(response):
+                    yield item
+                error = None
+            except GeneratorExit:
+                # The caller stopped reading; the call itself went fine.
+                error = None
+                raise
+            except JSONRPCException, e:
+                error = _error_code(e.error)
+                raise
+            except socket.timeout:
+                error = _metrics.TIMEOUT_ERROR
+                raise self.__timed_out(self.__serviceName, timeout)
+            finally:
+                self.__pool.finish(conn, response)
+        finally:
+            # The body is not buffered, so its size is only known from the
+            # Content-Length header.
+            size = response is not None and int(response.getheader('content-length') or 0) or 0
+            self.__metrics.record(self.__serviceName, time.time() - start, len(postdata), size, error)
+
+    def _batch(self, calls):
+        """
+        Send *calls*, a list of ``(method, params)`` pairs, to the server as a
+        single JSON-RPC batch request.
+
+        Returns a list of ``(result, error)`` pairs in the order of *calls*.
+        """
+        if not calls:
+            return []
+        postdata = dumps([{"method": method, 'params': params, 'id': i}
+                          for (i, (method, params)) in enumerate(calls)])
+        timeout = self.__timeout("batch")
+        idempotent = all(method in COALESCED_METHODS for (method, params) in calls)
+        start = time.time()
+        try:
+            respdata = self.__pool.post(postdata, timeout, idempotent)
+            resp = loads(respdata)
+        except socket.timeout:
+            self.__metrics.record("batch", time.time() - start, len(postdata), error=_metrics.TIMEOUT_ERROR)
+            raise self.__timed_out("batch", timeout)
+        except:
+            self.__metrics.record("batch", time.time() - start, len(postdata), error=_metrics.TRANSPORT_ERROR)
+            raise
+        # Recorded as a whole; the errors of individual calls are not counted.
+        self.__metrics.record("batch", time.time() - start, len(postdata), len(respdata),
+                              not isinstance(resp, list) and _error_code(resp.get('error')) or None)
+        if not isinstance(resp, list):
+            # A server without batch support answers with a single error.
+            raise JSONRPCException(resp['error'])
+        replies = dict((r.get('id'), r) for r in resp)
+        missing = {'code': -32603, 'message': 'No response for batched call'}
+        results = []
+        for i in range(len(calls)):
+            reply = replies.get(i, {'result': None, 'error': missing})
+            results.append((reply.get('result'), reply.get('error')))
+        return results
+
+
+def _error_code(error):
+    """
+    Returns the code of the JSON-RPC error object *error*, or :const:`None`.
+    """
+    if error is None:
+        return None
+    if isinstance(error, dict):
+        return error.get('code')
+    return error
 
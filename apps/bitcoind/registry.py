@@ -0,0 +1,122 @@
+"""
+Lazily built, reloadable bitcoind connections.
+
+Nothing is read or connected when this module is imported. The connections
+are built on first use in each process and built again after
+``bitcoin.conf`` changes or the process receives ``SIGHUP``.
+"""
+import os
+import signal
+import threading
+
+from bitcoind.config import ConfigFile
+
+class ConnectionRegistry(object):
+    """
+    Holds the :class:`~bitcoind.sharding.ShardSet` of this process and
+    behaves like it, building it on first use.
+
+    Arguments to constructor:
+
+    - *build* -- Called with *config* to build the shard set.
+    - *config* -- :class:`~bitcoind.config.ConfigFile` the connections are
+      built from. When it changes the shard set is built again.
+    """
+    def __init__(self, build, config=None):
+        self.build = build
+        self.config = config or ConfigFile()
+        self._shards = None
+        self._pid = None
+        self._reload = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Returns the current shard set, building it if necessary.
+
+        If building a replacement fails, the previous shard set stays in use.
+        """
+        shards = self._shards
+        if shards is not None and self._pid == os.getpid() and not self._reload and not self.config.changed():
+            return shards
+        self._lock.acquire()
+        try:
+            if self._shards is shards:
+                self._reload = False
+                try:
+                    self._shards = self.build(self.config)
+                except (IOError, ValueError, KeyError):
+                    if shards is None or self._pid != os.getpid():
+                        raise
+                else:
+                    self._pid = os.getpid()
+                    if shards is not None:
+                        _close(shards)
+            return self._shards
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        """
+        Read the configuration and connect again on next use.
+        """
+        self.config.invalidate()
+        self._reload = True
+
+    def install_sighup(self):
+        """
+        Make ``SIGHUP`` call :meth:`reload`, passing the signal on to any
+        handler function installed before. The process no longer terminates
+        on ``SIGHUP``. Does nothing outside the main thread, where signal
+        handlers cannot be set.
+        """
+        try:
+            previous = signal.getsignal(signal.SIGHUP)
+            def handler(signum, frame):
+                self.reload()
+                if callable(previous):
+                    previous(signum, frame)
+            signal.signal(signal.SIGHUP, handler)
+        except (ValueError, AttributeError):
+            pass
+
+    def connection(self, shard):
+        """
+        Returns a stand-in for the connection of *shard* that looks it up on
+        every call, so it can be created before anything is connected.
+        """
+        return LazyConnection(self, shard)
+
+    def __len__(self):
+        return len(self.get())
+
+    def __getitem__(self, shard):
+        return self.get()[shard]
+
+    def __iter__(self):
+        return iter(self.get())
+
+    def home(self, user):
+        return self.get().home(user)
+
+class LazyConnection(object):
+    """
+    Forwards attribute access to the connection of a shard in a
+    :class:`ConnectionRegistry`.
+    """
+    def __init__(self, registry, shard):
+        self._registry = registry
+        self._shard = shard
+
+    def __getattr__(self, name):
+        return getattr(self._registry[self._shard], name)
+
+def _close(shards):
+    """
+    Close the idle HTTP connections of a shard set that has been replaced.
+    """
+    for conn in shards:
+        for c in [conn, getattr(conn, "primary", None)] + [n.conn for n in getattr(conn, "nodes", [])]:
+            pool = getattr(c, "pool", None)
+            if pool is not None:
+                pool.clear()
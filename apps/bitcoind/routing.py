@@ -0,0 +1,146 @@
+"""
+Routing of read-only calls across several bitcoind nodes.
+"""
+import httplib
+import threading
+import time
+
+from bitcoind.deadline import CallTimedOut
+
+# Errors that say something about the node rather than about the call. A
+# call cut short by the request's deadline says nothing about the node.
+NODE_ERRORS = (IOError, httplib.HTTPException, CallTimedOut)
+
+class Node(object):
+    """
+    A replica connection with its health and latency bookkeeping.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.latency = None
+        self.dead_until = 0
+
+    def alive(self, now):
+        return self.dead_until <= now
+
+    def record(self, elapsed, weight=0.3):
+        """
+        Fold the duration of a successful call into the moving average.
+        """
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += weight * (elapsed - self.latency)
+
+class RoutingConnection(object):
+    """
+    Wraps a primary :class:`~bitcoin.connection.BitcoinConnection` and sends
+    read-only calls that do not depend on the wallet to a set of replica
+    nodes instead. Every other call, including all wallet-mutating ones such
+    as ``move``, ``sendfrom`` and ``getnewaddress``, goes to the primary.
+
+    ``getreceivedbyaddress`` and the ``ismine`` flag of ``validateaddress``
+    only make sense on replicas that carry a copy of the primary's keys.
+
+    Arguments to constructor:
+
+    - *primary* -- Connection for everything that is not routed.
+    - *replicas* -- Connections that may answer :attr:`replica_methods`.
+    - *strategy* -- ``"round-robin"``, or ``"latency"`` to prefer the replica
+      with the lowest moving-average call time.
+    - *retry_after* -- Seconds a replica that failed stays out of rotation.
+    - *max_lag* -- Blocks a replica may be behind the primary before
+      :meth:`check` takes it out of rotation.
+    - *check_interval* -- Seconds between health checks run by :meth:`check`,
+      which is invoked as calls are routed.
+
+    If no replica is available, routed calls go to the primary.
+    """
+    replica_methods = frozenset([
+        "getblockcount", "getblocknumber", "getdifficulty", "getconnectioncount",
+        "validateaddress", "getreceivedbyaddress",
+    ])
+
+    def __init__(self, primary, replicas, strategy="round-robin", retry_after=30,
+                 max_lag=1, check_interval=10):
+        if strategy not in ("round-robin", "latency"):
+            raise ValueError("Unknown routing strategy %r" % strategy)
+        self.primary = primary
+        self.nodes = [Node(conn) for conn in replicas]
+        self.strategy = strategy
+        self.retry_after = retry_after
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = 0
+        self._checked = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name in self.replica_methods:
+            return lambda *args: self._route(name, args)
+        return getattr(self.primary, name)
+
+    def _candidates(self):
+        """
+        Returns the live replicas, in the order they should be tried.
+        """
+        now = time.time()
+        nodes = [n for n in self.nodes if n.alive(now)]
+        if not nodes:
+            return nodes
+        if self.strategy == "latency":
+            # Replicas without a measurement yet go first so they get one.
+            nodes.sort(key=lambda n: n.latency or 0)
+            return nodes
+        self._lock.acquire()
+        try:
+            start = self._next % len(nodes)
+            self._next += 1
+        finally:
+            self._lock.release()
+        return nodes[start:] + nodes[:start]
+
+    def _route(self, name, args):
+        if time.time() - self._checked >= self.check_interval:
+            self.check()
+        for node in self._candidates():
+            start = time.time()
+            try:
+                result = getattr(node.conn, name)(*args)
+            except NODE_ERRORS:
+                node.dead_until = time.time() + self.retry_after
+                continue
+            node.record(time.time() - start)
+            return result
+        return getattr(self.primary, name)(*args)
+
+    def check(self):
+        """
+        Probe every replica with ``getblockcount``. Replicas that fail, or that
+        lag the primary by more than *max_lag* blocks, are taken out of
+        rotation for *retry_after* seconds; the others are put back.
+        """
+        self._checked = time.time()
+        try:
+            height = self.primary.getblockcount()
+        except NODE_ERRORS:
+            height = None
+        for node in self.nodes:
+            start = time.time()
+            try:
+                blocks = node.conn.getblockcount()
+            except NODE_ERRORS:
+                node.dead_until = time.time() + self.retry_after
+                continue
+            if height is not None and height - blocks > self.max_lag:
+                node.dead_until = time.time() + self.retry_after
+            else:
+                node.dead_until = 0
+                node.record(time.time() - start)
+
+    def status(self):
+        """
+        Returns a list with the liveness and average latency of each replica.
+        """
+        now = time.time()
+        return [{"alive": n.alive(now), "latency": n.latency} for n in self.nodes]
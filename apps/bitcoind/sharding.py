@@ -0,0 +1,111 @@
+"""
+Partitioning of user wallets across several bitcoind instances.
+
+Each user's accounts live in one wallet, their *home shard*. New users are
+placed with :func:`shard_for`, a hash of the username that does not change
+between processes or restarts; the shard an address was created on is
+recorded in :attr:`Address.shard <bitcoind.models.Address.shard>`, so users
+stay put when the number of shards changes until ``rebalance_shards`` moves
+them.
+"""
+import hashlib
+
+def shard_for(username, count):
+    """
+    Returns the shard, between 0 and *count* - 1, that *username* hashes to.
+    """
+    if isinstance(username, unicode):
+        username = username.encode("utf-8")
+    return int(hashlib.md5(username).hexdigest()[:8], 16) % count
+
+class ShardSet(object):
+    """
+    The bitcoind connections of all shards, indexed by shard number.
+    """
+    def __init__(self, connections):
+        if not connections:
+            raise ValueError("At least one shard is required")
+        self.connections = list(connections)
+
+    def __len__(self):
+        return len(self.connections)
+
+    def __getitem__(self, shard):
+        return self.connections[shard]
+
+    def __iter__(self):
+        return iter(self.connections)
+
+    def home(self, user):
+        """
+        Returns the home shard of *user*: the shard of their primary (or
+        else newest) address, or the shard their username hashes to if they
+        have no addresses yet.
+        """
+        from bitcoind.models import Address
+
+        shards = Address.objects.filter(user=user).order_by("-is_primary", "-id").values_list("shard", flat=True)[:1]
+        if shards:
+            return shards[0]
+        return shard_for(user.username, len(self))
+
+def move_address(address, conn, shard):
+    """
+    Give the owner of the :class:`~bitcoind.models.Address` *address* a new
+    address with the same label on *shard*, reached through *conn*, and
+    return it.
+
+    The old row is kept, without a user and pointing at the new one, so
+    payments still sent to the old address are not lost; they stay in the
+    owner's account on the old shard until ``rebalance_shards`` sweeps them,
+    and :mod:`bitcoind.ledger` books them to the new address. The owner's
+    stored balance and transactions follow them to the new address, which
+    ``rebalance_shards`` debits again when it sends the sweep, as the
+    sweep is booked as a payment once it arrives.
+    """
+    from django.db import transaction
+    from bitcoind import util
+    from bitcoind.models import Address, Transaction
+
+    user, label, is_primary = address.user, address.label, address.is_primary
+    new = conn.getnewaddress(util.getaccount(user, label))
+    def move():
+        balance = Address.objects.get(pk=address.pk).balance
+        address.user = None
+        address.is_primary = False
+        address.balance = 0
+        address.save()
+        replacement = Address.objects.create(user=user, label=label, address=new, shard=shard,
+                                             is_primary=is_primary, balance=balance)
+        address.moved_to = replacement
+        address.save()
+        # Rows moved to this one before now point at the replacement too.
+        Address.objects.filter(moved_to=address).update(moved_to=replacement)
+        Transaction.objects.filter(account=address).update(account=replacement)
+        return replacement
+    return transaction.commit_on_success(move)()
+
+def connect_from_settings(config=None):
+    """
+    Returns a :class:`ShardSet` for the ``BITCOIND_SHARDS`` setting, a list
+    of dictionaries of :func:`~bitcoind.connect_to_remote` arguments, or for
+    the local bitcoind alone if the setting is missing. The local bitcoind's
+    credentials come from :func:`~bitcoind.config.credentials_from_settings`
+    with the :class:`~bitcoind.config.ConfigFile` *config*.
+
+    Read-only calls to the first shard are spread over ``BITCOIND_REPLICAS``
+    if that is set.
+    """
+    from django.conf import settings
+    from bitcoind.config import ConfigFile, credentials_from_settings
+    import bitcoind
+
+    configured = getattr(settings, "BITCOIND_SHARDS", None)
+    if configured:
+        connections = [bitcoind.connect_to_remote(**s) for s in configured]
+    else:
+        connections = [bitcoind.connect_to_remote(**credentials_from_settings(config or ConfigFile()))]
+    if getattr(settings, "BITCOIND_REPLICAS", None):
+        connections[0] = bitcoind.connect_with_replicas(connections[0], settings.BITCOIND_REPLICAS,
+                                                        strategy=getattr(settings, "BITCOIND_ROUTING", "round-robin"))
+    return ShardSet(connections)
@@ -0,0 +1,62 @@
+"""
+Coalescing of identical concurrent calls.
+"""
+import sys
+import threading
+
+class Timeout(Exception):
+    """
+    Raised when a joined call does not finish in time.
+    """
+
+class _Call(object):
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time. A thread that asks for a key
+    whose call is already in flight waits for that call and receives its
+    result, or its exception, instead of making the call again.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, on_join=None, timeout=None):
+        """
+        Returns a ``(value, leader)`` pair: the result of ``fn()``, and whether
+        this thread made the call. *on_join* is called before waiting when
+        joining a call made by another thread, and :exc:`Timeout` raised if
+        that call takes longer than *timeout* seconds.
+        """
+        self._lock.acquire()
+        call = self._calls.get(key)
+        if call is not None:
+            self._lock.release()
+            if on_join is not None:
+                on_join()
+            call.done.wait(timeout)
+            if not call.done.isSet():
+                raise Timeout(key)
+            if call.error is not None:
+                raise call.error[0], call.error[1], call.error[2]
+            return call.value, False
+        call = self._calls[key] = _Call()
+        self._lock.release()
+        try:
+            try:
+                call.value = fn()
+            except:
+                call.error = sys.exc_info()
+                raise
+        finally:
+            self._lock.acquire()
+            del self._calls[key]
+            self._lock.release()
+            call.done.set()
+        return call.value, True
@@ -0,0 +1,121 @@
+"""
+Incremental decoding of JSON-RPC responses.
+"""
+from bitcoind.codec import JSONDecoder
+
+from bitcoind.proxy import JSONRPCException
+
+WHITESPACE = ' \t\n\r'
+
+# Characters that end a number, true, false or null.
+DELIMITERS = WHITESPACE + ',:]}'
+
+class _Reader(object):
+    """
+    Buffered view of a file-like object for decoding JSON values one at a time.
+    Consumed input is discarded, so the buffer only ever holds about one
+    value and one chunk.
+    """
+    def __init__(self, fp, chunksize):
+        self.fp = fp
+        self.chunksize = chunksize
+        self.decoder = JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Read another chunk. Returns :const:`False` at end of input.
+        """
+        if self.eof:
+            return False
+        data = self.fp.read(self.chunksize)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character without consuming it.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, chars):
+        """
+        Consume and return the next character, which must be one of *chars*.
+        """
+        c = self.peek()
+        if c not in chars:
+            raise ValueError("Expected one of %r at %r" % (chars, self.buf[self.pos:self.pos+20]))
+        self.pos += 1
+        return c
+
+    def value(self):
+        """
+        Decode and consume the next complete JSON value.
+        """
+        first = self.peek()
+        while True:
+            if first not in '{["':
+                # A scalar running up to the end of the buffer may continue
+                # in the next chunk, even where its start already decodes,
+                # as with "1." or "2e".
+                end = self.pos
+                while end < len(self.buf) and self.buf[end] not in DELIMITERS:
+                    end += 1
+                if end == len(self.buf) and self.fill():
+                    continue
+            try:
+                value, end = self.decoder.raw_decode(self.buf, idx=self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            self.pos = end
+            return value
+
+def iterresult(fp, chunksize=8192):
+    """
+    Decode the JSON-RPC response object read from *fp* and yield the items
+    of its ``result`` array as they are decoded.
+
+    Raises :class:`~bitcoin.proxy.JSONRPCException` if the response carries an
+    error. A result that is not an array is yielded as a whole, unless it
+    is :const:`None`.
+    """
+    reader = _Reader(fp, chunksize)
+    members = {}
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.pos += 1
+    else:
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == 'result' and reader.peek() == '[':
+                reader.pos += 1
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.expect(',]') == ']':
+                            break
+            else:
+                members[key] = reader.value()
+            if reader.expect(',}') == '}':
+                break
+    if members.get('error') is not None:
+        raise JSONRPCException(members['error'])
+    if members.get('result') is not None:
+        yield members['result']
@@ -0,0 +1,19 @@
+from bitcoind.tests.pool import *
+from bitcoind.tests.batch import *
+from bitcoind.tests.cache import *
+from bitcoind.tests.codec import *
+from bitcoind.tests.util import *
+from bitcoind.tests.stream import *
+from bitcoind.tests.routing import *
+from bitcoind.tests.sharding import *
+from bitcoind.tests.base58 import *
+from bitcoind.tests.registry import *
+from bitcoind.tests.metrics import *
+from bitcoind.tests.fakebitcoind import *
+from bitcoind.tests.benchmark import *
+from bitcoind.tests.addresspool import *
+from bitcoind.tests.singleflight import *
+from bitcoind.tests.deadline import *
+from bitcoind.tests.ledger import *
+from bitcoind.tests.queries import *
+from bitcoind.tests.owners import *
@@ -0,0 +1,96 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import IntegrityError
+from django.http import HttpRequest
+from django.test import TestCase
+
+from jsonrpc import jsonrpc_site
+
+from bitcoind import addresspool, sharding
+from bitcoind.connection import BitcoinConnection
+from bitcoind.fakebitcoind import FakeBitcoind, Wallet
+from bitcoind.models import Address
+from bitcoind.sharding import ShardSet
+
+class AddressPoolTest(TestCase):
+    def setUp(self):
+        self.server = FakeBitcoind(("127.0.0.1", 0), Wallet())
+        self.server.start()
+        self.conn = BitcoinConnection("user", "password", *self.server.server_address)
+        self.alice = User.objects.create(username="alice")
+        self.bob = User.objects.create(username="bob")
+
+    def tearDown(self):
+        self.conn.pool.clear()
+        self.server.stop()
+
+    def test_refill(self):
+        self.assertEqual(addresspool.refill(self.conn, 0, 5, 12, batch_size=5), 12)
+        self.assertEqual(Address.objects.filter(user__isnull=True).count(), 12)
+        self.assertEqual(len(self.conn.getaddressesbyaccount(addresspool.POOL_ACCOUNT)), 12)
+        # Above the low watermark nothing is added.
+        self.assertEqual(addresspool.refill(self.conn, 0, 5, 12), 0)
+
+    def test_claim(self):
+        addresspool.refill(self.conn, 0, 2, 2)
+        first = addresspool.claim(self.alice, "", 0, True)
+        second = addresspool.claim(self.bob, "savings", 0)
+        self.assertNotEqual(first, second)
+        self.assertEqual(addresspool.claim(self.bob, "other", 0), None)
+        self.assertEqual(addresspool.claim(self.bob, "other", 1), None)
+        address = Address.objects.get(address=first)
+        self.assertEqual((address.user, address.is_primary, address.pending_setaccount), (self.alice, True, True))
+
+    def test_claim_taken_label(self):
+        addresspool.refill(self.conn, 0, 2, 2)
+        first = addresspool.claim(self.bob, "savings", 0)
+        # As if a concurrent request claimed one first.
+        self.assertEqual(addresspool.claim(self.bob, "savings", 0), first)
+        self.assertEqual(Address.objects.filter(user__isnull=True).count(), 1)
+        self.assertRaises(IntegrityError, Address.objects.create, user=self.bob, label="savings",
+                          address=self.conn.getnewaddress("bob+savings"))
+
+    def test_relabel(self):
+        addresspool.refill(self.conn, 0, 1, 1)
+        address = addresspool.claim(self.bob, "savings", 0)
+        self.assertEqual(self.conn.getaccount(address), addresspool.POOL_ACCOUNT)
+        self.assertEqual(addresspool.relabel(self.conn, 0), 1)
+        self.assertEqual(self.conn.getaccount(address), "bob+savings")
+        self.assertFalse(Address.objects.get(address=address).pending_setaccount)
+        self.assertEqual(addresspool.relabel(self.conn, 0), 0)
+
+    def test_claim_sets_account(self):
+        addresspool.refill(self.conn, 0, 1, 1)
+        address = addresspool.claim(self.bob, "savings", 0, conn=self.conn)
+        self.assertEqual(self.conn.getaccount(address), "bob+savings")
+        self.assertFalse(Address.objects.get(address=address).pending_setaccount)
+        self.assertEqual(addresspool.relabel(self.conn, 0), 0)
+
+    def test_views(self):
+        from bitcoind import views
+        views.shards.build = lambda config: ShardSet([self.conn])
+        views.shards.reload()
+        try:
+            addresspool.refill(self.conn, 0, 1, 1)
+            request = HttpRequest()
+            request.user = self.bob
+            address = jsonrpc_site.urls["getnewaddress"](request)
+            self.assertEqual(self.conn.getaccount(address), "bob+")
+            self.assertEqual(jsonrpc_site.urls["getaccountaddress"](request, ""), address)
+            # Addresses bitcoind hands out get a row too.
+            other = jsonrpc_site.urls["getaccountaddress"](request, "savings")
+            self.assertEqual(Address.objects.get(address=other).label, "savings")
+        finally:
+            views.shards.build = sharding.connect_from_settings
+            views.shards.reload()
+
+    def test_validateaddress_anonymous(self):
+        from bitcoind import views
+        addresspool.refill(self.conn, 0, 1, 1)
+        pooled = Address.objects.get(user__isnull=True).address
+        Address.objects.create(user=self.bob, label="savings", address=self.conn.getnewaddress("bob+savings"))
+        owned = Address.objects.get(user=self.bob).address
+        for user in (AnonymousUser(), self.alice):
+            results = views._validateaddresses(user, [pooled, owned])
+            self.assertEqual([r["ismine"] for r in results], [True, True])
+            self.assertFalse("account" in results[0] or "account" in results[1])
+        self.assertEqual(views._validateaddresses(self.bob, [owned])[0]["account"], "savings")
@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from bitcoind.base58 import b58encode, b58encode_check, b58decode, b58decode_check, address_version, MAINNET, TESTNET
+
+GENESIS = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
+
+class Base58Test(TestCase):
+    def test_decode(self):
+        self.assertEqual(b58decode(""), "")
+        self.assertEqual(b58decode("1"), "\0")
+        self.assertEqual(b58decode("11z"), "\0\0\x39")
+        self.assertEqual(b58decode("5Q"), "\xff")
+        self.assertRaises(ValueError, b58decode, "0OIl")
+
+    def test_encode(self):
+        for data in ("", "\0", "\0\0\x39", "\xff", "\0" + "hello"):
+            self.assertEqual(b58decode(b58encode(data)), data)
+        self.assertEqual(b58encode_check(b58decode_check(GENESIS)), GENESIS)
+
+    def test_decode_check(self):
+        payload = b58decode_check(GENESIS)
+        self.assertEqual(payload.encode("hex"), "0062e907b15cbf27d5425399ebf6f0fb50ebb88f18")
+        self.assertRaises(ValueError, b58decode_check, GENESIS[:-1] + "b")
+
+    def test_address_version(self):
+        self.assertEqual(address_version(GENESIS), MAINNET)
+        self.assertEqual(address_version(unicode(GENESIS)), MAINNET)
+        self.assertEqual(address_version("1BitcoinEaterAddressDontSendf59kuE"), MAINNET)
+        self.assertEqual(address_version("mipcBbFg9gMiCh81Kj8tqqdgoZub1ZJRfn"), TESTNET)
+
+    def test_invalid_addresses(self):
+        for address in ("", "1", GENESIS[1:], GENESIS + "1", u"1A1zP1eP5QGefi2DMPTfTL5SLmv7Divf\xe9a",
+                        None, 12, "1" * 1000):
+            self.assertRaises(ValueError, address_version, address)
@@ -0,0 +1,42 @@
+from __future__ import with_statement
+from django.test import TestCase
+
+from bitcoind.connection import BitcoinConnection
+from bitcoind.exceptions import InsufficientFunds
+from bitcoind.tests.server import KeepAliveServer
+
+class BatchTest(TestCase):
+    def setUp(self):
+        self.server = KeepAliveServer()
+        self.server.start()
+        self.conn = BitcoinConnection("user", "password", "127.0.0.1",
+                                      self.server.server_address[1])
+
+    def tearDown(self):
+        self.conn.pool.clear()
+        self.server.stop()
+
+    def test_single_round_trip(self):
+        with self.conn.batch() as batch:
+            results = [batch.echo(i) for i in range(10)]
+        self.assertEqual([r.get() for r in results], [[i] for i in range(10)])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_item_errors_are_wrapped(self):
+        with self.conn.batch() as batch:
+            ok = batch.echo("a")
+            failed = batch.fail(-6)
+        self.assertEqual(ok.get(), ["a"])
+        self.assertRaises(InsufficientFunds, failed.get)
+
+    def test_not_executed(self):
+        batch = self.conn.batch()
+        result = batch.getblockcount()
+        self.assertRaises(RuntimeError, result.get)
+        self.assertEqual(batch.execute(), [result])
+        self.assertEqual(result.get(), 1)
+
+    def test_empty_batch(self):
+        with self.conn.batch() as batch:
+            pass
+        self.assertEqual(self.server.requests, [])
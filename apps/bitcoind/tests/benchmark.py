@@ -0,0 +1,24 @@
+from django.test import TestCase
+
+from bitcoind.benchmarks.endpoint import compare
+
+def _run(**methods):
+    result = {"methods": {}}
+    for (name, (rpcs, queries, p50)) in methods.iteritems():
+        result["methods"][name] = {"rpcs_per_call": rpcs, "queries_per_call": queries,
+                                   "p50_ms": p50, "errors": 0}
+    return result
+
+class CompareTest(TestCase):
+    def test_no_regressions(self):
+        old = _run(getinfo=(1, 0, 1.0), listaccounts=(1, 3, 2.0))
+        new = _run(getinfo=(0, 0, 1.1), listaccounts=(1, 3, 2.0), move=(5, 5, 5))
+        self.assertEqual(compare(old, new), [])
+
+    def test_regressions(self):
+        old = _run(getinfo=(1, 0, 1.0), listaccounts=(1, 3, 2.0))
+        new = _run(getinfo=(1, 0, 1.5), listaccounts=(4, 3, 2.0))
+        regressions = compare(old, new)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("getinfo: p50"))
+        self.assertTrue(regressions[1].startswith("listaccounts: rpcs_per_call"))
@@ -0,0 +1,160 @@
+from django.test import TestCase
+
+from bitcoind.cache import HeightProbe, BlockCache, AccountCache, ChainStateCache, LRUCache
+
+class FakeChain(object):
+    def __init__(self):
+        self.blocks = 100
+        self.probes = 0
+
+    def getblockcount(self):
+        self.probes += 1
+        return self.blocks
+
+    def getdifficulty(self):
+        self.probes += 1
+        return 1.5
+
+class BlockCacheTest(TestCase):
+    def setUp(self):
+        self.chain = FakeChain()
+        self.cache = BlockCache(HeightProbe(self.chain, interval=0))
+        self.fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        return self.fetches
+
+    def test_cached_within_block(self):
+        self.assertEqual(self.cache.get("a", self.fetch), 1)
+        self.assertEqual(self.cache.get("a", self.fetch), 1)
+        self.assertEqual(self.cache.get("b", self.fetch), 2)
+
+    def test_new_block_drops_entries(self):
+        self.cache.get("a", self.fetch)
+        self.chain.blocks += 1
+        self.assertEqual(self.cache.get("a", self.fetch), 2)
+
+    def test_invalidate(self):
+        self.cache.get("a", self.fetch)
+        self.cache.get("b", self.fetch)
+        self.cache.invalidate("a")
+        self.assertEqual(self.cache.get("a", self.fetch), 3)
+        self.assertEqual(self.cache.get("b", self.fetch), 2)
+
+    def test_probe_interval(self):
+        probe = HeightProbe(self.chain, interval=60)
+        probe.height()
+        self.chain.blocks += 1
+        self.assertEqual(probe.height(), 100)
+        self.assertEqual(self.chain.probes, 1)
+
+    def test_ttl(self):
+        cache = BlockCache(HeightProbe(self.chain, interval=0), ttl=0)
+        cache.get("a", self.fetch)
+        self.assertEqual(cache.get("a", self.fetch), 2)
+
+    def test_stats(self):
+        self.cache.get("a", self.fetch)
+        self.cache.get("a", self.fetch)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+class ChainStateCacheTest(TestCase):
+    def test_cached_until_new_block(self):
+        chain = FakeChain()
+        cached = ChainStateCache(chain, HeightProbe(chain, interval=0))
+        self.assertEqual(cached.getdifficulty(), 1.5)
+        self.assertEqual(cached.getdifficulty(), 1.5)
+        # One probe and one fetch for the first call, one probe for the second.
+        self.assertEqual(chain.probes, 3)
+        chain.blocks += 1
+        cached.getdifficulty()
+        self.assertEqual(cached.cache.misses, 2)
+
+class AccountCacheTest(TestCase):
+    def test_invalidate_accounts(self):
+        cache = AccountCache(HeightProbe(FakeChain(), interval=0))
+        cache.get(("alice+", "getbalance"), lambda: 1)
+        cache.get(("alice+", "getreceivedbyaccount", 1), lambda: 2)
+        cache.get(("bob+", "getbalance"), lambda: 3)
+        cache.invalidate_accounts("alice+")
+        self.assertEqual(cache.get(("alice+", "getbalance"), lambda: 4), 4)
+        self.assertEqual(cache.get(("bob+", "getbalance"), lambda: 5), 3)
+
+class LRUCacheTest(TestCase):
+    def setUp(self):
+        self.fetched = []
+
+    def fetch(self, keys):
+        self.fetched.extend(keys)
+        return dict((k, k.upper()) for k in keys if k != "x")
+
+    def test_get_many(self):
+        cache = LRUCache(size=10)
+        self.assertEqual(cache.get_many(["a", "x"], self.fetch), {"a": "A", "x": None})
+        self.assertEqual(cache.get_many(["a", "b", "x"], self.fetch), {"a": "A", "b": "B", "x": None})
+        # Missing values are cached too.
+        self.assertEqual(sorted(self.fetched), ["a", "b", "x"])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (2, 3, 3))
+
+    def test_least_recently_used_dropped(self):
+        cache = LRUCache(size=2)
+        cache.get("a", self.fetch)
+        cache.get("b", self.fetch)
+        cache.get("a", self.fetch)
+        cache.get("c", self.fetch)
+        del self.fetched[:]
+        cache.get_many(["a", "b", "c"], self.fetch)
+        self.assertEqual(self.fetched, ["b"])
+
+    def test_invalidate(self):
+        cache = LRUCache()
+        cache.get_many(["a", "b"], self.fetch)
+        cache.invalidate("a")
+        del self.fetched[:]
+        cache.get_many(["a", "b"], self.fetch)
+        self.assertEqual(self.fetched, ["a"])
+
+    def test_ttl(self):
+        cache = LRUCache(ttl=0)
+        cache.get("a", self.fetch)
+        cache.get("a", self.fetch)
+        self.assertEqual(self.fetched, ["a", "a"])
+
+    def test_generation(self):
+        # Two processes sharing Django's cache.
+        first = LRUCache(generation_key="test.lrucache.generation", interval=0)
+        second = LRUCache(generation_key="test.lrucache.generation", interval=0)
+        first.get_many(["a", "b"], self.fetch)
+        second.get_many(["a", "b"], self.fetch)
+        first.invalidate()
+        del self.fetched[:]
+        first.get("a", self.fetch)
+        second.get("a", self.fetch)
+        self.assertEqual(self.fetched, ["a", "a"])
+
+    def test_invalidate_key(self):
+        first = LRUCache(generation_key="test.lrucache.key", interval=0)
+        second = LRUCache(generation_key="test.lrucache.key", interval=0)
+        first.get_many(["a", "b"], self.fetch)
+        second.get_many(["a", "b"], self.fetch)
+        first.invalidate("b")
+        first.invalidate("c")
+        del self.fetched[:]
+        # Only the changed keys are dropped, and not again for our own change.
+        first.get_many(["a", "b"], self.fetch)
+        second.get_many(["a", "b"], self.fetch)
+        self.assertEqual(self.fetched, ["b", "b"])
+
+    def test_log_overflow(self):
+        first = LRUCache(generation_key="test.lrucache.log", interval=0, log_size=2)
+        second = LRUCache(generation_key="test.lrucache.log", interval=0, log_size=2)
+        first.invalidate("x")
+        second.get_many(["a", "b"], self.fetch)
+        for key in ("c", "d", "e"):
+            first.invalidate(key)
+        del self.fetched[:]
+        second.get_many(["a", "b"], self.fetch)
+        self.assertEqual(sorted(self.fetched), ["a", "b"])
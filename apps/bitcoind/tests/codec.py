@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase
+
+from bitcoind.codec import dumps, loads
+
+class CodecTest(TestCase):
+    def test_dumps(self):
+        self.assertEqual(loads(dumps({"amount": Decimal("0.5")}, cls=DjangoJSONEncoder)), {"amount": "0.5"})
+        self.assertEqual(dumps({"b": 1, "a": 2}, sort_keys=True), '{"a": 2, "b": 1}')
+        self.assertEqual(dumps([1, 2], cls=DjangoJSONEncoder, separators=(",", ":")), "[1,2]")
+
+    def test_without_settings(self):
+        # The client must not need Django settings.
+        env = dict(os.environ)
+        env.pop("DJANGO_SETTINGS_MODULE", None)
+        env["PYTHONPATH"] = os.pathsep.join(sys.path)
+        code = "import bitcoind.connection, bitcoind.stream; import django.conf; print django.conf.settings.configured"
+        process = subprocess.Popen([sys.executable, "-c", code], env=env,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+        self.assertEqual((process.returncode, output.strip()), (0, "False"))
@@ -0,0 +1,84 @@
+import time
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.test import TestCase
+
+from jsonrpc.site import JSONRPCSite
+
+from bitcoind import deadline
+from bitcoind.codec import dumps, loads
+from bitcoind.deadline import DeadlineExceeded
+from bitcoind.fakebitcoind import FakeBitcoind, Wallet
+from bitcoind.metrics import Metrics, TIMEOUT_ERROR
+from bitcoind.pool import HTTPConnectionPool
+from bitcoind.proxy import ServiceProxy
+from bitcoind.singleflight import SingleFlight
+
+class DeadlineTest(TestCase):
+    def setUp(self):
+        self.server = FakeBitcoind(("127.0.0.1", 0), Wallet(), latency=0.5)
+        url = self.server.start()
+        self.pool = HTTPConnectionPool(url)
+        self.metrics = Metrics()
+        self.proxy = ServiceProxy(url, pool=self.pool, metrics=self.metrics,
+                                  singleflight=SingleFlight(), timeouts={"getblockcount": 0.1})
+
+    def tearDown(self):
+        deadline.clear()
+        self.pool.clear()
+        self.server.stop()
+
+    def assertTimesOut(self, fn, seconds):
+        start = time.time()
+        self.assertRaises(DeadlineExceeded, fn)
+        self.assertTrue(time.time() - start < seconds)
+
+    def test_method_timeout(self):
+        self.assertTimesOut(self.proxy.getblockcount, 0.2)
+        # Methods without their own timeout get the default.
+        self.assertTrue(self.proxy.getinfo()["blocks"] > 0)
+
+    def test_request_deadline(self):
+        deadline.start(0.1)
+        self.assertTimesOut(self.proxy.getinfo, 0.3)
+        self.assertEqual(self.metrics.snapshot()["getinfo"]["errors"], {TIMEOUT_ERROR: 1})
+        self.assertTimesOut(lambda: self.proxy._batch([("getinfo", [])]), 0.1)
+        self.assertFalse("batch" in self.metrics.snapshot())
+
+    def test_timeout_resets_reused_connection(self):
+        deadline.start(0.1)
+        self.assertRaises(DeadlineExceeded, self.proxy.getinfo)
+        deadline.clear()
+        self.assertTrue(self.proxy.getinfo()["blocks"] > 0)
+
+class DispatchDeadlineTest(TestCase):
+    def setUp(self):
+        self.site = JSONRPCSite()
+        self.site.register("remaining", lambda request: [deadline.remaining()])
+        self.site.register("expire", lambda request: deadline.start(-1) or deadline.timeout())
+
+    def tearDown(self):
+        if hasattr(settings, "JSONRPC_TIMEOUT"):
+            del settings.JSONRPC_TIMEOUT
+
+    def call(self, method):
+        request = HttpRequest()
+        request.method = "POST"
+        request.raw_post_data = dumps({"method": method, "params": [], "id": 1})
+        response = self.site.dispatch(request)
+        return response.status_code, loads(response.content)
+
+    def test_no_deadline(self):
+        self.assertEqual(self.call("remaining")[1]["result"], [None])
+
+    def test_deadline(self):
+        settings.JSONRPC_TIMEOUT = 5
+        status, response = self.call("remaining")
+        self.assertTrue(4 < response["result"][0] <= 5)
+        self.assertEqual(deadline.remaining(), None)
+
+    def test_deadline_exceeded(self):
+        status, response = self.call("expire")
+        self.assertEqual(status, 504)
+        self.assertEqual(response["error"]["code"], -32001)
@@ -0,0 +1,63 @@
+from django.test import TestCase
+
+from bitcoind.connection import BitcoinConnection
+from bitcoind.exceptions import BitcoinException, InsufficientFunds, InvalidAmount, NotConnected
+from bitcoind.fakebitcoind import FakeBitcoind, Wallet
+
+class FakeBitcoindTest(TestCase):
+    def setUp(self):
+        self.wallet = Wallet(seed_accounts=1000, seed_balance=2)
+        self.server = FakeBitcoind(("127.0.0.1", 0), self.wallet)
+        self.server.start()
+        self.conn = BitcoinConnection("user", "password", *self.server.server_address)
+
+    def tearDown(self):
+        self.conn.pool.clear()
+        self.server.stop()
+
+    def test_seeded_accounts(self):
+        accounts = self.conn.listaccounts()
+        self.assertEqual(len(accounts), 1000)
+        self.assertEqual(accounts["user999+"], 2)
+        address = self.conn.getaccountaddress("user5+")
+        validation = self.conn.validateaddress(address)
+        self.assertTrue(validation.isvalid and validation.ismine)
+        self.assertEqual(self.conn.getaccount(address), "user5+")
+        self.assertEqual(self.conn.getreceivedbyaddress(address), 2)
+        self.assertEqual(len(self.conn.listtransactions("user5+")), 1)
+
+    def test_move(self):
+        self.assertTrue(self.conn.move("user1+", "user2+", 1.5))
+        self.assertEqual(self.conn.getbalance("user1+"), 0.5)
+        self.assertEqual(self.conn.getbalance("user2+"), 3.5)
+        self.assertRaises(InsufficientFunds, self.conn.move, "user1+", "user2+", 1)
+        self.assertRaises(InvalidAmount, self.conn.move, "user1+", "user2+", -1)
+        self.assertEqual([t.category for t in self.conn.listtransactions("user2+")], ["receive", "move"])
+
+    def test_total(self):
+        self.assertEqual(self.conn.getbalance("*"), 2000)
+        self.conn.move("user1+", "user2+", 1.5)
+        self.conn.sendfrom("user3+", self.conn.getnewaddress("alice+"), 1)
+        self.conn.sendfrom("user4+", "1BitcoinEaterAddressDontSendf59kuE", 0.5)
+        self.assertEqual(self.conn.getbalance("*"), 1999.5)
+        self.assertEqual(self.conn.getinfo().balance, 1999.5)
+        self.assertEqual(sum(self.conn.listaccounts().values()), 1999.5)
+
+    def test_sendfrom_to_own_address(self):
+        address = self.conn.getnewaddress("alice+")
+        txid = self.conn.sendfrom("user1+", address, 1)
+        self.assertEqual(self.conn.getbalance("alice+"), 1)
+        self.assertEqual(self.conn.getreceivedbyaddress(address), 1)
+        self.assertEqual([t.txid for t in self.conn.listtransactions("*", 2)], [txid, txid])
+
+    def test_wrong_parameters(self):
+        call = lambda method, *params: self.server.call({"method": method, "params": list(params), "id": 1})
+        self.assertEqual(call("getaccount")["error"]["code"], BitcoinException.INVALID_PARAMETER)
+        self.assertEqual(call("getnewaddress", "a", "b")["error"]["code"], BitcoinException.INVALID_PARAMETER)
+        self.assertEqual(call("getnewaddress")["error"], None)
+        # Raised inside the method, so not a matter of counting.
+        self.assertEqual(call("getaccount", ["1abc"])["error"]["code"], BitcoinException.INTERNAL_ERROR)
+
+    def test_injected_errors(self):
+        self.server.error_rate = 1
+        self.assertRaises(NotConnected, self.conn.getbalance, "user1+")
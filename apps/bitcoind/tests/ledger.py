@@ -0,0 +1,273 @@
+import httplib
+import socket
+
+from django.contrib.auth.models import User
+from django.http import HttpRequest
+from django.test import TestCase, TransactionTestCase
+
+from jsonrpc import jsonrpc_site
+
+from bitcoind import ledger, owners, sharding
+from bitcoind.connection import BitcoinConnection
+from bitcoind.deadline import DeadlineExceeded
+from bitcoind.exceptions import InsufficientFunds
+from bitcoind.fakebitcoind import FakeBitcoind, Wallet
+from bitcoind.models import Address, Transaction, SyncCursor
+from bitcoind.sharding import ShardSet
+
+class WalletMixin(object):
+    def setUp(self):
+        # Rolled back rows send no signal.
+        owners.cache.invalidate()
+        self.wallet = Wallet(seed_accounts=2, seed_balance=10)
+        self.server = FakeBitcoind(("127.0.0.1", 0), self.wallet)
+        self.server.start()
+        self.conn = BitcoinConnection("user", "password", *self.server.server_address)
+        self.alice = User.objects.create(username="alice")
+        self.default = Address.objects.create(user=self.alice, label="", is_primary=True,
+                                              address=self.conn.getnewaddress("alice+"))
+        self.savings = Address.objects.create(user=self.alice, label="savings",
+                                              address=self.conn.getnewaddress("alice+savings"))
+        self.external = self.conn.getaccountaddress("user1+")
+        SyncCursor.objects.create(shard=0, balances_reconciled=True)
+        ledger.balances_reconciled(1)
+
+    def tearDown(self):
+        ledger._reconciled.clear()
+        self.conn.pool.clear()
+        self.server.stop()
+
+    def balance(self, address):
+        return float(Address.objects.get(pk=address.pk).balance)
+
+class LedgerTest(WalletMixin, TestCase):
+    def test_sync(self):
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        self.conn.move("alice+", "alice+savings", 2)
+        self.conn.sendfrom("alice+", self.external, 1)
+        # The send from user0+ has no owner here.
+        self.assertEqual(ledger.sync(self.conn, 0, page_size=2), (4, 0))
+        rows = Transaction.objects.order_by("id")
+        self.assertEqual([(t.account_id, t.category, float(t.amount)) for t in rows], [
+            (self.default.id, "receive", 5),
+            (self.default.id, "move", -2),
+            (self.savings.id, "move", 2),
+            (self.default.id, "send", -1),
+        ])
+        self.assertEqual(rows[0].address, self.default.address)
+        self.assertEqual(rows[1].otheraccount, "alice+savings")
+        self.assertEqual(SyncCursor.objects.get(shard=0).txid, rows[3].txid)
+        self.assertEqual(ledger.sync(self.conn, 0, page_size=2), (0, 0))
+
+    def test_identical_moves(self):
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        self.conn.move("alice+", "alice+savings", 1)
+        self.conn.move("alice+", "alice+savings", 1)
+        for entry in self.wallet.log[2:]:
+            entry["time"] = self.wallet.log[2]["time"]
+        self.assertEqual(ledger.sync(self.conn, 0), (5, 0))
+        self.conn.move("alice+", "alice+savings", 1)
+        self.wallet.log[-2]["time"] = self.wallet.log[-1]["time"] = self.wallet.log[2]["time"]
+        self.assertEqual(ledger.sync(self.conn, 0), (2, 0))
+        moves = Transaction.objects.filter(category="move", account=self.savings)
+        self.assertEqual(len(set(moves.values_list("txid", flat=True))), 3)
+
+    def test_incremental(self):
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        ledger.sync(self.conn, 0)
+        self.conn.sendfrom("user0+", self.savings.address, 1)
+        # The receive entry; the send from user0+ comes first.
+        self.wallet.log[1]["confirmations"] = 3
+        # The unconfirmed receive is read again along with the new one.
+        self.assertEqual(ledger.sync(self.conn, 0, page_size=1), (1, 1))
+        height = self.conn.getblockcount()
+        row = Transaction.objects.get(account=self.default)
+        self.assertEqual(row.block_height, height - 2)
+        self.assertEqual(row.confirmations(height), 3)
+        self.assertEqual(row.confirmations(height + 1), 4)
+
+    def test_confirmed(self):
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        self.conn.sendfrom("user0+", self.savings.address, 1)
+        self.wallet.log[1]["confirmations"] = 6
+        self.wallet.log[3]["confirmations"] = 0
+        ledger.sync(self.conn, 0)
+        height = self.conn.getblockcount()
+        confirmed = lambda n: Transaction.objects.confirmed(n, height).filter(category="receive")
+        self.assertEqual([t.account_id for t in confirmed(6)], [self.default.id])
+        self.assertEqual(confirmed(7).count(), 0)
+        self.assertEqual(confirmed(1).count(), 1)
+        self.assertEqual(confirmed(0).count(), 2)
+        self.assertEqual(Transaction.objects.get(account=self.savings).confirmations(height), 0)
+        # The placeholder of rows migrated before heights were stored.
+        Transaction.objects.filter(account=self.default).update(block_height=0)
+        self.assertEqual(Transaction.objects.get(account=self.default).confirmations(height), 1)
+        self.assertEqual(confirmed(1).count(), 1)
+        self.assertEqual(confirmed(2).count(), 0)
+        ledger.sync(self.conn, 0)
+        self.assertEqual(Transaction.objects.get(account=self.default).confirmations(height), 6)
+
+    def test_incoming_booked(self):
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        self.conn.sendfrom("user0+", self.savings.address, 1)
+        ledger.sync(self.conn, 0)
+        self.assertEqual((self.balance(self.default), self.balance(self.savings)), (5, 1))
+        # Entries read again are not booked twice.
+        SyncCursor.objects.update(time=None)
+        ledger.sync(self.conn, 0)
+        self.assertEqual(self.balance(self.default), 5)
+
+    def test_moved_address_booked(self):
+        Address.objects.filter(pk=self.savings.pk).update(user=None)
+        moved = Address.objects.create(user=self.alice, label="savings", address="1moved", shard=1)
+        Address.objects.filter(pk=self.savings.pk).update(moved_to=moved)
+        self.conn.sendfrom("user0+", self.savings.address, 1)
+        ledger.sync(self.conn, 0)
+        self.assertEqual((self.balance(self.savings), self.balance(moved)), (0, 1))
+        self.assertEqual(Transaction.objects.get().account, moved)
+
+    def test_reconcile(self):
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        ledger.sync(self.conn, 0)
+        self.assertEqual(ledger.reconcile(self.conn, 0), [])
+        # Made behind the views' back.
+        self.conn.move("alice+", "alice+savings", 2)
+        differences = ledger.reconcile(self.conn, 0, fix=True)
+        self.assertEqual([(a, float(s), float(b)) for (a, s, b) in differences],
+                         [("alice+", 5, 3), ("alice+savings", 0, 2)])
+        self.assertEqual((self.balance(self.default), self.balance(self.savings)), (3, 2))
+        self.assertEqual(ledger.reconcile(self.conn, 0), [])
+
+    def test_reconcile_flagged(self):
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        ledger.sync(self.conn, 0)
+        self.conn.move("alice+", "alice+savings", 2)
+        Address.objects.filter(pk=self.default.pk).update(unreconciled=True)
+        # Only the flagged account is fixed without fix.
+        self.assertEqual(len(ledger.reconcile(self.conn, 0)), 2)
+        self.assertEqual((self.balance(self.default), self.balance(self.savings)), (3, 0))
+        self.assertFalse(Address.objects.filter(unreconciled=True).exists())
+
+    def test_balances_reconciled(self):
+        ledger._reconciled.clear()
+        SyncCursor.objects.update(balances_reconciled=False)
+        self.assertFalse(ledger.balances_reconciled(1))
+        ledger.reconcile(self.conn, 0, fix=True)
+        self.assertTrue(ledger.balances_reconciled(1))
+        self.assertFalse(ledger.balances_reconciled(2))
+
+class LostResponseConnection(object):
+    """
+    Makes the calls of a connection, but raises *error* for the writes as
+    if bitcoind's response had been lost.
+    """
+    def __init__(self, conn, error=DeadlineExceeded):
+        self.conn = conn
+        self.error = error
+
+    def __getattr__(self, name):
+        method = getattr(self.conn, name)
+        if name not in ("move", "sendfrom"):
+            return method
+        def call(*args):
+            method(*args)
+            raise self.error
+        return call
+
+class LedgerViewsTest(WalletMixin, TransactionTestCase):
+    def tearDown(self):
+        from bitcoind import views
+        views.shards.build = sharding.connect_from_settings
+        views.shards.reload()
+        WalletMixin.tearDown(self)
+
+    def test_views_book_balances(self):
+        from bitcoind import views
+        views.shards.build = lambda config: ShardSet([self.conn])
+        views.shards.reload()
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        ledger.sync(self.conn, 0)
+        request = HttpRequest()
+        request.user = self.alice
+        call = lambda method, *args: jsonrpc_site.urls[method](request, *args)
+        self.assertTrue(call("move", "", "savings", 2))
+        # Rolled back along with the refused move.
+        self.assertRaises(InsufficientFunds, call, "move", "", "savings", 4)
+        call("sendfrom", "", self.external, 1)
+        self.assertEqual(call("listaccounts"), {"": 2, "savings": 2})
+        self.assertEqual(call("getbalance", "savings"), "2.0")
+        self.assertEqual(ledger.reconcile(self.conn, 0), [])
+
+    def test_timeout_keeps_balances(self):
+        from bitcoind import views
+        views.shards.build = lambda config: ShardSet([LostResponseConnection(self.conn)])
+        views.shards.reload()
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        ledger.sync(self.conn, 0)
+        request = HttpRequest()
+        request.user = self.alice
+        call = lambda method, *args: jsonrpc_site.urls[method](request, *args)
+        self.assertRaises(DeadlineExceeded, call, "move", "", "savings", 2)
+        self.assertRaises(DeadlineExceeded, call, "sendfrom", "", self.external, 1)
+        # Committed, as bitcoind made both.
+        self.assertEqual((self.balance(self.default), self.balance(self.savings)), (2, 2))
+        self.assertEqual(Address.objects.filter(unreconciled=True).count(), 2)
+        self.assertEqual(ledger.reconcile(self.conn, 0), [])
+        self.assertFalse(Address.objects.filter(unreconciled=True).exists())
+
+    def test_lost_connection_keeps_balances(self):
+        from bitcoind import views
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        ledger.sync(self.conn, 0)
+        request = HttpRequest()
+        request.user = self.alice
+        call = lambda method, *args: jsonrpc_site.urls[method](request, *args)
+        for error in (socket.error(104, "Connection reset by peer"), httplib.BadStatusLine("")):
+            views.shards.build = lambda config: ShardSet([LostResponseConnection(self.conn, error)])
+            views.shards.reload()
+            self.assertRaises(type(error), call, "move", "", "savings", 1)
+            self.assertRaises(type(error), call, "sendfrom", "", self.external, 1)
+        self.assertEqual((self.balance(self.default), self.balance(self.savings)), (1, 2))
+        self.assertEqual(Address.objects.filter(unreconciled=True).count(), 2)
+        self.assertEqual(ledger.reconcile(self.conn, 0), [])
+
+    def test_balances_before_reconcile(self):
+        from bitcoind import views
+        views.shards.build = lambda config: ShardSet([self.conn])
+        views.shards.reload()
+        ledger._reconciled.clear()
+        SyncCursor.objects.update(balances_reconciled=False)
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        request = HttpRequest()
+        request.user = self.alice
+        call = lambda method, *args: jsonrpc_site.urls[method](request, *args)
+        # Not synced, so only bitcoind knows.
+        self.assertEqual(call("getbalance", ""), "5.0")
+        self.assertEqual(call("listaccounts"), {"": 5, "savings": 0})
+        ledger.reconcile(self.conn, 0, fix=True)
+        Address.objects.update(balance=0)
+        self.assertEqual(call("getbalance", ""), "0.0")
+        # Other confirmation counts are asked from bitcoind.
+        self.assertEqual(call("getbalance", "", 0), "5.0")
+
+    def test_listtransactions(self):
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        self.conn.move("alice+", "alice+savings", 2, comment="rainy day")
+        ledger.sync(self.conn, 0)
+        from bitcoind import views
+        views.shards.build = lambda config: ShardSet([self.conn])
+        views.shards.reload()
+        request = HttpRequest()
+        request.user = self.alice
+        listtransactions = jsonrpc_site.urls["listtransactions"]
+        transactions = listtransactions(request, "*")
+        self.assertEqual([(t["account"], t["category"], t["amount"]) for t in transactions],
+                         [("alice", "receive", 5), ("alice", "move", -2), ("alice+savings", "move", 2)])
+        self.assertEqual(transactions[1]["otheraccount"], "alice+savings")
+        self.assertEqual(transactions[1]["comment"], "rainy day")
+        self.assertEqual(transactions[0]["time"], self.wallet.log[1]["time"])
+        self.assertEqual(transactions[0]["confirmations"], 1)
+        self.assertFalse("confirmations" in transactions[1])
+        self.assertEqual([t["category"] for t in listtransactions(request, "savings")], ["move"])
+        self.assertEqual([t["amount"] for t in listtransactions(request, "*", 1, 1)], [-2])
+        self.assertEqual(listtransactions(request, "*", 10, 3), [])
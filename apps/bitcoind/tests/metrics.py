@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.http import HttpRequest
+from django.test import TestCase
+
+from jsonrpc import jsonrpc_site
+
+from bitcoind import owners, views
+from bitcoind.metrics import Metrics, TRANSPORT_ERROR
+from bitcoind.pool import HTTPConnectionPool
+from bitcoind.proxy import ServiceProxy, JSONRPCException
+from bitcoind.tests.server import KeepAliveServer
+
+class MetricsTest(TestCase):
+    def test_record(self):
+        metrics = Metrics(buckets=(0.01, 0.1))
+        metrics.record("getinfo", 0.005, 10, 100)
+        metrics.record("getinfo", 0.05, 10, 100)
+        metrics.record("getinfo", 5, 10, 0, -5)
+        stats = metrics.snapshot()["getinfo"]
+        self.assertEqual(stats["calls"], 3)
+        self.assertEqual(stats["errors"], {"-5": 1})
+        self.assertEqual(stats["histogram"], [[0.01, 1], [0.1, 2]])
+        self.assertEqual((stats["request_bytes"], stats["response_bytes"]), (30, 200))
+
+    def test_render(self):
+        metrics = Metrics(buckets=(0.01,))
+        metrics.record("getinfo", 0.005, 10, 100, TRANSPORT_ERROR)
+        text = metrics.render()
+        self.assertTrue('bitcoind_rpc_calls_total{method="getinfo"} 1\n' in text)
+        self.assertTrue('bitcoind_rpc_errors_total{method="getinfo",code="transport"} 1\n' in text)
+        self.assertTrue('bitcoind_rpc_duration_seconds_bucket{method="getinfo",le="+Inf"} 1\n' in text)
+
+class CacheMetricsTest(TestCase):
+    def setUp(self):
+        self.request = HttpRequest()
+        self.request.user = User.objects.create(username="admin", is_staff=True)
+
+    def test_getrpcmetrics(self):
+        misses = owners.cache.stats()["misses"]
+        owners.owner("1unknown")
+        caches = jsonrpc_site.urls["getrpcmetrics"](self.request)["caches"]
+        self.assertEqual(sorted(caches), ["balances", "chainstate", "owners", "received_by_address"])
+        self.assertEqual(caches["owners"]["misses"], misses + 1)
+
+    def test_rpcmetrics(self):
+        text = views.rpcmetrics(self.request).content
+        for name in ("owners", "received_by_address", "balances", "chainstate"):
+            self.assertTrue('bitcoind_cache_lookups_total{cache="%s",result="hit"} ' % name in text)
+            self.assertTrue('bitcoind_cache_size{cache="%s"} ' % name in text)
+
+class ProxyMetricsTest(TestCase):
+    def setUp(self):
+        self.server = KeepAliveServer()
+        self.url = self.server.start()
+        self.pool = HTTPConnectionPool(self.url)
+        self.metrics = Metrics()
+        self.proxy = ServiceProxy(self.url, pool=self.pool, metrics=self.metrics)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.stop()
+
+    def test_calls_recorded(self):
+        self.proxy.echo(1, 2)
+        self.assertRaises(JSONRPCException, self.proxy.fail, -5)
+        self.assertEqual(list(self.proxy.echo._stream(1, 2)), [1, 2])
+        self.proxy._batch([("echo", [1]), ("echo", [2])])
+        stats = self.metrics.snapshot()
+        self.assertEqual(stats["echo"]["calls"], 2)
+        self.assertTrue(stats["echo"]["response_bytes"] > 0)
+        self.assertEqual(stats["fail"]["errors"], {"-5": 1})
+        self.assertEqual(stats["batch"]["calls"], 1)
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from bitcoind import owners
+from bitcoind.models import Address
+
+class OwnersTest(TestCase):
+    def setUp(self):
+        owners.cache.invalidate()
+        self.alice = User.objects.create(username="alice")
+        self.address = Address.objects.create(user=self.alice, label="", address="1Old")
+
+    def test_lookup(self):
+        hits = owners.cache.stats()["hits"]
+        self.assertEqual(owners.owners(["1Old", "1Foreign"]), {"1Old": (self.alice.id, ""), "1Foreign": None})
+        self.assertEqual(owners.owner("1Foreign"), None)
+        self.assertEqual(owners.cache.stats()["hits"], hits + 1)
+
+    def test_save_invalidates(self):
+        owners.owners(["1Old", "1New"])
+        address = Address.objects.get(pk=self.address.pk)
+        address.address = "1New"
+        address.label = "savings"
+        address.save()
+        self.assertEqual(owners.owners(["1Old", "1New"]), {"1Old": None, "1New": (self.alice.id, "savings")})
+
+    def test_delete_invalidates(self):
+        owners.owner("1Old")
+        self.address.delete()
+        self.assertEqual(owners.owner("1Old"), None)
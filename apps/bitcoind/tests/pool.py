@@ -0,0 +1,57 @@
+import httplib
+import socket
+
+from django.test import TestCase
+
+from bitcoind.pool import HTTPConnectionPool
+from bitcoind.proxy import ServiceProxy
+from bitcoind.tests.server import KeepAliveServer
+
+class ConnectionPoolTest(TestCase):
+    def setUp(self):
+        self.server = KeepAliveServer()
+        self.url = self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def connections(self):
+        return len(set(self.server.requests))
+
+    def test_reuses_connection(self):
+        proxy = ServiceProxy(self.url, pool=HTTPConnectionPool(self.url, maxsize=1))
+        for i in range(5):
+            self.assertEqual(proxy.getblockcount(), i + 1)
+        self.assertEqual(self.connections(), 1)
+
+    def test_unpooled(self):
+        proxy = ServiceProxy(self.url, pool=HTTPConnectionPool(self.url, maxsize=0))
+        for i in range(3):
+            proxy.getblockcount()
+        self.assertEqual(self.connections(), 3)
+
+    def test_idle_eviction(self):
+        pool = HTTPConnectionPool(self.url, maxsize=1, idle_timeout=0)
+        proxy = ServiceProxy(self.url, pool=pool)
+        proxy.getblockcount()
+        proxy.getblockcount()
+        self.assertEqual(self.connections(), 2)
+
+    def test_reconnect_after_server_close(self):
+        self.server.drop_connections = True
+        proxy = ServiceProxy(self.url, pool=HTTPConnectionPool(self.url, maxsize=1))
+        self.assertEqual(proxy.getblockcount(), 1)
+        self.assertEqual(proxy.getblockcount(), 2)
+        self.assertEqual(self.connections(), 2)
+
+    def test_write_not_sent_twice(self):
+        self.server.reset_methods = ("sendfrom", "getbalance")
+        proxy = ServiceProxy(self.url, pool=HTTPConnectionPool(self.url, maxsize=1))
+        proxy.getblockcount()
+        # Reset on a reused connection after bitcoind read it.
+        self.assertRaises((socket.error, httplib.BadStatusLine), proxy.sendfrom, "alice+", "1abc", 1)
+        self.assertEqual(self.server.methods.count("sendfrom"), 1)
+        # Reads are sent again.
+        proxy.getblockcount()
+        self.assertRaises((socket.error, httplib.BadStatusLine), proxy.getbalance, "alice+")
+        self.assertEqual(self.server.methods.count("getbalance"), 2)
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.db import connection
+from django.http import HttpRequest
+from django.test import TestCase
+
+from jsonrpc import jsonrpc_site
+
+from bitcoind import ledger, sharding
+from bitcoind.sharding import ShardSet
+from bitcoind.tests.ledger import WalletMixin
+
+class QueryCountMixin(object):
+    def assertNumQueries(self, num, func, *args, **kwargs):
+        """
+        Call *func* and assert that it made *num* database queries. Returns
+        what *func* returned.
+        """
+        debug, settings.DEBUG = settings.DEBUG, True
+        del connection.queries[:]
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            settings.DEBUG = debug
+        executed = [q["sql"] for q in connection.queries]
+        self.assertEqual(len(executed), num, "%d queries made, %d expected:\n%s" % (
+            len(executed), num, "\n".join(executed)))
+        return result
+
+class ViewQueriesTest(QueryCountMixin, WalletMixin, TestCase):
+    """
+    The number of queries each JSON-RPC view makes, so that table scans
+    and a query per row don't come back unnoticed.
+    """
+    def setUp(self):
+        WalletMixin.setUp(self)
+        from bitcoind import views
+        views.shards.build = lambda config: ShardSet([self.conn])
+        views.shards.reload()
+        self.conn.sendfrom("user0+", self.default.address, 5)
+        ledger.sync(self.conn, 0)
+        self.request = HttpRequest()
+        self.request.user = self.alice
+
+    def tearDown(self):
+        from bitcoind import views
+        views.shards.build = sharding.connect_from_settings
+        views.shards.reload()
+        WalletMixin.tearDown(self)
+
+    def call(self, num, method, *args):
+        return self.assertNumQueries(num, jsonrpc_site.urls[method], self.request, *args)
+
+    def test_chain(self):
+        for method in ("getblockcount", "getblocknumber", "getconnectioncount", "getdifficulty", "getinfo"):
+            self.call(0, method)
+        self.alice.is_staff = True
+        self.call(0, "getrpcmetrics")
+
+    def test_addresses(self):
+        self.assertEqual(self.call(1, "getnewaddress", "savings"), self.savings.address)
+        self.call(3, "getnewaddress", "travel")
+        self.call(1, "getaccountaddress", "")
+        self.call(1, "getaccount", self.savings.address)
+        self.call(0, "getaccount", self.savings.address)
+        self.call(1, "getaddressesbyaccount", "savings")
+        self.call(4, "setaccount", self.savings.address, "rainy day")
+        self.assertEqual(self.call(1, "getaccount", self.savings.address), "rainy day")
+        self.call(1, "validateaddress", self.external)
+        self.call(1, "validateaddresses", [self.default.address, self.savings.address, self.external])
+        self.call(0, "validateaddresses", [self.default.address, self.external])
+
+    def test_received(self):
+        self.call(1, "getreceivedbyaddress", self.default.address)
+        self.call(1, "getreceivedbyaccount", "")
+        self.call(1, "listreceivedbyaddress", 1, True)
+        self.call(2, "listreceivedbyaccount", 1, True)
+
+    def test_balances(self):
+        self.assertEqual(self.call(1, "listaccounts"), {"": 5, "savings": 0})
+        self.assertEqual(self.call(1, "getbalance", ""), "5.0")
+        self.assertEqual(len(self.call(1, "listtransactions", "*")), 1)
+
+    def test_sends(self):
+        self.call(4, "move", "", "savings", 0.5)
+        self.call(3, "sendfrom", "", self.external, 0.5)
+        self.call(2, "sendfrom", "", self.external, 0.5)
+        self.call(5, "sendfrom", "", self.savings.address, 0.5)
+        self.call(2, "sendtoaddress", self.external, 0.5)
+        self.call(4, "sendtoaddress", self.savings.address, 0.5)
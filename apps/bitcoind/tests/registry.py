@@ -0,0 +1,112 @@
+import os
+import shutil
+import signal
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase
+
+from bitcoind.config import ConfigFile, credentials_from_settings
+from bitcoind.registry import ConnectionRegistry
+
+class RegistryTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, "bitcoin.conf")
+        self.write("rpcuser=alice\nrpcpassword=secret\n")
+        self.config = ConfigFile([os.path.join(self.dir, "missing.conf"), self.filename], check_interval=0)
+        self.builds = []
+        self.registry = ConnectionRegistry(self.build, self.config)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, text, mtime=1000000000):
+        f = open(self.filename, "w")
+        f.write(text)
+        f.close()
+        os.utime(self.filename, (mtime, mtime))
+
+    def build(self, config):
+        cfg = config.read()
+        self.builds.append(cfg)
+        return [cfg["rpcuser"]]
+
+    def test_lazy(self):
+        self.assertEqual(self.builds, [])
+        conn = self.registry.connection(0)
+        self.assertEqual(self.builds, [])
+        self.assertEqual(conn.upper(), "ALICE")
+        self.assertEqual(self.registry[0], "alice")
+        self.assertEqual(len(self.builds), 1)
+
+    def test_reload_on_change(self):
+        self.registry.get()
+        self.write("rpcuser=bob\nrpcpassword=secret\n", mtime=1000000001)
+        self.assertEqual(self.registry[0], "bob")
+        self.assertEqual(len(self.builds), 2)
+
+    def test_reload(self):
+        self.registry.get()
+        self.registry.reload()
+        self.registry.get()
+        self.registry.get()
+        self.assertEqual(len(self.builds), 2)
+
+    def test_keeps_connections_if_config_breaks(self):
+        self.registry.get()
+        self.write("garbage\n", mtime=1000000001)
+        self.assertEqual(self.registry[0], "alice")
+
+    def test_reload_after_fix(self):
+        self.registry.get()
+        self.write("garbage\n", mtime=1000000001)
+        self.assertEqual(self.registry[0], "alice")
+        self.assertEqual(self.registry[0], "alice")
+        self.write("rpcuser=bob\nrpcpassword=secret\n", mtime=1000000002)
+        self.assertEqual(self.registry[0], "bob")
+
+    def test_no_filenames(self):
+        self.assertRaises(IOError, ConfigFile([]).read)
+
+    def sighup(self, previous):
+        """
+        Returns the exit status of a child process that sends itself SIGHUP
+        after installing the registry's handler over *previous*: 0 if it
+        reloaded and 1 if not, or the signal that killed it.
+        """
+        pid = os.fork()
+        if pid == 0:
+            status = 2
+            try:
+                signal.signal(signal.SIGHUP, previous)
+                self.registry.install_sighup()
+                self.registry._reload = False
+                os.kill(os.getpid(), signal.SIGHUP)
+                status = not self.registry._reload
+            finally:
+                os._exit(status)
+        status = os.waitpid(pid, 0)[1]
+        return status & 0x7f or status >> 8
+
+    def test_sighup_default(self):
+        # Reloads instead of terminating.
+        self.assertEqual(self.sighup(signal.SIG_DFL), 0)
+        self.assertEqual(self.sighup(signal.SIG_IGN), 0)
+
+    def test_sighup_chained(self):
+        def previous(signum, frame):
+            os._exit(3)
+        self.assertEqual(self.sighup(previous), 3)
+
+    def test_missing_config(self):
+        registry = ConnectionRegistry(self.build, ConfigFile([os.path.join(self.dir, "missing.conf")]))
+        self.assertRaises(IOError, registry.get)
+
+    def test_credentials_from_settings(self):
+        self.assertEqual(credentials_from_settings(self.config)["user"], "alice")
+        settings.BITCOIND_USER = "carol"
+        try:
+            self.assertEqual(credentials_from_settings(ConfigFile([]))["user"], "carol")
+        finally:
+            del settings.BITCOIND_USER
@@ -0,0 +1,98 @@
+import time
+
+from django.test import TestCase
+
+from bitcoind import deadline
+from bitcoind.deadline import DeadlineExceeded
+from bitcoind.fakebitcoind import FakeBitcoind, Wallet
+from bitcoind.pool import HTTPConnectionPool
+from bitcoind.proxy import ServiceProxy
+from bitcoind.routing import RoutingConnection
+
+class FakeNode(object):
+    def __init__(self, name, blocks=100):
+        self.name = name
+        self.blocks = blocks
+        self.down = False
+        self.calls = []
+
+    def _answer(self, method):
+        self.calls.append(method)
+        if self.down:
+            raise IOError("connection refused")
+        return self.name
+
+    def getblockcount(self):
+        self.calls.append("getblockcount")
+        if self.down:
+            raise IOError("connection refused")
+        return self.blocks
+
+    def getdifficulty(self):
+        return self._answer("getdifficulty")
+
+    def move(self, *args):
+        return self._answer("move")
+
+class RoutingConnectionTest(TestCase):
+    def setUp(self):
+        self.primary = FakeNode("primary")
+        self.a = FakeNode("a")
+        self.b = FakeNode("b")
+        self.conn = RoutingConnection(self.primary, [self.a, self.b], check_interval=3600)
+
+    def test_round_robin(self):
+        answers = [self.conn.getdifficulty() for i in range(4)]
+        self.assertEqual(sorted(answers), ["a", "a", "b", "b"])
+        self.assertFalse("getdifficulty" in self.primary.calls)
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.conn.move("x", "y", 1), "primary")
+        self.assertFalse("move" in self.a.calls + self.b.calls)
+
+    def test_failover(self):
+        self.a.down = True
+        self.assertEqual([self.conn.getdifficulty() for i in range(3)], ["b"] * 3)
+        self.assertEqual(self.conn.status()[0]["alive"], False)
+
+    def test_all_replicas_down(self):
+        self.a.down = self.b.down = True
+        self.assertEqual(self.conn.getdifficulty(), "primary")
+
+    def test_hung_replica(self):
+        server = FakeBitcoind(("127.0.0.1", 0), Wallet(), latency=0.5)
+        url = server.start()
+        pool = HTTPConnectionPool(url)
+        try:
+            hung = ServiceProxy(url, pool=pool, timeouts={"getdifficulty": 0.1, "getblockcount": 0.1})
+            conn = RoutingConnection(self.primary, [hung, self.b], check_interval=3600)
+            start = time.time()
+            self.assertEqual([conn.getdifficulty() for i in range(3)], ["b"] * 3)
+            self.assertTrue(time.time() - start < 0.3)
+            self.assertEqual(conn.status()[0]["alive"], False)
+            conn.check()
+            self.assertEqual(conn.status()[0]["alive"], False)
+            # Out of time for the request: not the replica's fault.
+            conn.nodes[0].dead_until = 0
+            self.b.down = True
+            deadline.start(0.05)
+            self.assertRaises(DeadlineExceeded, conn.getdifficulty)
+            self.assertEqual(conn.status()[0]["alive"], True)
+        finally:
+            deadline.clear()
+            pool.clear()
+            server.stop()
+
+    def test_lagging_replica(self):
+        self.a.blocks = 90
+        self.assertEqual([self.conn.getdifficulty() for i in range(3)], ["b"] * 3)
+        self.a.blocks = 100
+        self.conn.check()
+        self.assertEqual(sorted(self.conn.getdifficulty() for i in range(2)), ["a", "b"])
+
+    def test_latency_strategy(self):
+        conn = RoutingConnection(self.primary, [self.a, self.b], strategy="latency",
+                                 check_interval=3600)
+        conn.nodes[0].latency = 0.5
+        conn.nodes[1].latency = 0.1
+        self.assertEqual(conn.getdifficulty(), "b")
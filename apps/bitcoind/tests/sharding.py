@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+import datetime
+
+from bitcoind.models import Address, Transaction
+from bitcoind.sharding import shard_for, move_address, ShardSet
+
+class ShardForTest(TestCase):
+    def test_stable(self):
+        # The hash must not depend on the process, so these are fixed.
+        self.assertEqual([shard_for(name, 4) for name in ("alice", "bob", "carol")], [2, 0, 0])
+        self.assertEqual(shard_for(u"alice", 4), 2)
+        self.assertEqual(shard_for("alice", 1), 0)
+
+    def test_spread(self):
+        used = set(shard_for("user%d" % i, 4) for i in range(100))
+        self.assertEqual(used, set([0, 1, 2, 3]))
+
+class ShardSetTest(TestCase):
+    def setUp(self):
+        self.shards = ShardSet(["a", "b", "c"])
+        self.user = User.objects.create(username="alice")
+
+    def test_home_without_addresses(self):
+        self.assertEqual(self.shards.home(self.user), shard_for("alice", 3))
+
+    def test_home_follows_primary_address(self):
+        Address.objects.create(user=self.user, label="", address="1a", shard=2, is_primary=True)
+        Address.objects.create(user=self.user, label="x", address="1b", shard=1)
+        self.assertEqual(self.shards.home(self.user), 2)
+        self.assertEqual(self.shards[self.shards.home(self.user)], "c")
+
+class FakeWallet(object):
+    def getnewaddress(self, account):
+        self.account = account
+        return "1new"
+
+class MoveAddressTest(TestCase):
+    def test_move(self):
+        user = User.objects.create(username="alice")
+        old = Address.objects.create(user=user, label="savings", address="1old", shard=0, is_primary=True,
+                                     balance=3)
+        older = Address.objects.create(label="savings", address="1older", shard=2, moved_to=old)
+        Transaction.objects.create(account=old, category="receive", amount=1, txid="ab",
+                                   time=datetime.datetime.now())
+        wallet = FakeWallet()
+        new = move_address(old, wallet, 1)
+        self.assertEqual(wallet.account, "alice+savings")
+        self.assertEqual((new.user, new.label, new.address, new.shard, new.is_primary, new.balance),
+                         (user, "savings", "1new", 1, True, 3))
+        old = Address.objects.get(address="1old")
+        self.assertEqual((old.user, old.moved_to, old.is_primary, old.shard, old.balance),
+                         (None, new, False, 0, 0))
+        self.assertEqual(Address.objects.get(pk=older.pk).moved_to, new)
+        self.assertEqual(Transaction.objects.get().account, new)
@@ -0,0 +1,94 @@
+import threading
+
+from django.test import TestCase
+
+from bitcoind.fakebitcoind import FakeBitcoind, Wallet
+from bitcoind.metrics import Metrics
+from bitcoind.pool import HTTPConnectionPool
+from bitcoind.proxy import ServiceProxy
+from bitcoind.singleflight import SingleFlight
+
+class SingleFlightTest(TestCase):
+    def follow(self, flight, key, fn, results):
+        joined = threading.Event()
+        def target():
+            try:
+                results.append(flight.do(key, fn, joined.set))
+            except Exception, e:
+                results.append(e)
+        thread = threading.Thread(target=target)
+        thread.start()
+        joined.wait(5)
+        return thread
+
+    def test_followers_share_result(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("key", fn)))
+        leader.start()
+        started.wait(5)
+        followers = [self.follow(flight, "key", fn, results) for i in range(3)]
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [("result", False)] * 3 + [("result", True)])
+        # Nothing is cached once the call is over.
+        self.assertEqual(flight.do("key", lambda: "again"), ("again", True))
+
+    def test_followers_share_exception(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        def fn():
+            started.set()
+            release.wait(5)
+            raise ValueError("boom")
+        results = []
+        leader = self.follow(flight, "key", fn, results)
+        started.wait(5)
+        follower = self.follow(flight, "key", fn, results)
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual([type(r) for r in results], [ValueError, ValueError])
+
+class ProxyCoalescingTest(TestCase):
+    def setUp(self):
+        self.server = FakeBitcoind(("127.0.0.1", 0), Wallet(), latency=0.2)
+        url = self.server.start()
+        self.pool = HTTPConnectionPool(url, maxsize=8)
+        self.metrics = Metrics()
+        self.proxy = ServiceProxy(url, pool=self.pool, metrics=self.metrics, singleflight=SingleFlight())
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.stop()
+
+    def concurrently(self, fn, n=5):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(fn())) for i in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_reads_coalesced(self):
+        results = self.concurrently(lambda: self.proxy.getbalance(""))
+        self.assertEqual(results, [0] * 5)
+        stats = self.metrics.snapshot()["getbalance"]
+        self.assertEqual(stats["calls"] + stats["coalesced"], 5)
+        self.assertTrue(stats["coalesced"] > 0)
+
+    def test_writes_not_coalesced(self):
+        results = self.concurrently(lambda: self.proxy.getnewaddress("alice+"))
+        self.assertEqual(len(set(results)), 5)
+        stats = self.metrics.snapshot()["getnewaddress"]
+        self.assertEqual((stats["calls"], stats["coalesced"]), (5, 0))
@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from bitcoind import util
+from bitcoind.data import AccountInfo, AddressInfo, TransactionInfo
+
+class IndexAccountsTest(TestCase):
+    def test_groups_by_username(self):
+        index = util.index_accounts({
+            "alice+": 1.0,
+            "alice+savings": 2.5,
+            "bob+": 0.0,
+            "bob+a+b": 3.0,
+            "": 10.0,
+        })
+        self.assertEqual(index["alice"], {"": 1.0, "savings": 2.5})
+        self.assertEqual(index["bob"], {"": 0.0, "a+b": 3.0})
+        self.assertEqual(index[""], {"": 10.0})
+
+class RecordTest(TestCase):
+    def test_fields(self):
+        tx = TransactionInfo(**{u"account": u"alice+", u"amount": 1.5, u"blockindex": 3})
+        self.assertEqual(tx.account, u"alice+")
+        self.assertFalse(hasattr(tx, "otheraccount"))
+        self.assertFalse(hasattr(tx, "__dict__"))
+        self.assertEqual(tx._asdict(), {"account": u"alice+", "amount": 1.5, "blockindex": 3})
+
+    def test_positional(self):
+        self.assertEqual(AddressInfo("1abc", "alice+")._asdict(),
+                         {"address": "1abc", "account": "alice+"})
+        self.assertRaises(TypeError, AccountInfo, 1, 2, 3, 4)
+
+    def test_assignment(self):
+        tx = TransactionInfo(account=u"alice+")
+        tx.otheraccount = u"bob+"
+        self.assertEqual(tx._asdict()["otheraccount"], u"bob+")
@@ -4,5 +4,6 @@ import bitcoind.views
 
 urlpatterns = patterns('',
     url(r'^browse/', 'jsonrpc.views.browse', name="jsonrpc_browser"),
+    url(r'^metrics/$', 'bitcoind.views.rpcmetrics', name="bitcoind_rpcmetrics"),
     url(r'^$', jsonrpc_site.dispatch, name="jsonrpc_mountpoint"),
 )
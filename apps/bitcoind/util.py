@@ -19,6 +19,7 @@
 # THE SOFTWARE.
 """Generic utilities used by bitcoin client library."""
 from copy import copy
+from decimal import Decimal
 class DStruct(object):
     """
     Simple dynamic structure, like :const:`collections.namedtuple` but more flexible
@@ -44,6 +45,73 @@ class DStruct(object):
             rv.append(k+"="+v.__repr__())
         return self.__class__.__module__+"."+self.__class__.__name__+"("+(",".join(rv))+")"
 
+# Marker for fields that are not set on a Record.
+_unset = object()
+
+class RecordType(type):
+    """
+    Metaclass for :class:`Record`. Maps each field name, which may arrive as a
+    unicode key from decoded JSON, to the interned attribute name.
+    """
+    def __init__(cls, name, bases, attrs):
+        type.__init__(cls, name, bases, attrs)
+        cls._fieldmap = dict((f, f) for f in cls._fields)
+
+class Record(object):
+    """
+    Compact structure with a fixed set of fields, like
+    :const:`collections.namedtuple` but with optional fields.
+    
+    Fields are stored in ``__slots__``, so records have no per-instance
+    ``__dict__``; a field that was not given is simply not set. Keyword
+    arguments that are not declared in ``_fields``, such as fields added by a
+    newer bitcoind, are not attributes but are kept in a separate dictionary,
+    allocated only when needed, and included by :meth:`_asdict`.
+    """
+    __metaclass__ = RecordType
+    __slots__ = ('_extra',)
+    _fields = ()
+    def __init__(self, *args_t, **args_d):
+        if len(args_t) > len(self._fields):
+            raise TypeError("Number of arguments is larger than of predefined fields")
+        for (k,v) in zip(self._fields, args_t):
+            setattr(self, k, v)
+        fieldmap = self._fieldmap
+        for (k,v) in args_d.iteritems():
+            name = fieldmap.get(k)
+            if name is not None:
+                setattr(self, name, v)
+            else:
+                try:
+                    self._extra[k] = v
+                except AttributeError:
+                    self._extra = {k: v}
+    def _asdict(self):
+        """
+        Returns a new dictionary of the fields that are set.
+        """
+        rv = {}
+        for k in self._fields:
+            v = getattr(self, k, _unset)
+            if v is not _unset:
+                rv[k] = v
+        extra = getattr(self, '_extra', None)
+        if extra is not None:
+            rv.update(extra)
+        return rv
+    def __repr__(self):
+        rv = []
+        for (k,v) in self._asdict().iteritems():
+            rv.append(k+"="+v.__repr__())
+        return self.__class__.__module__+"."+self.__class__.__name__+"("+(",".join(rv))+")"
+
+def decimal_amount(value):
+    """
+    Returns the amount *value*, as bitcoind's JSON floats give it, as a
+    :class:`~decimal.Decimal` of whole satoshis.
+    """
+    return Decimal("%.8f" % value)
+
 def getaccount(user, label):
     if label == "*":
         return label
@@ -64,6 +132,19 @@ def getusername_and_label(account):
     else:
         return (account, "")
 
+def index_accounts(accounts):
+    """
+    Index a ``listaccounts`` result by the username part of each account name.
+    
+    Returns a dictionary mapping each username to a dictionary of
+    ``label: balance`` pairs for that user's accounts.
+    """
+    index = {}
+    for (account, balance) in accounts.iteritems():
+        username, label = getusername_and_label(account)
+        index.setdefault(username, {})[label] = balance
+    return index
+
 def getdisplayname(account):
     username, label = getusername_and_label(account)
     
@@ -1,56 +1,268 @@
 '''
 The JSON-RPC interface to the bitcoind server.
 '''
+from __future__ import with_statement
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from jsonrpc import jsonrpc_method
-from jsonrpc.decorators import basicauth
+from jsonrpc.decorators import basicauth, logged_in_or_basicauth
+from jsonrpc.exceptions import InvalidParamsError, InvalidCredentialsError
+from django.http import HttpResponse, HttpResponseForbidden
 from decimal import *
 
 import bitcoind
 from bitcoind.proxy import JSONRPCException
-from bitcoind.exceptions import _wrap_exception
+from bitcoind.exceptions import BitcoinException, _wrap_exception
 from bitcoind.connection import BitcoinConnection
-from bitcoind.models import Address, DEFAULT_ADDRESS_LABEL
-from bitcoind import util
-from django.db import connection, transaction
+from bitcoind.models import Address, Transaction, DEFAULT_ADDRESS_LABEL
+from bitcoind.registry import ConnectionRegistry
+from bitcoind.cache import HeightProbe, BlockCache, AccountCache, ChainStateCache
+from bitcoind import util, sharding, base58, addresspool, ledger, owners
+from bitcoind.metrics import metrics
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Sum
 from account.models import MAX_USERNAME_LENGTH
 
-conn = bitcoind.connect_to_local()
+# Each user's accounts live in the wallet of their home shard. Chain state
+# is the same on every node, so it is read from the first. Nothing is
+# connected until the first call.
+shards = ConnectionRegistry(sharding.connect_from_settings)
+shards.install_sighup()
+conn = shards.connection(0)
+
+# Wallet-wide results, keyed by shard and shared by all users until the
+# next block.
+probe = HeightProbe(conn)
+received_by_address = BlockCache(probe)
+chainstate = ChainStateCache(conn, probe)
+
+# Version byte of addresses on the network bitcoind runs on.
+ADDRESS_VERSION = getattr(settings, "BITCOIND_ADDRESS_VERSION", base58.MAINNET)
+
+# Most addresses validateaddresses checks in one call.
+MAX_VALIDATE_ADDRESSES = 100
+
+# Per-account reads, dropped on a new block or when one of our own writes
+# touches the account. The TTL bounds staleness from writes made by other
+# processes.
+balances = AccountCache(probe, ttl=30)
+
+def _received_by_address(shard, minconf):
+    """
+    Returns the ``listreceivedbyaddress`` result of a shard's wallet as a
+    dictionary of :class:`~bitcoin.data.AddressInfo` objects keyed by address.
+    
+    Confirmed totals only change when a block arrives, so for a *minconf*
+    of at least 1 the result is cached per block height.
+    """
+    fetch = lambda: dict((info.address, info) for info in shards[shard].iterlistreceivedbyaddress(minconf, False))
+    if minconf < 1:
+        return fetch()
+    return received_by_address.get((shard, minconf), fetch)
+
+def _getreceivedbyaccount(shard, account, minconf):
+    """
+    Returns the amount received by *account*. Unconfirmed amounts change
+    without a block or a write of ours, so they are not cached.
+    """
+    fetch = lambda: shards[shard].getreceivedbyaccount(account, minconf)
+    if minconf < 1:
+        return fetch()
+    return balances.get((account, "getreceivedbyaccount", minconf), fetch)
+
+def _unreconciled(*addresses):
+    """
+    Commit the stored balances of *addresses*, which bitcoind did not
+    confirm, and flag them for :func:`bitcoind.ledger.reconcile`.
+    """
+    pks = [a.pk for a in addresses if a is not None]
+    Address.objects.filter(pk__in=pks).update(unreconciled=True)
+    transaction.commit()
+
+@transaction.commit_on_success
+def _move(shard, fromaccount, toaccount, amount, minconf, comment=None, fromaddress=None, toaddress=None):
+    """
+    Move *amount* between two accounts in a shard's wallet.
+    
+    The stored balances of *fromaddress* and *toaddress*, the addresses
+    standing for the two accounts, change in the same database transaction,
+    which is rolled back if bitcoind refuses the move. An account without
+    an address has no stored balance. If the call fails any other way, for
+    example by timing out or losing the connection, the move may still have
+    been made, so the changes are committed and flagged for
+    :func:`bitcoind.ledger.reconcile`.
+    """
+    try:
+        if fromaddress is not None:
+            fromaddress.decrease(amount)
+        if toaddress is not None:
+            toaddress.increase(amount)
+        try:
+            if comment is None:
+                return shards[shard].move(fromaccount, toaccount, amount, minconf)
+            else:
+                return shards[shard].move(fromaccount, toaccount, amount, minconf, comment)
+        except (JSONRPCException, BitcoinException):
+            raise
+        except Exception:
+            _unreconciled(fromaddress, toaddress)
+            raise
+    finally:
+        balances.invalidate_accounts(fromaccount, toaccount)
+
+@transaction.commit_on_success
+def _sendfrom(shard, fromaccount, tobitcoinaddress, amount, minconf, comment=None, comment_to=None,
+              fromaddress=None):
+    """
+    Send *amount* from an account in a shard's wallet to a bitcoin address.
+    
+    Like :func:`_move`, the stored balance of *fromaddress* is debited in
+    the same database transaction, and kept unless bitcoind refuses the
+    send. The fee, if any, is booked by
+    :func:`bitcoind.ledger.sync` once it is known.
+    """
+    try:
+        if fromaddress is not None:
+            fromaddress.decrease(amount)
+        try:
+            if comment is None:
+                return shards[shard].sendfrom(fromaccount, tobitcoinaddress, amount, minconf)
+            elif comment_to is None:
+                return shards[shard].sendfrom(fromaccount, tobitcoinaddress, amount, minconf, comment)
+            else:
+                return shards[shard].sendfrom(fromaccount, tobitcoinaddress, amount, minconf, comment, comment_to)
+        except (JSONRPCException, BitcoinException):
+            raise
+        except Exception:
+            _unreconciled(fromaddress)
+            raise
+    finally:
+        balances.invalidate_accounts(fromaccount)
+
+def _validateaddresses(user, addresses):
+    """
+    Returns a validation dictionary for each of *addresses*, in order.
+    
+    Addresses are decoded locally and *ismine* is answered from the
+    :class:`~bitcoind.models.Address` table, which also gives the label of
+    addresses that belong to *user*. Only addresses with a good checksum but
+    another version byte than :const:`ADDRESS_VERSION` are left to bitcoind.
+    """
+    results = [None] * len(addresses)
+    local = []
+    remote = []
+    for (i, address) in enumerate(addresses):
+        try:
+            version = base58.address_version(address)
+        except ValueError:
+            results[i] = {"isvalid": False}
+            continue
+        if version == ADDRESS_VERSION:
+            local.append(i)
+        else:
+            remote.append(i)
+    
+    if local:
+        found = owners.owners([addresses[i] for i in local])
+        for i in local:
+            owner = found[addresses[i]]
+            results[i] = {"isvalid": True, "address": addresses[i], "ismine": owner is not None}
+            if owner is not None and owner[0] is not None and user.is_authenticated() and owner[0] == user.id:
+                results[i]["account"] = owner[1]
+    
+    if remote:
+        with conn.batch() as batch:
+            pending = [(i, batch.validateaddress(addresses[i])) for i in remote]
+        for (i, result) in pending:
+            results[i] = result.get()._asdict()
+    return results
+
+def _local_address(bitcoinaddress):
+    """
+    Returns the :class:`~bitcoind.models.Address` of *bitcoinaddress*, with
+    its user, if it belongs to one of our users, or :const:`None`.
+    """
+    owner = owners.owner(bitcoinaddress)
+    if owner is None or owner[0] is None:
+        return None
+    rows = list(Address.objects.select_related("user").filter(address=bitcoinaddress, user__isnull=False))
+    if not rows:
+        # Changed by another process since it was cached.
+        owners.invalidate(bitcoinaddress)
+        return None
+    return rows[0]
+
+def _keep_address(user, label, address, shard, is_primary):
+    """
+    Store *address*, just handed out by bitcoind, as *user*'s address for
+    *label* and return it. If a concurrent request stored one for *label*
+    first, that one is returned instead; both are in the same bitcoind
+    account.
+    """
+    sid = transaction.savepoint()
+    try:
+        Address.objects.create(user=user, label=label, address=address, shard=shard, is_primary=is_primary)
+    except IntegrityError:
+        transaction.savepoint_rollback(sid)
+        for existing in Address.objects.filter(user=user, label=label).values_list("address", flat=True):
+            return existing
+        # Otherwise the address itself was stored before.
+        return address
+    transaction.savepoint_commit(sid)
+    return address
+
+def _transfer(shard, fromaccount, toaddress, amount, minconf, comment=None, fromaddress=None):
+    """
+    Pay *amount* from an account on *shard* to the account of one of our own
+    addresses, *toaddress*.
+    
+    Within a wallet this is a ``move``. Across shards the coins have to go
+    through the block chain, so they are sent to *toaddress* instead; they
+    show up in the destination account, and its stored balance, once
+    confirmed, and the transaction fee, if any, is paid by the sender.
+    """
+    toaccount = util.getaccount(toaddress.user, toaddress.label)
+    if toaddress.shard == shard:
+        return _move(shard, fromaccount, toaccount, amount, minconf, comment, fromaddress, toaddress)
+    try:
+        return _sendfrom(shard, fromaccount, toaddress.address, amount, minconf, comment, fromaddress=fromaddress)
+    finally:
+        balances.invalidate_accounts(toaccount)
 
 @jsonrpc_method('getblockcount')
 def getblockcount(request):
     """
     Returns the number of blocks in the longest block chain.
     """
-    return conn.getblockcount()
+    return chainstate.getblockcount()
 
 @jsonrpc_method('getblocknumber')
 def getblocknumber(request):
     """
     Returns the block number of the latest block in the longest block chain.
     """
-    return conn.getblocknumber()
+    return chainstate.getblocknumber()
 
 @jsonrpc_method('getconnectioncount')
 def getconnectioncount(request):
     """
     Returns the number of connections to other nodes.
     """
-    return conn.getconnectioncount()
+    return chainstate.getconnectioncount()
 
 @jsonrpc_method('getdifficulty')
 def getdifficulty(request):
     """
     Returns the proof-of-work difficulty as a multiple of the minimum difficulty.
     """
-    return str(conn.getdifficulty())
+    return str(chainstate.getdifficulty())
 
 @jsonrpc_method('getinfo')
 def getinfo(request):
     """
     Returns a dictionary containing various state info.
     """
-    return conn.getinfo().__dict__
+    return chainstate.getinfo()._asdict()
 
 @basicauth()
 @jsonrpc_method('getnewaddress')
@@ -68,31 +280,38 @@ def getnewaddress(request, label=None):
     if label is None:
         label = DEFAULT_ADDRESS_LABEL
     
+    # Does this address already exist?
+    # If so, we'll just return that object.
+    # Note that this comparison is case-insensitive.
+    owned = list(Address.objects.filter(user=request.user).order_by("-is_primary", "-id")
+                 .values_list("label", "address", "shard"))
+    for (owned_label, address, shard) in owned:
+        if owned_label.lower() == label.lower():
+            return address
+    
+    # New addresses go to the wallet of the user's shard. Does the
+    # user have any other addresses? If not, this should be set as
+    # their primary.
+    if owned:
+        shard = owned[0][2]
+    else:
+        shard = sharding.shard_for(request.user.username, len(shards))
+    is_primary = not owned
+    
+    # Hand out a pre-generated address if there is one left.
+    address = addresspool.claim(request.user, label, shard, is_primary, shards[shard])
+    if address is not None:
+        return address
+    
     try:
-        # Does this address already exist?
-        # If so, we'll just return that object.
-        # Note that this query is case-insensitive.
-        addressObj = Address.objects.get(user=request.user, label__iexact=label)
-    except ObjectDoesNotExist:
-        try:
-            # Create user's address in bitcoind.
-            # Throws an exception if it fails.
-            address = conn.getnewaddress(util.getaccount(request.user, label))
-            
-            # Create the corresponding Address object.
-            addressObj = Address(user=request.user, address=address, label=label)
-            
-            # Does the user have any other addresses?
-            # If not, this should be set as their primary.
-            if Address.objects.filter(user=request.user).count() == 0:
-                addressObj.primary = True
-                
-            # Save the new address to the database.
-            addressObj.save()
-        except JSONRPCException, e:
-            raise _wrap_exception(e.error)
-
-    return addressObj.address
+        # Create user's address in bitcoind.
+        # Throws an exception if it fails.
+        address = shards[shard].getnewaddress(util.getaccount(request.user, label))
+    except JSONRPCException, e:
+        raise _wrap_exception(e.error)
+    
+    # Save the corresponding Address object.
+    return _keep_address(request.user, label, address, shard, is_primary)
 
 @basicauth()
 @jsonrpc_method('getaccountaddress')
@@ -105,16 +324,26 @@ def getaccountaddress(request, label=""):
     - *account* -- Account for which the address should be returned.
 
     """
-    # To make sure this isn't redundant
-    # with getnewaddress, we'll let
-    # this throw an exception if the
-    # account does not exist.
+    # Answer from our own addresses when we can: bitcoind doesn't know
+    # about addresses claimed from the pool until they are relabelled, and
+    # would make up another one.
+    owned = list(Address.objects.filter(user=request.user).order_by("-is_primary", "-id")
+                 .values_list("label", "address", "shard"))
+    for (owned_label, address, shard) in owned:
+        if owned_label == label:
+            return address
+    
+    if owned:
+        shard = owned[0][2]
+    else:
+        shard = sharding.shard_for(request.user.username, len(shards))
     try:
-        return conn.getaccountaddress(util.getaccount(request.user, label))
+        address = shards[shard].getaccountaddress(util.getaccount(request.user, label))
     except JSONRPCException, e:
         raise _wrap_exception(e.error)
     
-    return address.address
+    # Keep the address bitcoind handed out, like getnewaddress does.
+    return _keep_address(request.user, label, address, shard, not owned)
     
 
 @basicauth()
@@ -159,11 +388,12 @@ def setaccount(request, bitcoinaddress, label):
     # for this first release.
     if Address.objects.filter(user=request.user, label=label).count() == 0:
         # Throws an exception if it fails.
-        result = conn.setaccount(bitcoinaddress, util.getaccount(request.user, label))
+        result = shards[address.shard].setaccount(bitcoinaddress, util.getaccount(request.user, label))
         
         # Looks like the update went well on
         # bitcoind's side. Update our db object.
         address.label = label
+        address.pending_setaccount = False
         address.save()
     else:
         raise _wrap_exception('Address with label already exists!')
@@ -182,7 +412,10 @@ def getaccount(request, bitcoinaddress):
     """
     # Make sure the user owns the requested account.
     try:
-        return Address.objects.get(address=bitcoinaddress, user=request.user).label
+        owner = owners.owner(bitcoinaddress)
+        if owner is None or owner[0] != request.user.id:
+            raise Address.DoesNotExist("Address matching query does not exist.")
+        return owner[1]
     except Exception, e:
         raise _wrap_exception(e)
 
@@ -216,10 +449,11 @@ def sendtoaddress(request, bitcoinaddress, amount, comment=None, comment_to=None
     - *comment_to* -- Comment for to-address.
 
     """
-    # Set the "toaccount" to None. It will only
-    # get set to a value if the user is doing a
-    # local transfer.
+    # Set the "toaccount" and "toaddress" to None. They
+    # will only get set to a value if the user is doing
+    # a local transfer.
     toaccount = None
+    toaddress = None
     
     # Get the user's primary bitcoin address.
     fromaddress = Address.objects.get(user=request.user, is_primary=True)
@@ -230,33 +464,32 @@ def sendtoaddress(request, bitcoinaddress, amount, comment=None, comment_to=None
     if len(bitcoinaddress) <= MAX_USERNAME_LENGTH or bitcoinaddress.find("+") > -1:
         username, label = util.getusername_and_label(bitcoinaddress)
         toaccount = util.getaccount(username, label)
+        try:
+            toaddress = Address.objects.get(user__username=username, label=label)
+        except ObjectDoesNotExist:
+            pass
     
     # See if the address we are sending to exists in our database.
     # If so, use move. If not, use the requested method. 
-    if Address.objects.filter(address=bitcoinaddress).count() > 0:
+    local = _local_address(bitcoinaddress)
+    if local is not None:
         # Increase the balance of the address we're sending to
         # immediately, since it's on our server.
-        toaddress = Address.objects.get(address=bitcoinaddress)
-        toaccount = util.getaccount(toaddress.user, toaddress.label)
+        toaddress = local
         
-    if toaccount != None:
-        # Use the "move" method instead.
-        if comment is None:
-            return conn.move(fromaccount, toaccount, amount, minconf)
+    try:
+        if toaddress != None:
+            # Use the "move" method instead, if the recipient is on our shard.
+            return _transfer(fromaddress.shard, fromaccount, toaddress, amount, minconf, comment, fromaddress)
+        elif toaccount != None:
+            return _move(fromaddress.shard, fromaccount, toaccount, amount, minconf, comment, fromaddress)
         else:
-            return conn.move(fromaccount, toaccount, amount, minconf, comment)
-    else:
-        # We don't want to actually "sendtoaddress" since that would result in
-        # an amount being moved from some unknown account.
-        try:
-            if comment is None:
-                return conn.sendfrom(fromaccount, bitcoinaddress, amount, minconf)
-            elif comment_to is None:
-                return conn.sendfrom(fromaccount, bitcoinaddress, amount, minconf, comment)
-            else:
-                return conn.sendfrom(fromaccount, bitcoinaddress, amount, minconf, comment, comment_to)
-        except JSONRPCException, e:
-            raise _wrap_exception(e.error)
+            # We don't want to actually "sendtoaddress" since that would result in
+            # an amount being moved from some unknown account.
+            return _sendfrom(fromaddress.shard, fromaccount, bitcoinaddress, amount, minconf, comment, comment_to,
+                             fromaddress)
+    except JSONRPCException, e:
+        raise _wrap_exception(e.error)
 
 @jsonrpc_method('getreceivedbyaddress')
 def getreceivedbyaddress(request, bitcoinaddress, minconf=1):
@@ -271,7 +504,9 @@ def getreceivedbyaddress(request, bitcoinaddress, minconf=1):
     - *minconf* -- Number of confirmations to require, defaults to 1.
     """
     try:
-        return str(conn.getreceivedbyaddress(bitcoinaddress, minconf))
+        # Addresses we don't know about are asked of the first shard.
+        shard = Address.objects.filter(address=bitcoinaddress).values_list("shard", flat=True)[:1]
+        return str(shards[shard and shard[0] or 0].getreceivedbyaddress(bitcoinaddress, minconf))
     except JSONRPCException, e:
         raise _wrap_exception(e.error)
     
@@ -290,7 +525,7 @@ def getreceivedbyaccount(request, label, minconf=1):
     """
     try:
         account = util.getaccount(request.user, label)
-        return str(conn.getreceivedbyaccount(account, minconf))
+        return str(_getreceivedbyaccount(shards.home(request.user), account, minconf))
     except JSONRPCException, e:
         raise _wrap_exception(e.error)
 
@@ -309,9 +544,14 @@ def listreceivedbyaddress(request, minconf=1, includeempty=False):
 
     """
     try:
+        received = {}
+        
         addresses = []
         for address in Address.objects.filter(user=request.user):
-            amount = conn.getreceivedbyaddress(address.address, minconf=minconf)
+            if address.shard not in received:
+                received[address.shard] = _received_by_address(address.shard, minconf)
+            info = received[address.shard].get(address.address)
+            amount = info is not None and info.amount or 0
             if includeempty or amount > 0:
                 addresses.append({"address":address.address, "account":address.label, "amount":amount})
         return addresses
@@ -333,9 +573,14 @@ def listreceivedbyaccount(request, minconf=1, includeempty=False):
     - *includeempty* -- Whether to include addresses that haven't received any payments.
     """
     try:
+        owned = Address.objects.filter(user=request.user)
+        with shards[shards.home(request.user)].batch() as batch:
+            received = [(address, batch.getreceivedbyaccount(util.getaccount(request.user, address.label), minconf))
+                        for address in owned]
+        
         accounts = []
-        for address in Address.objects.filter(user=request.user):
-            amount = conn.getreceivedbyaccount(address.accountName(), minconf=minconf)
+        for address, amount in received:
+            amount = amount.get()
             if includeempty or amount > 0:
                 accounts.append({"account":address.label, "amount":amount})
         return accounts
@@ -345,46 +590,71 @@ def listreceivedbyaccount(request, minconf=1, includeempty=False):
 @basicauth()
 @jsonrpc_method('listaccounts')
 def listaccounts(request):
-    result = {}
-    for address in Address.objects.filter(user=request.user):
-        result[address.label] = conn.getbalance(util.getaccount(request.user, address.label))
-        
-    return result
+    """
+    Returns a dictionary with the label of each of the user's accounts as
+    keys and their balances as values, read from the stored balances.
+    """
+    if not ledger.balances_reconciled(len(shards)):
+        try:
+            balances = util.index_accounts(shards[shards.home(request.user)].listaccounts())
+        except JSONRPCException, e:
+            raise _wrap_exception(e.error)
+        balances = balances.get(unicode(request.user), {})
+        labels = Address.objects.filter(user=request.user).values_list("label", flat=True)
+        return dict((label, balances.get(label, 0)) for label in labels)
+    totals = Address.objects.filter(user=request.user).values("label").annotate(balance=Sum("balance"))
+    return dict((row["label"], float(row["balance"])) for row in totals)
 
 @basicauth()
 @jsonrpc_method('listtransactions')
-def listtransactions(request, label, count=10):
+def listtransactions(request, label, count=10, start=0):
     """
     Returns a list of the last transactions for an account.
     
-    Each transaction is represented with a dictionary.
+    Each transaction is represented with a dictionary. Transactions are
+    read from the copy kept by the ``sync_transactions`` command.
     
     Arguments:
     
-    - *minconf* -- Minimum number of confirmations before payments are included.
+    - *label* -- Account to list, or ``"*"`` for all of the user's accounts.
     - *count* -- Number of transactions to return.
-
-    """
-    try:
-        clean_transactions = []
-        if (label == "*"):
-            transactions = []
-            addresses = Address.objects.filter(user=request.user)
-            for address in addresses:
-                my_transactions = conn.listtransactions(util.getaccount(request.user, address.label), count)
-                transactions.extend(my_transactions)
-        else:
-            transactions = conn.listtransactions(util.getaccount(request.user, label), count)
-            
-        for transaction in transactions:
-            transaction.account = util.getdisplayname(transaction.account)
-            if hasattr(transaction, "otheraccount"):
-                transaction.otheraccount = util.getdisplayname(transaction.otheraccount)
-                
-            clean_transactions.append(transaction.__dict__)
-        return clean_transactions
-    except JSONRPCException, e:
-        raise _wrap_exception(e.error)
+    - *start* -- Number of most recent transactions to skip.
+
+    """
+    if count < 0 or start < 0:
+        raise InvalidParamsError("Negative count or start")
+    transactions = Transaction.objects.filter(account__user=request.user)
+    if label != "*":
+        transactions = transactions.filter(account__label=label)
+    page = list(transactions.select_related("account").order_by("-time", "-id")[start:start + count])
+    # Oldest first, like bitcoind.
+    page.reverse()
+    # Confirmations are counted from the block height stored with each entry.
+    height = [t for t in page if t.category != "move"] and probe.height()
+    return [_transaction_dict(request.user, t, height) for t in page]
+
+def _transaction_dict(user, tx, height):
+    """
+    Returns *tx* like bitcoind's ``listtransactions`` would, when the best
+    block is at *height*.
+    """
+    result = {
+        "account": util.getdisplayname(util.getaccount(user, tx.account.label)),
+        "category": tx.category,
+        "amount": float(tx.amount),
+        "time": ledger.timestamp(tx.time),
+    }
+    if tx.category == "move":
+        result["otheraccount"] = util.getdisplayname(tx.otheraccount)
+        if tx.comment:
+            result["comment"] = tx.comment
+    else:
+        result["address"] = tx.address
+        result["txid"] = tx.txid
+        result["confirmations"] = tx.confirmations(height)
+        if tx.fee is not None:
+            result["fee"] = float(tx.fee)
+    return result
 
 @jsonrpc_method('validateaddress')
 def validateaddress(request, validateaddress):
@@ -399,24 +669,52 @@ def validateaddress(request, validateaddress):
 
     """
     try:
-        return conn.validateaddress(validateaddress).__dict__
+        return _validateaddresses(request.user, [validateaddress])[0]
+    except JSONRPCException, e:
+        raise _wrap_exception(e.error)
+
+@jsonrpc_method('validateaddresses')
+def validateaddresses(request, addresses):
+    """
+    Validate several bitcoin addresses at once.
+
+    Returns a list with a dictionary like the one returned by
+    ``validateaddress`` for each address, in the same order.
+    
+    Arguments:
+    
+    - *addresses* -- List of up to :const:`MAX_VALIDATE_ADDRESSES` addresses to validate.
+
+    """
+    if not isinstance(addresses, list):
+        raise InvalidParamsError("addresses must be a list")
+    if len(addresses) > MAX_VALIDATE_ADDRESSES:
+        raise InvalidParamsError("Too many addresses, at most %d are allowed" % MAX_VALIDATE_ADDRESSES)
+    try:
+        return _validateaddresses(request.user, addresses)
     except JSONRPCException, e:
         raise _wrap_exception(e.error)
     
 @basicauth()
 @jsonrpc_method('getbalance')
-def getbalance(request, label=None, minconf=0):
+def getbalance(request, label=None, minconf=1):
     """
-    Get the current balance, either for an account or the total server balance.
+    Get the current balance of an account, from the stored balances of its
+    addresses. Payments count once they have one confirmation; for any
+    other *minconf* the balance is asked from bitcoind.
     
     Arguments:
     - *account* -- If this parameter is specified, returns the balance in the account.
+    - *minconf* -- Minimum number of confirmations of the payments counted, defaults to 1.
 
     """
-    try:
-        return str(conn.getbalance(util.getaccount(request.user, label)))
-    except JSONRPCException, e:
-        raise _wrap_exception(e.error)
+    if minconf != 1 or not ledger.balances_reconciled(len(shards)):
+        try:
+            return str(shards[shards.home(request.user)].getbalance(util.getaccount(request.user, label), minconf))
+        except JSONRPCException, e:
+            raise _wrap_exception(e.error)
+    total = Address.objects.filter(user=request.user, label=label or "").aggregate(balance=Sum("balance"))
+    return str(float(total["balance"] or 0))
     
 @basicauth()
 @jsonrpc_method('move')
@@ -448,10 +746,7 @@ def move(request, fromlabel, tolabel, amount, minconf=1, comment=None):
         except ObjectDoesNotExist:
             raise _wrap_exception("Could not find account \"%s\"" % tolabel)
         
-        if comment is None:
-            return conn.move(fromaccount, toaccount, amount, minconf)
-        else:
-            return conn.move(fromaccount, toaccount, amount, minconf, comment)
+        return _move(fromaddress.shard, fromaccount, toaccount, amount, minconf, comment, fromaddress, toaddress)
     except JSONRPCException, e:
         raise _wrap_exception(e.error)
 
@@ -474,32 +769,77 @@ def sendfrom(request, fromlabel, tobitcoinaddress, amount, minconf=1, comment=No
     - *comment_to* -- Comment for to-address.
 
     """ 
+    fromaccount = util.getaccount(request.user, fromlabel)
+    try:
+        fromaddress = Address.objects.get(user=request.user, label=fromlabel)
+    except ObjectDoesNotExist:
+        raise _wrap_exception("Could not find account \"%s\"" % fromlabel)
+    
     # See if the address we are sending to exists in our database.
     # If so, use move. If not, use the requested method. 
-    if Address.objects.filter(address=tobitcoinaddress).count() > 0:
+    toaddress = _local_address(tobitcoinaddress)
+    if toaddress is not None:
         # Increase the balance of the address we're sending to
         # immediately, since it's on our server.
-        toaddress = Address.objects.get(address=tobitcoinaddress)
-        toaccount = util.getaccount(toaddress.user, toaddress.label)
         
-        fromaccount = util.getaccount(request.user, fromlabel)
+        # Use the "move" method instead, if the recipient is on our shard.
         try:
-            fromaddress = Address.objects.get(user=request.user, label=fromlabel)
-        except ObjectDoesNotExist:
-            raise _wrap_exception("Could not find account \"%s\"" % fromlabel)
-        
-        # Use the "move" method instead.
-        if comment is None:
-            return conn.move(fromaccount, toaccount, amount, minconf)
-        else:
-            return conn.move(fromaccount, toaccount, amount, minconf, comment)
+            return _transfer(fromaddress.shard, fromaccount, toaddress, amount, minconf, comment, fromaddress)
+        except JSONRPCException, e:
+            raise _wrap_exception(e.error)
     else:
         try:
-            if comment is None:
-                return conn.sendfrom(fromaccount, tobitcoinaddress, amount, minconf)
-            elif comment_to is None:
-                return conn.sendfrom(fromaccount, tobitcoinaddress, amount, minconf, comment)
-            else:
-                return conn.sendfrom(fromaccount, tobitcoinaddress, amount, minconf, comment, comment_to)
+            return _sendfrom(fromaddress.shard, fromaccount, tobitcoinaddress, amount, minconf, comment, comment_to,
+                             fromaddress)
         except JSONRPCException, e:
             raise _wrap_exception(e.error)
+
+def _cache_stats():
+    """
+    Returns the :meth:`stats` of each of this process's caches, by name.
+    """
+    return {
+        "owners": owners.cache.stats(),
+        "received_by_address": received_by_address.stats(),
+        "balances": balances.stats(),
+        "chainstate": chainstate.cache.stats(),
+    }
+
+@basicauth()
+@jsonrpc_method('getrpcmetrics')
+def getrpcmetrics(request):
+    """
+    Returns, for each bitcoind RPC method called by this process, the number
+    of calls, errors by code, a cumulative latency histogram and the bytes
+    sent and received. The hits, misses and size of each of the process's
+    caches are under ``"caches"``. Staff only.
+    """
+    if not request.user.is_staff:
+        raise InvalidCredentialsError()
+    snapshot = metrics.snapshot()
+    snapshot["caches"] = _cache_stats()
+    return snapshot
+
+@logged_in_or_basicauth()
+def rpcmetrics(request):
+    """
+    The same statistics as ``getrpcmetrics``, as plain text in the
+    Prometheus exposition format. Staff only.
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    caches = sorted(_cache_stats().iteritems())
+    lines = [
+        "# HELP bitcoind_cache_lookups_total Cache lookups by cache and result.",
+        "# TYPE bitcoind_cache_lookups_total counter",
+    ]
+    for (name, stats) in caches:
+        lines.append('bitcoind_cache_lookups_total{cache="%s",result="hit"} %d' % (name, stats["hits"]))
+        lines.append('bitcoind_cache_lookups_total{cache="%s",result="miss"} %d' % (name, stats["misses"]))
+    lines.extend([
+        "# HELP bitcoind_cache_size Entries in each cache.",
+        "# TYPE bitcoind_cache_size gauge",
+    ])
+    lines.extend('bitcoind_cache_size{cache="%s"} %d' % (name, stats["size"]) for (name, stats) in caches)
+    return HttpResponse(metrics.render() + "\n".join(lines) + "\n", content_type="text/plain; version=0.0.4")
+
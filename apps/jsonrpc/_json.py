@@ -1,21 +1,5 @@
-try:
-  import json
-except (ImportError, NameError):
-  try:
-    from django.utils import simplejson as json
-  except (ImportError, NameError):
-    import simplejson as json
-try:
-  json.dumps
-  json.loads
-except AttributeError:
-  try: # monkey patching for python-json package
-    json.dumps = lambda obj, *args, **kwargs: json.write(obj)
-    json.loads = lambda str, *args, **kwargs: json.read(str)
-  except AttributeError:
-    raise ImportError('Could not load an apropriate JSON library '
-                      'currently supported are simplejson, '
-                      'python2.6 json and python-json')
-
-loads = json.loads
-dumps = json.dumps
\ No newline at end of file
+"""
+The JSON codec of :mod:`bitcoind.codec`, which the bitcoind client also
+uses without Django settings.
+"""
+from bitcoind.codec import BACKENDS, JSONDecoder, dumps, dumps_backend, loads, loads_backend
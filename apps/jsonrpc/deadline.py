@@ -0,0 +1,6 @@
+"""
+Time budget of the JSON-RPC request being served by the current thread; see
+:mod:`bitcoind.deadline`, which the bitcoind client also uses without Django
+settings.
+"""
+from bitcoind.deadline import DeadlineExceeded, start, clear, remaining, timeout
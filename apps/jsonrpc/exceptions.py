@@ -4,6 +4,8 @@ try:
 except (ImportError, NameError):
   _ = lambda t, *a, **k: t
 
+from bitcoind.deadline import DeadlineExceeded
+
 class Error(Exception):
   """ Error class based on the JSON-RPC 2.0 specs 
       http://groups.google.com/group/json-rpc/web/json-rpc-1-2-proposal 
@@ -79,6 +81,13 @@ class ServerError(Error):
   
 # -32099..-32000    Server error.     Reserved for implementation-defined server-errors.  
 
+class DeadlineExceededError(Error, DeadlineExceeded):
+  """ The request could not be answered within its time budget; the JSON-RPC
+      form of bitcoind.deadline.DeadlineExceeded """
+  code = -32001
+  message = _('Deadline exceeded.')
+  status = 504
+
 
 # The remainder of the space is available for application defined errors.
 
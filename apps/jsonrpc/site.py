@@ -2,6 +2,7 @@ import datetime, decimal
 from functools import wraps
 from uuid import uuid1
 from jsonrpc._json import loads, dumps
+from jsonrpc import deadline
 from jsonrpc.exceptions import *
 from jsonrpc.types import *
 from django.core import signals
@@ -14,6 +15,13 @@ except (NameError, ImportError):
 from django.core.serializers.json import DjangoJSONEncoder
 
 NoneType = type(None)
+
+def as_error(e):
+  """ Returns the JSON-RPC Error for exception e: a DeadlineExceededError for
+      a bitcoind.deadline.DeadlineExceeded, or e itself """
+  if isinstance(e, Error):
+    return e
+  return DeadlineExceededError(*e.args[:1])
 encode_kw = lambda p: dict([(str(k), v) for k, v in p.iteritems()])
 
 def encode_kw11(p):
@@ -171,8 +179,9 @@ class JSONRPCSite(object):
       
       status = 200
     
-    except Error, e:
+    except (Error, DeadlineExceeded), e:
       signals.got_request_exception.send(sender=self.__class__, request=request)
+      e = as_error(e)
       response['error'] = e.json_rpc_format
       if version == '1.1' and 'result' in response:
         response.pop('result')
@@ -190,6 +199,16 @@ class JSONRPCSite(object):
   
   @csrf_exempt
   def dispatch(self, request, method='', json_encoder=None):
+    """ Serve a request within settings.JSONRPC_TIMEOUT seconds, if set;
+        see jsonrpc.deadline """
+    from django.conf import settings
+    deadline.start(getattr(settings, 'JSONRPC_TIMEOUT', None))
+    try:
+      return self._dispatch(request, method, json_encoder)
+    finally:
+      deadline.clear()
+
+  def _dispatch(self, request, method='', json_encoder=None):
     from django.http import HttpResponse
     json_encoder = json_encoder or self.json_encoder
 
@@ -218,8 +237,9 @@ class JSONRPCSite(object):
           return HttpResponse('', status=status)
       
       json_rpc = dumps(response, cls=json_encoder)
-    except Error, e:
+    except (Error, DeadlineExceeded), e:
       signals.got_request_exception.send(sender=self.__class__, request=request)
+      e = as_error(e)
       response['error'] = e.json_rpc_format
       status = e.status
       json_rpc = dumps(response, cls=json_encoder)
@@ -0,0 +1,6 @@
+#!/bin/sh
+WORKON_HOME=/home/pouch/env
+PROJECT_ROOT=/home/pouch/pouch
+. $WORKON_HOME/bin/activate
+cd $PROJECT_ROOT
+python manage.py refill_address_pool >> $PROJECT_ROOT/logs/cron_address_pool.log 2>&1